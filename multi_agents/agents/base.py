@@ -1,17 +1,62 @@
+import json
 from abc import ABC, abstractmethod
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Optional
+
+from multi_agents.core.async_utils import run_sync, achat
+
+
+def parse_json_object(raw: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Parse une réponse LLM attendue en objet JSON ; None si invalide.
+    """
+    try:
+        parsed = json.loads(raw or "")
+    except json.JSONDecodeError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
 
 
 class Agent(ABC):
     """
     Classe de base pour tous les agents.
     Chaque agent prend un dict en entrée et renvoie un dict en sortie.
+    La logique est asynchrone (arun) ; run en est un wrapper synchrone.
     """
 
     def __init__(self, name: str):
         self.name = name
+        # Nombre d'appels relancés sur le grand modèle après une sortie invalide
+        self.escalations = 0
 
-    @abstractmethod
     def run(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Version synchrone de arun."""
+        return run_sync(self.arun(data))
+
+    @abstractmethod
+    async def arun(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Logique principale de l'agent."""
         pass
+
+    async def achat_validated(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        agent: str,
+        validate: Callable[[str], bool],
+    ) -> str:
+        """
+        Appel LLM sur le modèle routé pour `agent` (souvent un petit modèle rapide).
+        Si la sortie ne passe pas `validate`, on relance une fois sur le grand modèle.
+        Retourne la dernière réponse brute (le parsing / fallback reste à l'agent).
+        Seule une réponse qui passe `validate` est mise en cache.
+        """
+        llm = getattr(self, "llm", None)
+        raw = await achat(llm, system_prompt, user_prompt, agent=agent, validate=validate)
+        if validate(raw):
+            return raw
+        if not (hasattr(llm, "can_escalate") and llm.can_escalate(agent)):
+            return raw
+
+        print(f"[{self.__class__.__name__}] Sortie {agent} invalide, passage au grand modèle")
+        self.escalations += 1
+        return await achat(llm, system_prompt, user_prompt, agent=agent, escalate=True, validate=validate)
@@ -1,24 +1,40 @@
 import json
+import asyncio
 from typing import Dict, Any, Optional
 
-from .base import Agent
+from .base import Agent, parse_json_object
 from multi_agents.core.llm_client import LLMClient
+from multi_agents.core.async_utils import achat
 from multi_agents.core.prompts import load_prompt
+from multi_agents.core.prompt_builder import prompt_builder
 from multi_agents.core.models import EventUnderstanding
+from multi_agents.core.deadline import Deadline
+from multi_agents.core.event_rules import RuleBasedEventExtractor
 
 
 class EventAnalyzerAgent(Agent):
     """
     Agent qui analyse la demande utilisateur (texte libre) et en sort une structure EventUnderstanding.
     Utilise un LLM + prompt système, mais est robuste aux réponses non-JSON.
+
+    Un extracteur local (lexiques + regex) passe en premier : si tous les champs
+    sont sûrs, le LLM n'est pas appelé ; sinon il ne remplace que les champs incertains.
     """
 
-    def __init__(self, llm_client: Optional[LLMClient] = None) -> None:
+    def __init__(
+        self,
+        llm_client: Optional[LLMClient] = None,
+        rules: Optional[RuleBasedEventExtractor] = None,
+    ) -> None:
         super().__init__(name="event_analyzer")
         self.llm = llm_client or LLMClient()
         self.system_prompt = load_prompt("event_analyzer_system.txt")
+        self.rules = rules or RuleBasedEventExtractor()
+
+        self.rule_hits = 0
+        self.llm_calls = 0
 
-    def run(self, data: Dict[str, Any]) -> EventUnderstanding:
+    async def arun(self, data: Dict[str, Any]) -> EventUnderstanding:
         """
         data attendu :
         {
@@ -26,12 +42,27 @@ class EventAnalyzerAgent(Agent):
           "ui_budget": Optional[float],
           "ui_gender": str,
           "ui_age": Optional[int],
+          "deadline": Deadline  # optionnel
         }
         """
         description: str = data.get("raw_text", "")
         ui_budget: Optional[float] = data.get("ui_budget")
         ui_gender: str = data.get("ui_gender") or "homme"
         ui_age: Optional[int] = data.get("ui_age")
+        deadline: Optional[Deadline] = data.get("deadline")
+
+        # --------- Chemin rapide : extraction locale --------- #
+        extraction = self.rules.extract(description, ui_budget, ui_gender, ui_age)
+        if self.rules.confident(extraction):
+            self.rule_hits += 1
+            print("[EventAnalyzerAgent] Extraction locale suffisante, LLM non appelé")
+            return extraction["event"]
+        uncertain = self.rules.uncertain_fields(extraction)
+
+        # Échéance proche : pas de complément LLM, l'extraction locale même incomplète
+        if deadline is not None and not deadline.allows("llm_event"):
+            deadline.degrade("event_analyzer", "local_extraction", ", ".join(sorted(uncertain)))
+            return self._local_event(extraction)
 
         # Construction du user prompt : uniquement des données, pas de consignes
         payload = {
@@ -41,13 +72,27 @@ class EventAnalyzerAgent(Agent):
             "ui_age": ui_age,
         }
 
-        user_prompt = (
-            "Voici la demande de l'utilisateur et les informations fournies par l'interface :\n\n"
-            + json.dumps(payload, ensure_ascii=False, indent=2)
-            + "\n\nAnalyse et renvoie l'objet JSON structuré comme demandé dans le prompt système."
+        user_prompt = prompt_builder.build(
+            "event_analyzer",
+            "Voici la demande de l'utilisateur et les informations fournies par l'interface :\n\n",
+            payload,
+            "\n\nAnalyse et renvoie l'objet JSON structuré comme demandé dans le prompt système.",
         )
 
-        raw = self.llm.chat(self.system_prompt, user_prompt)
+        self.llm_calls += 1
+        call = achat(
+            self.llm,
+            self.system_prompt,
+            user_prompt,
+            agent="event_analyzer",
+            validate=lambda r: parse_json_object(r) is not None,
+        )
+        timeout = deadline.cap() if deadline is not None else None
+        try:
+            raw = await asyncio.wait_for(call, timeout=timeout)
+        except asyncio.TimeoutError:
+            deadline.degrade("event_analyzer", "llm_timeout")  # type: ignore[union-attr]
+            return self._local_event(extraction)
 
         # --------- Parsing robuste --------- #
         try:
@@ -57,23 +102,8 @@ class EventAnalyzerAgent(Agent):
             print("[EventAnalyzerAgent] JSON decode failed, raw LLM output:")
             print(raw)
 
-            # Fallback : on construit un EventUnderstanding minimal à partir des infos UI
-            event_type = "événement"
-            time_of_day = "indéfini"
-            formality_level = "casual"
-            style = ""
-
-            # Si tu veux, tu peux rajouter des heuristiques ici (détection de 'mariage', 'soir', etc.)
-            fallback: EventUnderstanding = {
-                "event_type": event_type,
-                "time_of_day": time_of_day,
-                "formality_level": formality_level,
-                "style": style,
-                "budget": ui_budget if ui_budget is not None else 100.0,
-                "gender": ui_gender,
-                "age": ui_age,
-            }
-            return fallback
+            # Fallback : l'extraction locale, même incomplète, plutôt que des valeurs génériques
+            return self._local_event(extraction)
 
         # On sécurise les champs et on remplit avec des valeurs par défaut si manquants
         event: EventUnderstanding = {
@@ -90,4 +120,23 @@ class EventAnalyzerAgent(Agent):
         if event["budget"] is None and ui_budget is not None:
             event["budget"] = ui_budget
 
+        # Le LLM ne complète que les champs incertains : les champs sûrs de l'extraction
+        # locale (dont les saisies UI) sont conservés
+        for field, value in extraction["event"].items():
+            if field not in uncertain:
+                event[field] = value  # type: ignore[literal-required]
+
+        return event
+
+    @staticmethod
+    def _local_event(extraction: Dict[str, Any]) -> EventUnderstanding:
+        """
+        Événement issu de la seule extraction locale (budget par défaut si absent).
+        """
+        event: EventUnderstanding = dict(extraction["event"])  # type: ignore[assignment]
+        if event["budget"] is None:
+            event["budget"] = 100.0
         return event
+
+    def stats(self) -> Dict[str, int]:
+        return {"rule_hits": self.rule_hits, "llm_calls": self.llm_calls}
@@ -1,12 +1,18 @@
 # multi_agents/agents/outfit_visualizer.py
 
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 import json
+import asyncio
+import threading
 
-from .base import Agent
+from .base import Agent, parse_json_object
 from multi_agents.core.llm_client import LLMClient
 from multi_agents.core.prompts import load_prompt
+from multi_agents.core.prompt_builder import prompt_builder
 from multi_agents.core.image_client import ModelslabImageClient
+from multi_agents.core.photo_ingest import PhotoIngestor
+from multi_agents.core.deadline import Deadline
+from multi_agents.core.cache_backend import CacheBackend, MemoryCacheBackend
 from multi_agents.core.models import (
     EventUnderstanding,
     ProductSearchOutput,
@@ -15,10 +21,19 @@ from multi_agents.core.models import (
 )
 
 
+# Espace des aperçus générés dans le CacheBackend
+PREVIEW_NAMESPACE = "preview"
+
+
 class OutfitVisualizerAgent(Agent):
     """
     Agent responsable de générer un aperçu visuel (mannequin) pour chaque tenue.
-    - Input : event + product_search_output + user_image_url
+    - Input : event + product_search_output + user_image_url (ou user_image_bytes)
+    - La photo est ingérée une seule fois par demande (EXIF retiré, réduite, hashée)
+      et la même copie sert pour toutes les tenues ; les aperçus sont mis en cache
+      par (empreinte photo, images produits)
+    - Échéance de la demande : pas d'aperçu s'il ne reste pas assez de temps, et les
+      générations en cours sont abandonnées à l'échéance (tenues rendues sans aperçu)
     - Output : même structure que product_search_output, mais chaque tenue est enrichie
       avec :
         - preview_image_url
@@ -30,6 +45,11 @@ class OutfitVisualizerAgent(Agent):
         llm_client: Optional[LLMClient] = None,
         image_client: Optional[ModelslabImageClient] = None,
         max_outfits: int = 3,
+        photo_ingestor: Optional[PhotoIngestor] = None,
+        max_cached_previews: int = 256,
+        image_checker: Optional[Any] = None,
+        cache: Optional[CacheBackend] = None,
+        preview_ttl_seconds: float = 24 * 3600,
     ) -> None:
         super().__init__(name="outfit_visualizer")
         self.llm = llm_client or LLMClient()
@@ -37,13 +57,31 @@ class OutfitVisualizerAgent(Agent):
         self.system_prompt = load_prompt("outfit_visualizer_system.txt")
         self.max_outfits = max_outfits
 
-    def run(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        # Sans endpoint d'upload (ex: client de test), l'URL fournie est transmise telle quelle
+        if photo_ingestor is None and hasattr(self.image_client, "aupload_image"):
+            photo_ingestor = PhotoIngestor(uploader=self.image_client.aupload_image)
+        self.photo_ingestor = photo_ingestor
+
+        # Vérifie les URLs d'images avant Modelslab (ex: ImagePrefetcher.acheck)
+        self.image_checker = image_checker
+
+        # Aperçus (URL, prompt) : en mémoire par défaut, partagés entre process avec le
+        # backend SQLite (une génération déjà en cours ailleurs est attendue, pas relancée)
+        self.max_cached_previews = max_cached_previews
+        self.preview_ttl_seconds = preview_ttl_seconds
+        self.cache = cache or MemoryCacheBackend(max_entries=max_cached_previews)
+        self._preview_lock = threading.Lock()
+        self.preview_cache_hits = 0
+
+    async def arun(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         data attendu :
         {
           "event": EventUnderstanding,
           "product_search_output": ProductSearchOutput,
-          "user_image_url": "https://..."
+          "user_image_url": "https://...",     # ou
+          "user_image_bytes": b"...",          # photo uploadée dans l'UI
+          "deadline": Deadline                 # optionnel
         }
 
         Retour :
@@ -53,21 +91,40 @@ class OutfitVisualizerAgent(Agent):
         """
         event: EventUnderstanding = data["event"]
         ps_output: ProductSearchOutput = data["product_search_output"]
-        user_image_url: str = data["user_image_url"]
-
-        enriched_outfits: List[ResolvedOutfit] = []
+        outfits = ps_output["outfits"][: self.max_outfits]
 
-        for idx, outfit in enumerate(ps_output["outfits"][: self.max_outfits]):
-            # On travaille sur une copie pour être safe
-            outfit_copy: ResolvedOutfit = dict(outfit)  # type: ignore
+        deadline: Optional[Deadline] = data.get("deadline")
+        if deadline is not None and not deadline.allows("previews"):
+            deadline.degrade("visualizer", "skip_previews")
+            return {"outfits": [dict(outfit) for outfit in outfits]}
 
+        # Une seule ingestion / un seul upload de la photo pour toutes les tenues
+        user_image_url, photo_key = await self._prepare_photo(
+            data.get("user_image_url"),
+            data.get("user_image_bytes"),
+        )
+        if user_image_url is None:
+            print("[OutfitVisualizer] No usable user photo, skipping previews.")
+            return {"outfits": [dict(outfit) for outfit in outfits]}
 
-            image_url, prompt = self._generate_visual_for_outfit(
-                event=event,
-                outfit=outfit_copy,
-                user_image_url=user_image_url,
+        # Les aperçus des différentes tenues sont générés en parallèle
+        visuals = await asyncio.gather(
+            *(
+                self._generate_within_deadline(
+                    deadline,
+                    event=event,
+                    outfit=outfit,
+                    user_image_url=user_image_url,
+                    photo_key=photo_key,
+                )
+                for outfit in outfits
             )
+        )
 
+        enriched_outfits: List[ResolvedOutfit] = []
+        for outfit, (image_url, prompt) in zip(outfits, visuals):
+            # On travaille sur une copie pour être safe
+            outfit_copy: ResolvedOutfit = dict(outfit)  # type: ignore
             outfit_copy["preview_image_url"] = image_url
             outfit_copy["preview_prompt"] = prompt
 
@@ -75,11 +132,25 @@ class OutfitVisualizerAgent(Agent):
 
         return {"outfits": enriched_outfits}
 
-    def _generate_visual_for_outfit(
+    async def _generate_within_deadline(
+        self,
+        deadline: Optional[Deadline],
+        **kwargs: Any,
+    ) -> tuple[Optional[str], str]:
+        if deadline is None:
+            return await self._generate_visual_for_outfit(**kwargs)
+        try:
+            return await asyncio.wait_for(self._generate_visual_for_outfit(**kwargs), timeout=deadline.cap())
+        except asyncio.TimeoutError:
+            deadline.degrade("visualizer", "preview_timeout")
+            return None, ""
+
+    async def _generate_visual_for_outfit(
         self,
         event: EventUnderstanding,
         outfit: ResolvedOutfit,
         user_image_url: str,
+        photo_key: Optional[str] = None,
     ) -> tuple[Optional[str], str]:
         """
         Génère une image pour une tenue :
@@ -108,26 +179,79 @@ class OutfitVisualizerAgent(Agent):
                 }
             )
 
+        if self.image_checker is not None and product_image_urls:
+            # Une image morte ferait échouer une génération de ~120 s : on l'écarte avant
+            alive = await self.image_checker.acheck(product_image_urls + [user_image_url])
+            if not alive.get(user_image_url, True):
+                print(f"[OutfitVisualizer] User image unreachable: {user_image_url}")
+                return None, ""
+            kept = [i for i, url in enumerate(product_image_urls) if alive.get(url, True)]
+            product_image_urls = [product_image_urls[i] for i in kept]
+            items_data_for_prompt = [items_data_for_prompt[i] for i in kept]
+
         if not product_image_urls:
             # Rien à afficher, pas d'image
             return None, ""
 
-        # Prompt LLM
-        prompt = self._build_mannequin_prompt(event, outfit, items_data_for_prompt)
+        # Même photo + mêmes articles : aperçu déjà généré (re-run, autre tenue identique)
+        cache_key = json.dumps([photo_key or user_image_url, product_image_urls], ensure_ascii=False)
+        generated: List[Tuple[Optional[str], str]] = []
 
-        print("[OutfitVisualizer] product_image_urls:", product_image_urls)
+        async def generate() -> Optional[Tuple[str, str]]:
+            # Prompt LLM
+            prompt = await self._build_mannequin_prompt(event, outfit, items_data_for_prompt)
 
+            print("[OutfitVisualizer] product_image_urls:", product_image_urls)
 
-        # Appel Modelslab
-        image_url = self.image_client.generate_outfit_image(
-            user_image_url=user_image_url,
-            product_image_urls=product_image_urls,
-            prompt=prompt,
+
+            # Appel Modelslab
+            if hasattr(self.image_client, "agenerate_outfit_image"):
+                image_url = await self.image_client.agenerate_outfit_image(
+                    user_image_url=user_image_url,
+                    product_image_urls=product_image_urls,
+                    prompt=prompt,
+                )
+            else:
+                image_url = await asyncio.to_thread(
+                    self.image_client.generate_outfit_image,
+                    user_image_url=user_image_url,
+                    product_image_urls=product_image_urls,
+                    prompt=prompt,
+                )
+            generated.append((image_url, prompt))
+            return (image_url, prompt) if image_url else None
+
+        cached = await self.cache.aget_or_compute(
+            PREVIEW_NAMESPACE, cache_key, generate, ttl_seconds=self.preview_ttl_seconds
         )
+        if not generated:
+            with self._preview_lock:
+                self.preview_cache_hits += 1
+            return tuple(cached)  # type: ignore[return-value]
+        return generated[0]
 
-        return image_url, prompt
+    async def _prepare_photo(
+        self,
+        user_image_url: Optional[str],
+        user_image_bytes: Optional[bytes],
+    ) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Retourne (URL à envoyer à Modelslab, clé de cache de la photo).
+        En cas d'échec de l'ingestion, on retombe sur l'URL d'origine.
+        """
+        source = user_image_bytes or user_image_url
+        if source is None or self.photo_ingestor is None:
+            return user_image_url, None
+
+        try:
+            photo = await self.photo_ingestor.aingest(source)
+        except Exception as err:
+            print(f"[OutfitVisualizer] Photo ingestion failed: {err}")
+            return user_image_url, None
+
+        return photo["url"] or user_image_url, photo["sha256"]
 
-    def _build_mannequin_prompt(
+    async def _build_mannequin_prompt(
         self,
         event: EventUnderstanding,
         outfit: ResolvedOutfit,
@@ -143,13 +267,19 @@ class OutfitVisualizerAgent(Agent):
             "items": items_data_for_prompt,
         }
 
-        user_prompt = (
-            "Here is the event context and the chosen outfit with its items:\n\n"
-            + json.dumps(payload, ensure_ascii=False, indent=2)
-            + "\n\nGenerate the JSON with the 'prompt' field as requested."
+        user_prompt = prompt_builder.build(
+            "mannequin_prompt",
+            "Here is the event context and the chosen outfit with its items:\n\n",
+            payload,
+            "\n\nGenerate the JSON with the 'prompt' field as requested.",
         )
 
-        raw = self.llm.chat(self.system_prompt, user_prompt)
+        raw = await self.achat_validated(
+            self.system_prompt,
+            user_prompt,
+            agent="mannequin_prompt",
+            validate=_valid_prompt,
+        )
 
         try:
             parsed: MannequinPromptOutput = json.loads(raw)
@@ -162,3 +292,8 @@ class OutfitVisualizerAgent(Agent):
             )
 
         return prompt
+
+
+def _valid_prompt(raw: str) -> bool:
+    parsed = parse_json_object(raw)
+    return parsed is not None and isinstance(parsed.get("prompt"), str) and bool(parsed["prompt"].strip())
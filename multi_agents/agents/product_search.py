@@ -1,10 +1,21 @@
 from typing import Dict, Any, Optional, List
 import json
+import time
+import asyncio
+import threading
+from collections import deque
 
-from .base import Agent
+from .base import Agent, parse_json_object
 from multi_agents.core.llm_client import LLMClient
 from multi_agents.core.prompts import load_prompt
+from multi_agents.core.prompt_builder import prompt_builder
 from multi_agents.core.zalando_scraper import ZalandoScraper
+from multi_agents.core.product_ranker import ProductRanker, normalize_text
+from multi_agents.core.query_templates import QueryTemplateEngine
+from multi_agents.core.outfit_optimizer import optimize_outfit
+from multi_agents.core.product_provider import ProductProvider, item_query
+from multi_agents.core.federated_product_provider import FederatedProductProvider
+from multi_agents.core.deadline import Deadline
 from multi_agents.core.models import (
     EventUnderstanding,
     StylistOutput,
@@ -16,6 +27,7 @@ from multi_agents.core.models import (
     QueryBuilderOutput,
     ProductSelectorInput,
     ProductSelectorOutput,
+    ItemCandidatePool,
 )
 
 
@@ -23,10 +35,19 @@ class ProductSearchAgent(Agent):
     """
     Agent de recherche produits / scraping :
     - prend en entrée l'output du StylistAgent + le contexte d'événement,
-    - pour chaque article :
-        * génère une requête de recherche Zalando via un LLM (Query Builder),
-        * scrappe Zalando via Apify,
-        * sélectionne le meilleur produit via un LLM (Product Selector),
+    - pour chaque article distinct (dédupliqué entre tenues, recherches en parallèle) :
+        * génère une requête de recherche Zalando : template déterministe pour
+          les articles courants, sinon via un LLM (Query Builder),
+        * interroge la source produits : provider (ex: FederatedProductProvider,
+          plusieurs sources en parallèle) ou directement le scraper Zalando via Apify,
+        * sélectionne le meilleur produit : ranker local si le choix est net,
+          sinon via un LLM (Product Selector),
+    - si une tenue dépasse le budget global, choisit d'autres candidats déjà scrappés
+      (sac à dos à choix multiples) plutôt que de jeter la tenue,
+    - abandonne au plus tôt les tenues qui ne peuvent plus tenir dans le budget,
+    - si l'échéance de la demande approche : requête par défaut, recherche limitée
+      au cache / catalogue local, ranker local au lieu du LLM, recherches bornées
+      au temps restant,
     - renvoie des tenues enrichies avec un produit choisi par article.
     """
 
@@ -34,20 +55,46 @@ class ProductSearchAgent(Agent):
         self,
         llm_client: Optional[LLMClient] = None,
         scraper: Optional[ZalandoScraper] = None,
+        ranker: Optional[ProductRanker] = None,
+        query_templates: Optional[QueryTemplateEngine] = None,
+        chosen_bonus: float = 1.0,
+        max_workers: int = 4,
+        price_band: float = 25.0,
+        provider: Optional[ProductProvider] = None,
+        max_selection_records: int = 500,
     ) -> None:
         super().__init__(name="product_search")
         self.llm = llm_client or LLMClient()
-        self.scraper = scraper or ZalandoScraper()
+        self.provider = provider
+        # Le scraper n'est créé (clé Apify requise) que s'il n'y a pas de provider
+        self.scraper = scraper if scraper is not None or provider is not None else ZalandoScraper()
+        self.ranker = ranker or ProductRanker()
+        self.query_templates = query_templates or QueryTemplateEngine()
+        self.chosen_bonus = chosen_bonus
+        self.max_workers = max_workers
+        self.price_band = price_band
+
+        # Agent partagé par les demandes concurrentes (threads / boucles différents) :
+        # compteurs et selection_records ne sont modifiés que sous self._lock
+        self._lock = threading.Lock()
+        self.pruned_outfits = 0
+        self.cancelled_searches = 0
+        self.deduplicated_items = 0
+        self.collapsed_outfits = 0
+
+        # Dernières décisions prises par le LLM, rejouables avec self.ranker.replay(...)
+        self.selection_records: "deque[Dict[str, Any]]" = deque(maxlen=max_selection_records)
 
         self.query_builder_system = load_prompt("query_builder_system.txt")
         self.product_selector_system = load_prompt("product_selector_system.txt")
 
-    def run(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def arun(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         data attendu :
         {
           "event": EventUnderstanding,
-          "stylist_output": StylistOutput
+          "stylist_output": StylistOutput,
+          "deadline": Deadline  # optionnel
         }
 
         Retour :
@@ -58,61 +105,333 @@ class ProductSearchAgent(Agent):
         event: EventUnderstanding = data["event"]
         stylist_output: StylistOutput = data["stylist_output"]
 
+        budget_global = event.get("budget")
+        outfits = self._collapse_outfits(stylist_output["outfits"], event["gender"])
+
+        pools_by_outfit = await self._search_all_items(event, outfits, budget_global, data.get("deadline"))
+
         resolved_outfits: List[ResolvedOutfit] = []
+        for outfit, pools in zip(outfits, pools_by_outfit):
+            if not pools:
+                continue
+            resolved = self._assemble_outfit(outfit, pools, budget_global)
+            if resolved is not None:
+                resolved_outfits.append(resolved)
+
+        output: ProductSearchOutput = {"outfits": resolved_outfits}
+        return {"product_search_output": output}
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Statistiques des fast paths locaux (templates de requêtes, ranker),
+        de la déduplication et de l'élagage budgétaire.
+        """
+        with self._lock:
+            counters = {
+                "pruned_outfits": self.pruned_outfits,
+                "cancelled_searches": self.cancelled_searches,
+                "deduplicated_items": self.deduplicated_items,
+                "collapsed_outfits": self.collapsed_outfits,
+            }
+        return {
+            "query_templates": self.query_templates.stats(),
+            "ranker": self.ranker.stats(),
+            **counters,
+        }
+
+    # ---------- Recherche concurrente + élagage budgétaire ----------
+
+    async def _search_all_items(
+        self,
+        event: EventUnderstanding,
+        outfits: List[Dict[str, Any]],
+        budget_global: Optional[float],
+        deadline: Optional[Deadline] = None,
+    ) -> List[Optional[List[ItemCandidatePool]]]:
+        """
+        Lance la recherche de tous les articles distincts de la requête en parallèle.
+
+        Déduplication : les articles identiques (même clé canonique, cf. _item_key)
+        sont recherchés une seule fois, avec le max_price le plus haut du groupe,
+        puis le résultat est redistribué à chaque tenue en respectant son propre max_price.
+
+        Élagage : pour chaque tenue on tient une borne inférieure de son coût (somme du
+        candidat le moins cher de chaque article déjà résolu). Dès qu'elle dépasse le
+        budget global, la tenue ne peut plus tenir (même après optimisation) et est
+        abandonnée ; les recherches qui ne servent plus qu'à des tenues abandonnées sont
+        annulées, y compris les runs Apify en cours.
+
+        Retourne, pour chaque tenue (dans l'ordre), ses pools dans l'ordre des articles,
+        ou None si la tenue a été élaguée.
+        """
+        # Groupes d'articles identiques : clé -> article représentatif + utilisateurs
+        groups: Dict[tuple, Dict[str, Any]] = {}
+        for o_idx, outfit in enumerate(outfits):
+            for i_idx, item in enumerate(outfit["items"]):
+                key = self._item_key(item, event["gender"])
+                group = groups.setdefault(key, {"item": dict(item), "users": []})
+                group["item"]["max_price"] = max(
+                    float(group["item"]["max_price"]), float(item["max_price"])
+                )
+                group["users"].append((o_idx, i_idx))
 
-        for outfit in stylist_output["outfits"]:
-            resolved_items: List[OutfitItemResolved] = []
+        with self._lock:
+            self.deduplicated_items += sum(len(g["users"]) - 1 for g in groups.values())
 
-            for item in outfit["items"]:
-                resolved = self._resolve_single_item(
+        pruned = [False for _ in outfits]
+        lower_bounds = [0.0 for _ in outfits]
+        found: List[Dict[int, ItemCandidatePool]] = [{} for _ in outfits]
+        cancel_events = {key: threading.Event() for key in groups}
+
+        semaphore = asyncio.Semaphore(self.max_workers)
+
+        async def search_group(key: tuple) -> Optional[ItemCandidatePool]:
+            async with semaphore:
+                return await self._search_item(
                     event=event,
-                    outfit=outfit,
-                    item=item,
+                    item=groups[key]["item"],
+                    cancel_event=cancel_events[key],
+                    deadline=deadline,
                 )
-                if resolved is not None:
-                    resolved_items.append(resolved)
 
-            if not resolved_items:
-                continue
+        tasks: Dict[asyncio.Task, tuple] = {
+            asyncio.create_task(search_group(key)): key for key in groups
+        }
+        task_by_key = {key: task for task, key in tasks.items()}
+        pending = set(tasks)
+
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    key = tasks[task]
+                    if task.cancelled() or cancel_events[key].is_set():
+                        continue
+
+                    shared_pool = task.result()
+                    if shared_pool is None:
+                        continue
+
+                    for o_idx, i_idx in groups[key]["users"]:
+                        if pruned[o_idx]:
+                            continue
+                        pool = self._fan_out(shared_pool, outfits[o_idx]["items"][i_idx])
+                        if pool is None:
+                            continue
+
+                        found[o_idx][i_idx] = pool
+                        lower_bounds[o_idx] += min(c["price"] for c in pool["candidates"])
+                        if budget_global is None or lower_bounds[o_idx] <= budget_global:
+                            continue
+
+                        print(
+                            f"[ProductSearchAgent] Tenue '{outfits[o_idx]['style_name']}' élaguée : "
+                            f"coût minimum {lower_bounds[o_idx]:.2f} > budget {budget_global}"
+                        )
+                        pruned[o_idx] = True
+                        with self._lock:
+                            self.pruned_outfits += 1
+
+                        # Annuler les recherches qui ne servent plus qu'à des tenues élaguées
+                        for other_key, group in groups.items():
+                            other = task_by_key[other_key]
+                            if other.done() or cancel_events[other_key].is_set():
+                                continue
+                            if all(pruned[u] for u, _ in group["users"]):
+                                cancel_events[other_key].set()
+                                with self._lock:
+                                    self.cancelled_searches += 1
+                                other.cancel()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        return [
+            None if pruned[o_idx] else [found[o_idx][i] for i in sorted(found[o_idx])]
+            for o_idx in range(len(outfits))
+        ]
+
+    def _item_key(self, item: Dict[str, Any], gender: str) -> tuple:
+        """
+        Clé canonique d'un article : nom normalisé, catégorie, genre, tranche de prix.
+        """
+        category = self.query_templates.canonical_category(item["category"])
+        return (
+            normalize_text(item["name"]),
+            category or normalize_text(item["category"]),
+            gender,
+            int(float(item["max_price"]) // self.price_band),
+        )
 
-            total_price = sum(it["chosen_product"]["price"] for it in resolved_items)
+    def _fan_out(
+        self,
+        shared_pool: ItemCandidatePool,
+        item: Dict[str, Any],
+    ) -> Optional[ItemCandidatePool]:
+        """
+        Adapte le pool d'un article partagé au max_price propre à une tenue :
+        on garde les candidats abordables et, si le choix du sélecteur ne l'est pas,
+        le meilleur score restant.
+        """
+        max_price = float(item["max_price"])
+        kept = [
+            idx for idx, c in enumerate(shared_pool["candidates"]) if c["price"] <= max_price
+        ]
+        if not kept:
+            return None
+
+        scores = [shared_pool["scores"][idx] for idx in kept]
+        if shared_pool["chosen_index"] in kept:
+            chosen_index = kept.index(shared_pool["chosen_index"])
+        else:
+            chosen_index = max(range(len(kept)), key=lambda k: scores[k])
+
+        return ItemCandidatePool(
+            item=item,  # type: ignore
+            candidates=[shared_pool["candidates"][idx] for idx in kept],
+            scores=scores,
+            chosen_index=chosen_index,
+        )
 
-            # Vérifier le budget global (si défini)
-            budget_global = event.get("budget")
-            if budget_global is not None and total_price > budget_global:
-                # On pourrait ici implémenter une stratégie plus intelligente,
-                # pour l'instant on ignore la tenue si elle dépasse le budget réel.
+    def _collapse_outfits(
+        self,
+        outfits: List[Dict[str, Any]],
+        gender: str,
+    ) -> List[Dict[str, Any]]:
+        """
+        Fusionne les tenues quasi identiques (même ensemble d'articles canoniques)
+        avant la recherche : seule la première est conservée.
+        """
+        seen = set()
+        unique: List[Dict[str, Any]] = []
+        for outfit in outfits:
+            signature = frozenset(self._item_key(item, gender) for item in outfit["items"])
+            if signature in seen:
+                with self._lock:
+                    self.collapsed_outfits += 1
                 continue
+            seen.add(signature)
+            unique.append(outfit)
+        return unique
 
-            resolved_outfits.append(
-                ResolvedOutfit(
-                    style_name=outfit["style_name"],
-                    description=outfit["description"],
-                    formality_level=outfit["formality_level"],
-                    total_budget=round(total_price, 2),
-                    items=resolved_items,
-                )
+    def _assemble_outfit(
+        self,
+        outfit: Dict[str, Any],
+        pools: List[ItemCandidatePool],
+        budget_global: Optional[float],
+    ) -> Optional[ResolvedOutfit]:
+        choice = [pool["chosen_index"] for pool in pools]
+        total_price = self._total_price(pools, choice)
+
+        # Vérifier le budget global (si défini) : si la sélection dépasse,
+        # on répare la tenue localement avec les candidats déjà scrappés.
+        if budget_global is not None and total_price > budget_global:
+            repaired = optimize_outfit(
+                prices=[[c["price"] for c in pool["candidates"]] for pool in pools],
+                scores=[pool["scores"] for pool in pools],
+                budget=float(budget_global),
             )
-
-        output: ProductSearchOutput = {"outfits": resolved_outfits}
-        return {"product_search_output": output}
+            if repaired is None:
+                # Même les candidats les moins chers dépassent le budget
+                return None
+            choice = repaired
+            total_price = self._total_price(pools, choice)
+
+        return ResolvedOutfit(
+            style_name=outfit["style_name"],
+            description=outfit["description"],
+            formality_level=outfit["formality_level"],
+            total_budget=round(total_price, 2),
+            items=[self._to_resolved(pool, idx) for pool, idx in zip(pools, choice)],
+        )
 
     # ---------- Résolution d'un seul item ----------
 
-    def _resolve_single_item(
+    async def _search_item(
         self,
         event: EventUnderstanding,
-        outfit: Dict[str, Any],
         item: Dict[str, Any],
-    ) -> Optional[OutfitItemResolved]:
+        cancel_event: Optional[threading.Event] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> Optional[ItemCandidatePool]:
         """
-        Résout un item :
-        - construit la requête (QueryBuilder LLM)
+        Recherche un item :
+        - construit la requête (template ou QueryBuilder LLM)
         - scrappe Zalando
-        - choisit le meilleur produit (ProductSelector LLM)
+        - choisit le meilleur produit (ranker local ou ProductSelector LLM)
+        Retourne tous les candidats scorés : l'optimiseur budget peut en choisir un autre.
+        Retourne None si rien n'est trouvé ou si la recherche a été annulée (cancel_event).
+        """
+        # 1) Query Builder (template ou LLM)
+        qb_input = self._qb_input(event, item)
+        search_text, gender_path, max_price = await self._build_query(qb_input, deadline)
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+
+        # 2) Source produits : provider fédéré ou scraper Zalando via Apify
+        #    (le run est interrompu si la tenue est annulée)
+        candidates: List[ProductCandidate] = await self._scrape(
+            search_text=search_text,
+            gender_path=gender_path,
+            max_price=max_price,
+            cancel_event=cancel_event,
+            category=item["category"],
+            deadline=deadline,
+        )
+        if not candidates:
+            return None
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+
+        # 3) Sélection (ranker local ou Product Selector LLM)
+        selector_input = self._selector_input(event, item, candidates)
+        scores = self.ranker.score({**selector_input, "candidates": candidates}, max_price)
+        chosen_index = await self._choose_index(selector_input, scores, max_price, deadline)
+
+        # Le produit sélectionné reste prioritaire pour l'optimiseur budget
+        pool_scores = [float(sc) for sc in scores]
+        pool_scores[chosen_index] += self.chosen_bonus
+
+        return ItemCandidatePool(
+            item=item,  # type: ignore
+            candidates=candidates,
+            scores=pool_scores,
+            chosen_index=chosen_index,
+        )
+
+    async def awarm_item(
+        self,
+        event: EventUnderstanding,
+        item: Dict[str, Any],
+        allow_live: bool = True,
+    ) -> str:
+        """
+        Préchauffage d'un article (job hors pointe, cf. core/prewarm.py) : mêmes étapes
+        que _search_item (requête, recherche, sélection) pour remplir le cache de scrapes,
+        le catalogue et le cache LLM, sans rien renvoyer à l'utilisateur.
+        allow_live=False : un article absent des sources locales n'est pas scrappé (budget Apify).
+        Retourne "warm" (déjà servi localement), "scraped" (source live interrogée) ou "skipped".
         """
-        # 1) Query Builder LLM
-        qb_input: QueryBuilderInput = {
+        if not isinstance(self.provider, FederatedProductProvider):
+            raise ValueError("Préchauffage : un FederatedProductProvider est nécessaire")
+
+        qb_input = self._qb_input(event, item)
+        search_text, gender_path, max_price = await self._build_query(qb_input)
+        query = item_query(search_text, gender_path, max_price, category=item["category"])
+
+        warm = self.provider.is_warm(query)
+        if not warm and not allow_live:
+            return "skipped"
+        candidates = await self.provider.asearch_candidates(query)
+        if candidates:
+            selector_input = self._selector_input(event, item, candidates)
+            scores = self.ranker.score({**selector_input, "candidates": candidates}, max_price)
+            await self._choose_index(selector_input, scores, max_price)
+        return "warm" if warm else "scraped"
+
+    @staticmethod
+    def _qb_input(event: EventUnderstanding, item: Dict[str, Any]) -> QueryBuilderInput:
+        return {
             "item_name": item["name"],
             "category": item["category"],
             "max_price": float(item["max_price"]),
@@ -122,19 +441,13 @@ class ProductSearchAgent(Agent):
             "gender": event["gender"],
         }
 
-        search_text, gender_path, max_price = self._build_query(qb_input)
-
-        # 2) Scraper Zalando via Apify
-        candidates: List[ProductCandidate] = self.scraper.search(
-            search_text=search_text,
-            gender_path=gender_path,
-            max_price=max_price,
-        )
-        if not candidates:
-            return None
-
-        # 3) Product Selector LLM
-        selector_input: ProductSelectorInput = {
+    @staticmethod
+    def _selector_input(
+        event: EventUnderstanding,
+        item: Dict[str, Any],
+        candidates: List[ProductCandidate],
+    ) -> ProductSelectorInput:
+        return {
             "item_name": item["name"],
             "category": item["category"],
             "style": event["style"],
@@ -144,38 +457,103 @@ class ProductSearchAgent(Agent):
             "candidates": candidates[:5],  # on limite à 5 pour le LLM
         }
 
-        chosen_product = self._select_product(selector_input, candidates)
-
-        if chosen_product is None:
-            return None
-
+    @staticmethod
+    def _to_resolved(pool: ItemCandidatePool, index: int) -> OutfitItemResolved:
+        item = pool["item"]
         return OutfitItemResolved(
             name=item["name"],
             category=item["category"],
             max_price=float(item["max_price"]),
-            chosen_product=chosen_product,
+            chosen_product=pool["candidates"][index],  # type: ignore
         )
 
+    @staticmethod
+    def _total_price(pools: List[ItemCandidatePool], choice: List[int]) -> float:
+        return sum(pool["candidates"][idx]["price"] for pool, idx in zip(pools, choice))
+
+    async def _scrape(
+        self,
+        search_text: str,
+        gender_path: str,
+        max_price: float,
+        cancel_event: Optional[threading.Event],
+        category: Optional[str] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> List[ProductCandidate]:
+        if self.provider is not None:
+            # Tenue élaguée : la tâche est annulée, le provider annule ses sources en cours
+            query = item_query(search_text, gender_path, max_price, category=category)
+            if isinstance(self.provider, FederatedProductProvider):
+                if deadline is None:
+                    return await self.provider.asearch_candidates(query)
+                local_only = not deadline.allows("live_search")
+                if local_only:
+                    deadline.degrade("product_search", "cached_only_search")
+                # Résultats partiels à l'échéance plutôt qu'une recherche perdue
+                return await self.provider.asearch_candidates(
+                    query,
+                    deadline_seconds=deadline.cap(self.provider.deadline_seconds),
+                    local_only=local_only,
+                )
+            search = self.provider.asearch_candidates(query)
+        elif hasattr(self.scraper, "asearch"):
+            search = self.scraper.asearch(
+                search_text=search_text,
+                gender_path=gender_path,
+                max_price=max_price,
+                cancel_event=cancel_event,
+            )
+        else:
+            search = asyncio.to_thread(
+                self.scraper.search,
+                search_text=search_text,
+                gender_path=gender_path,
+                max_price=max_price,
+                cancel_event=cancel_event,
+            )
+
+        timeout = deadline.cap() if deadline is not None else None
+        try:
+            return await asyncio.wait_for(search, timeout=timeout)
+        except asyncio.TimeoutError:
+            # L'annulation interrompt le run Apify en cours
+            deadline.degrade("product_search", "search_timeout")  # type: ignore[union-attr]
+            return []
+
     # ---------- Sous-fonctions LLM ----------
 
-    def _build_query(
+    async def _build_query(
         self,
         qb_input: QueryBuilderInput,
+        deadline: Optional[Deadline] = None,
     ) -> tuple[str, str, float]:
-        user_prompt = (
-            "Voici les informations sur l'article à rechercher :\n\n"
-            + json.dumps(qb_input, ensure_ascii=False, indent=2)
-            + "\n\nConstruit la requête de recherche Zalando appropriée."
+        templated = self.query_templates.build(qb_input)
+        if templated is not None:
+            return templated
+
+        if deadline is not None and not deadline.allows("llm_query"):
+            deadline.degrade("product_search", "default_query")
+            return self._default_query(qb_input)
+
+        user_prompt = prompt_builder.build(
+            "query_builder",
+            "Voici les informations sur l'article à rechercher :\n\n",
+            qb_input,
+            "\n\nConstruit la requête de recherche Zalando appropriée.",
+        )
+        start = time.perf_counter()
+        raw = await self.achat_validated(
+            self.query_builder_system,
+            user_prompt,
+            agent="query_builder",
+            validate=_valid_query,
         )
-        raw = self.llm.chat(self.query_builder_system, user_prompt)
+        self.query_templates.record_llm_latency(time.perf_counter() - start)
 
         try:
             parsed: QueryBuilderOutput = json.loads(raw)
         except json.JSONDecodeError:
-            # Fallback simple
-            search_text = f"{qb_input['item_name']} {qb_input['category']} {qb_input['gender']}"
-            gender_path = qb_input["gender"] if qb_input["gender"] in ("homme", "femme") else "unisex"
-            return search_text, gender_path, qb_input["max_price"]
+            return self._default_query(qb_input)
 
         search_text = parsed.get("search_text") or qb_input["item_name"]
         gender_path = parsed.get("gender_path") or qb_input["gender"]
@@ -190,24 +568,69 @@ class ProductSearchAgent(Agent):
 
         return search_text, gender_path, max_price
 
-    def _select_product(
+    @staticmethod
+    def _default_query(qb_input: QueryBuilderInput) -> tuple[str, str, float]:
+        # Fallback simple
+        search_text = f"{qb_input['item_name']} {qb_input['category']} {qb_input['gender']}"
+        gender_path = qb_input["gender"] if qb_input["gender"] in ("homme", "femme") else "unisex"
+        return search_text, gender_path, qb_input["max_price"]
+
+    async def _choose_index(
+        self,
+        selector_input: ProductSelectorInput,
+        scores: Any,
+        max_price: float,
+        deadline: Optional[Deadline] = None,
+    ) -> int:
+        """
+        Fast path : si le ranker local a une marge suffisante, on évite l'appel LLM.
+        Sinon le LLM tranche et on mesure l'accord avec le ranker.
+        Échéance proche : le meilleur score local est pris même sans marge.
+        """
+        shown_scores = scores[: len(selector_input["candidates"])]
+        local_idx = self.ranker.confident_choice(shown_scores)
+        if local_idx is not None:
+            return local_idx
+        if deadline is not None and not deadline.allows("llm_selector"):
+            deadline.degrade("product_search", "local_selector")
+            return int(shown_scores.argmax()) if len(shown_scores) else 0
+
+        idx = await self._select_product(selector_input, selector_input["candidates"])
+        self.ranker.record_llm_choice(shown_scores, idx)
+        with self._lock:
+            self.selection_records.append(
+                {"selector_input": selector_input, "max_price": max_price, "llm_index": idx}
+            )
+        return idx
+
+    async def _select_product(
         self,
         selector_input: ProductSelectorInput,
         candidates: List[ProductCandidate],
-    ) -> Optional[ProductCandidate]:
-        user_prompt = (
-            "Voici le contexte et les produits candidats pour un article de la tenue :\n\n"
-            + json.dumps(selector_input, ensure_ascii=False, indent=2)
-            + "\n\nChoisis le meilleur produit en respectant les consignes du système."
+    ) -> int:
+        """
+        Demande au LLM l'index du meilleur candidat (0 = le moins cher en fallback).
+        """
+        # Candidats réduits à id / nom / marque / prix / couleur (pas d'URL ni d'image)
+        user_prompt = prompt_builder.build(
+            "product_selector",
+            "Voici le contexte et les produits candidats pour un article de la tenue :\n\n",
+            selector_input,
+            "\n\nChoisis le meilleur produit en respectant les consignes du système.",
         )
 
-        raw = self.llm.chat(self.product_selector_system, user_prompt)
+        raw = await self.achat_validated(
+            self.product_selector_system,
+            user_prompt,
+            agent="product_selector",
+            validate=lambda r: _valid_selection(r, len(candidates)),
+        )
 
         try:
             parsed: ProductSelectorOutput = json.loads(raw)
         except json.JSONDecodeError:
             # Fallback : prendre le moins cher
-            return candidates[0] if candidates else None
+            return 0
 
         idx = parsed.get("chosen_index", 0)
         if not isinstance(idx, int):
@@ -216,4 +639,17 @@ class ProductSearchAgent(Agent):
         if idx < 0 or idx >= len(candidates):
             idx = 0
 
-        return candidates[idx]
+        return idx
+
+
+def _valid_query(raw: str) -> bool:
+    parsed = parse_json_object(raw)
+    return parsed is not None and isinstance(parsed.get("search_text"), str) and bool(parsed["search_text"].strip())
+
+
+def _valid_selection(raw: str, nb_candidates: int) -> bool:
+    parsed = parse_json_object(raw)
+    if parsed is None:
+        return False
+    idx = parsed.get("chosen_index")
+    return isinstance(idx, int) and 0 <= idx < nb_candidates
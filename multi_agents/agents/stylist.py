@@ -1,9 +1,12 @@
 from typing import Dict, Any, Optional
 import json
 
-from .base import Agent
+from .base import Agent, parse_json_object
 from multi_agents.core.llm_client import LLMClient
+from multi_agents.core.async_utils import achat
 from multi_agents.core.prompts import load_prompt
+from multi_agents.core.prompt_builder import prompt_builder
+from multi_agents.core.deadline import Deadline
 from multi_agents.core.models import (
     EventUnderstanding,
     StylistOutput,
@@ -18,6 +21,7 @@ class StylistAgent(Agent):
     - propose une liste d'idées de tenues (outfits)
     - pour chaque tenue, gère un budget max par article
     - s'assure que la somme des max_price par tenue ne dépasse pas le budget global
+    - si l'échéance de la demande est proche, ne garde que 1 ou 2 tenues
     - renvoie un JSON structuré (StylistOutput)
     """
 
@@ -26,11 +30,13 @@ class StylistAgent(Agent):
         self.llm = llm_client or LLMClient()
         self.system_prompt = load_prompt("stylist_system.txt")
 
-    def run(self, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def arun(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """
         data attendu :
         {
-          "event": EventUnderstanding
+          "event": EventUnderstanding,
+          "description": str,  # optionnel : demande brute (contraintes hors lexiques)
+          "deadline": Deadline  # optionnel
         }
 
         Retour :
@@ -40,15 +46,17 @@ class StylistAgent(Agent):
         """
         event: EventUnderstanding = data["event"]
 
-        user_prompt = self._build_user_prompt(event)
+        user_prompt = self._build_user_prompt(event, data.get("description"))
 
-        raw_response = self.llm.chat(self.system_prompt, user_prompt)
+        raw_response = await achat(
+            self.llm, self.system_prompt, user_prompt, agent="stylist", validate=_valid_stylist_output
+        )
 
         try:
             parsed: StylistOutput = json.loads(raw_response)
         except json.JSONDecodeError:
             print("[StylistAgent] JSON decode failed, raw LLM output:")
-            print(raw)
+            print(raw_response)
 
             parsed = {"outfits": []}  # fallback
 
@@ -56,20 +64,38 @@ class StylistAgent(Agent):
         budget_global = event.get("budget")
         safe_outfits = self._enforce_budget(parsed, budget_global)
 
+        deadline: Optional[Deadline] = data.get("deadline")
+        if deadline is not None:
+            safe_outfits = self._limit_outfits(safe_outfits, deadline)
+
         return {"outfits": safe_outfits}
 
-    def _build_user_prompt(self, event: EventUnderstanding) -> str:
+    @staticmethod
+    def _limit_outfits(outfits: list[OutfitPlan], deadline: Deadline) -> list[OutfitPlan]:
+        """
+        Moins de tenues = moins d'articles à rechercher et d'aperçus à générer.
+        """
+        if deadline.allows("all_outfits"):
+            return outfits
+        keep = 2 if deadline.allows("two_outfits") else 1
+        if len(outfits) > keep:
+            deadline.degrade("stylist", "fewer_outfits", f"{len(outfits)} -> {keep}")
+        return outfits[:keep]
+
+    def _build_user_prompt(self, event: EventUnderstanding, description: Optional[str] = None) -> str:
         """
         Le user prompt ne contient QUE les données d'entrée, pas les consignes.
+        La demande brute accompagne l'événement : une contrainte que l'analyse n'a pas
+        structurée ("pas en costume") reste visible du styliste.
         """
-        lines = []
-        lines.append("Voici la compréhension de l'événement par l'agent précédent :\n")
-        lines.append(json.dumps(event, ensure_ascii=False, indent=2))
-        lines.append(
-            "\nPropose des tenues adaptées à cet événement et à ce style, "
-            "en respectant le budget si présent."
+        payload = {**event, "description": description} if description else event
+        return prompt_builder.build(
+            "stylist",
+            "Voici la compréhension de l'événement par l'agent précédent :\n\n",
+            payload,
+            "\n\nPropose des tenues adaptées à cet événement et à ce style, "
+            "en respectant le budget si présent.",
         )
-        return "\n".join(lines)
 
     def _enforce_budget(
         self,
@@ -97,3 +123,11 @@ class StylistAgent(Agent):
             outfits.append(outfit)
 
         return outfits
+
+
+def _valid_stylist_output(raw: str) -> bool:
+    parsed = parse_json_object(raw)
+    outfits = parsed.get("outfits") if parsed is not None else None
+    return isinstance(outfits, list) and bool(outfits) and all(
+        isinstance(o, dict) and isinstance(o.get("items"), list) for o in outfits
+    )
@@ -0,0 +1,60 @@
+import asyncio
+from typing import Any, List, Optional
+
+from multi_agents.core.models import Product, ProductCandidate, ProductSearchItemQuery
+from multi_agents.core.product_provider import ProductProvider, candidate_to_product
+
+
+class ApifyProductProvider(ProductProvider):
+    """
+    Adaptateur ProductProvider autour de ZalandoScraper (actor Apify).
+    Les candidats normalisés par le scraper sont renvoyés tels quels ; avec
+    asearch_collecting, tous les produits du run sont transmis (catalogue).
+    """
+
+    name = "apify"
+
+    def __init__(self, scraper: Optional[Any] = None) -> None:
+        if scraper is None:
+            from multi_agents.core.zalando_scraper import ZalandoScraper
+
+            scraper = ZalandoScraper()
+        self.scraper = scraper
+
+    def search_products(self, query: ProductSearchItemQuery) -> List[Product]:
+        candidates = self.scraper.search(**self._scraper_args(query))
+        return [candidate_to_product(c, query, source="Zalando") for c in candidates]
+
+    async def asearch_products(self, query: ProductSearchItemQuery) -> List[Product]:
+        candidates = await self.asearch_candidates(query)
+        return [candidate_to_product(c, query, source="Zalando") for c in candidates]
+
+    async def asearch_candidates(self, query: ProductSearchItemQuery) -> List[ProductCandidate]:
+        # L'annulation de la tâche interrompt le run Apify (cf. ZalandoScraper.asearch)
+        if hasattr(self.scraper, "asearch"):
+            return await self.scraper.asearch(**self._scraper_args(query))
+        return await asyncio.to_thread(self.scraper.search, **self._scraper_args(query))
+
+    async def asearch_collecting(
+        self,
+        query: ProductSearchItemQuery,
+        collected: List[ProductCandidate],
+    ) -> List[ProductCandidate]:
+        # Tout le run (pas seulement les max_results renvoyés) part au catalogue
+        if not getattr(self.scraper, "collects_all", False):
+            return await super().asearch_collecting(query, collected)
+        if hasattr(self.scraper, "asearch"):
+            return await self.scraper.asearch(**self._scraper_args(query), collected=collected)
+        return await asyncio.to_thread(self.scraper.search, **self._scraper_args(query), collected=collected)
+
+    @staticmethod
+    def _scraper_args(query: ProductSearchItemQuery) -> dict:
+        attributes = query.get("attributes", {})
+        gender_path = attributes.get("gender")
+        if gender_path not in ("homme", "femme", "unisex"):
+            gender_path = "unisex"
+        return {
+            "search_text": attributes.get("search_text") or query["role"],
+            "gender_path": gender_path,
+            "max_price": float(query["max_price"]),
+        }
@@ -0,0 +1,54 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+from multi_agents.core.http_client import aclose_async_http_client
+
+T = TypeVar("T")
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    Exécute une coroutine depuis du code synchrone (API sync = wrapper de l'API async).
+    Si une boucle tourne déjà dans ce thread (notebook, serveur async...),
+    on exécute la coroutine dans un thread dédié pour ne pas la bloquer.
+    """
+
+    async def _main() -> T:
+        try:
+            return await coro
+        finally:
+            # Le client HTTP async est lié à cette boucle éphémère
+            await aclose_async_http_client()
+
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(_main())
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, _main()).result()
+
+
+async def achat(
+    llm: Any,
+    system_prompt: str,
+    user_prompt: str,
+    agent: Optional[str] = None,
+    escalate: bool = False,
+    validate: Optional[Callable[[str], bool]] = None,
+) -> str:
+    """
+    Appel LLM asynchrone ; les clients qui n'exposent que chat() (ex: fakes de test)
+    sont exécutés dans un thread.
+    agent : nom de l'appelant (modèle routé, latences / hedging par agent si le client le gère).
+    escalate : forcer le grand modèle pour cet agent.
+    validate : la réponse n'est mise en cache (LLMResponseCache) que si validate(réponse) est vrai.
+    """
+    if agent is not None and hasattr(llm, "for_agent"):
+        llm = llm.for_agent(agent, escalate=escalate)
+    if validate is not None and getattr(llm, "caches_validated", False):
+        return await llm.achat(system_prompt, user_prompt, validate=validate)
+    if hasattr(llm, "achat"):
+        return await llm.achat(system_prompt, user_prompt)
+    return await asyncio.to_thread(llm.chat, system_prompt, user_prompt)
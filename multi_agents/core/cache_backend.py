@@ -0,0 +1,618 @@
+import os
+import time
+import uuid
+import json
+import sqlite3
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "cache.sqlite3"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    encoding TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS cache_entries_lru ON cache_entries (accessed_at);
+
+-- Taille totale tenue à jour à chaque écriture (l'éviction ne parcourt pas la table)
+CREATE TABLE IF NOT EXISTS cache_totals (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_totals (id, bytes) SELECT 1, COALESCE(SUM(size), 0) FROM cache_entries;
+CREATE TRIGGER IF NOT EXISTS cache_entries_insert AFTER INSERT ON cache_entries BEGIN
+    UPDATE cache_totals SET bytes = bytes + new.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entries_update AFTER UPDATE OF size ON cache_entries BEGIN
+    UPDATE cache_totals SET bytes = bytes + new.size - old.size WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entries_delete AFTER DELETE ON cache_entries BEGIN
+    UPDATE cache_totals SET bytes = bytes - old.size WHERE id = 1;
+END;
+
+CREATE TABLE IF NOT EXISTS leases (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+
+CREATE TABLE IF NOT EXISTS counters (
+    namespace TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class CacheBackend(ABC):
+    """
+    Stockage clé -> valeur commun aux caches (réponses LLM, scrapes, aperçus,
+    transcriptions), découpé en espaces de noms.
+    - get / set / delete ; None n'est jamais stocké (get renvoie None = absent)
+    - get_or_compute : une seule exécution de compute par clé, même entre process ;
+      les autres appelants attendent le résultat au lieu de le recalculer
+    - éviction par taille (octets / nombre d'entrées), la moins récemment lue d'abord
+    """
+
+    poll_interval: float = 0.05
+    lease_seconds: float = 60.0
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Valeur en cache (compte un hit / miss) ou None."""
+
+    @abstractmethod
+    def peek(self, namespace: str, key: str) -> Optional[Any]:
+        """Comme get, sans compter ni rafraîchir l'entrée (attente d'un calcul en cours)."""
+
+    @abstractmethod
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, namespace: str, key: str) -> None:
+        ...
+
+    @abstractmethod
+    def acquire(self, namespace: str, key: str, lease_seconds: float) -> Optional[str]:
+        """Réserve le calcul d'une clé : jeton du bail, ou None si un autre appelant la calcule déjà."""
+
+    @abstractmethod
+    def renew(self, namespace: str, key: str, token: str, lease_seconds: float) -> bool:
+        """Prolonge le bail ; False s'il a été perdu (expiré puis repris par un autre)."""
+
+    @abstractmethod
+    def release(self, namespace: str, key: str, token: str) -> None:
+        ...
+
+    @abstractmethod
+    def purge(self, namespace: Optional[str] = None) -> int:
+        """Supprime les entrées expirées ; renvoie leur nombre."""
+
+    @abstractmethod
+    def stats(self, namespace: Optional[str] = None) -> Dict[str, Any]:
+        ...
+
+    def close(self) -> None:
+        pass
+
+    def namespace(self, name: str, ttl_seconds: Optional[float] = None) -> "CacheNamespace":
+        return CacheNamespace(self, name, ttl_seconds)
+
+    def get_or_compute(
+        self,
+        namespace: str,
+        key: str,
+        compute: Callable[[], Any],
+        ttl_seconds: Optional[float] = None,
+        lease_seconds: Optional[float] = None,
+    ) -> Any:
+        """
+        Valeur en cache, sinon compute() (résultat stocké s'il n'est pas None).
+        Un appelant qui trouve la clé déjà réservée attend que le calcul se termine ;
+        si le détenteur échoue ou disparaît (bail expiré), il calcule lui-même.
+        Le bail est renouvelé tant que compute tourne : un calcul long n'est pas doublé.
+        """
+        value = self.get(namespace, key)
+        if value is not None:
+            return value
+        lease = lease_seconds or self.lease_seconds
+        while True:
+            token = self.acquire(namespace, key, lease)
+            if token is not None:
+                done = threading.Event()
+                renewer = threading.Thread(
+                    target=self._renew_until, args=(namespace, key, token, lease, done), daemon=True
+                )
+                renewer.start()
+                try:
+                    value = self.peek(namespace, key)
+                    if value is None:
+                        value = compute()
+                        if value is not None:
+                            self.set(namespace, key, value, ttl_seconds)
+                    return value
+                finally:
+                    done.set()
+                    renewer.join()
+                    self.release(namespace, key, token)
+            time.sleep(self.poll_interval)
+            value = self.peek(namespace, key)
+            if value is not None:
+                return value
+
+    async def aget_or_compute(
+        self,
+        namespace: str,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl_seconds: Optional[float] = None,
+        lease_seconds: Optional[float] = None,
+    ) -> Any:
+        """
+        Version async de get_or_compute : compute est une coroutine ; les accès au
+        stockage (SQLite bloquant) passent par asyncio.to_thread, l'attente et le
+        renouvellement du bail ne bloquent pas la boucle d'événements.
+        """
+        value = await asyncio.to_thread(self.get, namespace, key)
+        if value is not None:
+            return value
+        lease = lease_seconds or self.lease_seconds
+        while True:
+            token = await asyncio.to_thread(self.acquire, namespace, key, lease)
+            if token is not None:
+                renewer = asyncio.ensure_future(self._arenew_forever(namespace, key, token, lease))
+                try:
+                    value = await asyncio.to_thread(self.peek, namespace, key)
+                    if value is None:
+                        value = await compute()
+                        if value is not None:
+                            await asyncio.to_thread(self.set, namespace, key, value, ttl_seconds)
+                    return value
+                finally:
+                    renewer.cancel()
+                    await asyncio.to_thread(self.release, namespace, key, token)
+            await asyncio.sleep(self.poll_interval)
+            value = await asyncio.to_thread(self.peek, namespace, key)
+            if value is not None:
+                return value
+
+    def _renew_until(self, namespace: str, key: str, token: str, lease: float, done: threading.Event) -> None:
+        # Renouvelle au tiers du bail : deux renouvellements manqués avant l'expiration
+        while not done.wait(lease / 3):
+            if not self.renew(namespace, key, token, lease):
+                return
+
+    async def _arenew_forever(self, namespace: str, key: str, token: str, lease: float) -> None:
+        while True:
+            await asyncio.sleep(lease / 3)
+            if not await asyncio.to_thread(self.renew, namespace, key, token, lease):
+                return
+
+
+class CacheNamespace:
+    """
+    Vue d'un backend limitée à un espace de noms (et à un TTL par défaut).
+    """
+
+    def __init__(self, backend: CacheBackend, name: str, ttl_seconds: Optional[float] = None) -> None:
+        self.backend = backend
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.backend.get(self.name, key)
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        self.backend.set(self.name, key, value, ttl_seconds if ttl_seconds is not None else self.ttl_seconds)
+
+    def delete(self, key: str) -> None:
+        self.backend.delete(self.name, key)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], lease_seconds: Optional[float] = None) -> Any:
+        return self.backend.get_or_compute(self.name, key, compute, self.ttl_seconds, lease_seconds)
+
+    async def aget_or_compute(
+        self, key: str, compute: Callable[[], Awaitable[Any]], lease_seconds: Optional[float] = None
+    ) -> Any:
+        return await self.backend.aget_or_compute(self.name, key, compute, self.ttl_seconds, lease_seconds)
+
+    def purge(self) -> int:
+        return self.backend.purge(self.name)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.backend.stats(self.name)
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Backend en mémoire (un seul process) : OrderedDict LRU borné en entrées et/ou en
+    octets (taille mesurée sur la valeur sérialisée). Défaut des caches sans backend.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        # (namespace, key) -> (valeur, taille, expire_à)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[Any, int, Optional[float]]]" = OrderedDict()
+        self._leases: Dict[Tuple[str, str], Tuple[str, float]] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        with self._lock:
+            value = self._lookup((namespace, key))
+            counters = self._counters.setdefault(namespace, {"hits": 0, "misses": 0})
+            if value is None:
+                counters["misses"] += 1
+                return None
+            counters["hits"] += 1
+            self._entries.move_to_end((namespace, key))
+            return value
+
+    def peek(self, namespace: str, key: str) -> Optional[Any]:
+        with self._lock:
+            return self._lookup((namespace, key))
+
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        if value is None:
+            return
+        size = len(_encode(value)[0]) if self.max_bytes else 0
+        expires_at = time.time() + ttl_seconds if ttl_seconds is not None else None
+        with self._lock:
+            self._remove((namespace, key))
+            self._entries[(namespace, key)] = (value, size, expires_at)
+            self._size += size
+            self._evict()
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._remove((namespace, key))
+
+    def acquire(self, namespace: str, key: str, lease_seconds: float) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            lease = self._leases.get((namespace, key))
+            if lease is not None and lease[1] > now:
+                return None
+            token = uuid.uuid4().hex
+            self._leases[(namespace, key)] = (token, now + lease_seconds)
+            return token
+
+    def renew(self, namespace: str, key: str, token: str, lease_seconds: float) -> bool:
+        with self._lock:
+            lease = self._leases.get((namespace, key))
+            if lease is None or lease[0] != token:
+                return False
+            self._leases[(namespace, key)] = (token, time.time() + lease_seconds)
+            return True
+
+    def release(self, namespace: str, key: str, token: str) -> None:
+        with self._lock:
+            lease = self._leases.get((namespace, key))
+            if lease is not None and lease[0] == token:
+                del self._leases[(namespace, key)]
+
+    def purge(self, namespace: Optional[str] = None) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [
+                k for k, (_, _, expires_at) in self._entries.items()
+                if expires_at is not None and expires_at < now and (namespace is None or k[0] == namespace)
+            ]
+            for k in expired:
+                self._remove(k)
+            return len(expired)
+
+    def stats(self, namespace: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            keys = [k for k in self._entries if namespace is None or k[0] == namespace]
+            names = [namespace] if namespace is not None else list(self._counters)
+            hits = sum(self._counters.get(n, {}).get("hits", 0) for n in names)
+            misses = sum(self._counters.get(n, {}).get("misses", 0) for n in names)
+            return {
+                "entries": len(keys),
+                "bytes": sum(self._entries[k][1] for k in keys),
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else None,
+            }
+
+    def _lookup(self, k: Tuple[str, str]) -> Optional[Any]:
+        entry = self._entries.get(k)
+        if entry is None:
+            return None
+        if entry[2] is not None and entry[2] < time.time():
+            self._remove(k)
+            return None
+        return entry[0]
+
+    def _remove(self, k: Tuple[str, str]) -> None:
+        entry = self._entries.pop(k, None)
+        if entry is not None:
+            self._size -= entry[1]
+
+    def _evict(self) -> None:
+        while self._entries and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self._size > self.max_bytes)
+        ):
+            _, (_, size, _) = self._entries.popitem(last=False)
+            self._size -= size
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Backend partagé par tous les process de la machine (UI Streamlit, workers du
+    pipeline, préchauffage, worker de transcription) : un fichier SQLite en WAL.
+    - valeurs stockées en JSON (ou en bytes bruts), jamais en pickle : un fichier
+      modifiable ne permet pas d'exécuter du code dans les process qui le lisent
+    - lectures par simple SELECT (pas de verrou d'écriture) ; hits / misses et dates
+      de lecture sont accumulés en mémoire et écrits par lots (flush_every lectures
+      ou flush_interval secondes) : un taux de succès unique pour tous les process
+    - taille totale tenue à jour par triggers ; au-delà de max_bytes, les entrées les
+      moins récemment lues sont supprimées, quel que soit leur espace de noms
+    - get_or_compute atomique entre process : bail (table leases) pris sous BEGIN
+      IMMEDIATE et renouvelé tant que le calcul tourne
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_bytes: int = 512 * 1024 * 1024,
+        flush_every: int = 64,
+        flush_interval: float = 5.0,
+    ) -> None:
+        self.path = path or os.getenv("CACHE_PATH") or DEFAULT_CACHE_PATH
+        self.max_bytes = max_bytes
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # isolation_level=None : transactions explicites (BEGIN IMMEDIATE pour les écritures)
+        self._conn = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            if self.path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+        # Compteurs et dates de lecture pas encore écrits dans le fichier
+        self._pending_counts: Dict[str, List[int]] = {}
+        self._pending_touches: Dict[Tuple[str, str], float] = {}
+        self._pending_reads = 0
+        self._last_flush = time.monotonic()
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        row = self._select(namespace, key)
+        with self._lock:
+            counts = self._pending_counts.setdefault(namespace, [0, 0])
+            counts[0 if row is not None else 1] += 1
+            if row is not None:
+                self._pending_touches[(namespace, key)] = time.time()
+            self._pending_reads += 1
+            due = (
+                self._pending_reads >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+        return _decode(*row) if row is not None else None
+
+    def peek(self, namespace: str, key: str) -> Optional[Any]:
+        row = self._select(namespace, key)
+        return _decode(*row) if row is not None else None
+
+    def set(self, namespace: str, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        if value is None:
+            return
+        blob, encoding = _encode(value)
+        now = time.time()
+        expires_at = now + ttl_seconds if ttl_seconds is not None else None
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # UPSERT (et non INSERT OR REPLACE) : les triggers de taille voient la mise à jour
+                self._conn.execute(
+                    "INSERT INTO cache_entries "
+                    "(namespace, key, value, encoding, size, stored_at, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, "
+                    "encoding = excluded.encoding, size = excluded.size, stored_at = excluded.stored_at, "
+                    "expires_at = excluded.expires_at, accessed_at = excluded.accessed_at",
+                    (namespace, key, blob, encoding, len(blob), now, expires_at, now),
+                )
+                # Dates de lecture en attente écrites avant l'éviction (LRU à jour)
+                self._write_pending()
+                self._evict(now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, namespace: str, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def acquire(self, namespace: str, key: str, lease_seconds: float) -> Optional[str]:
+        token = f"{self.owner}-{uuid.uuid4().hex[:8]}"
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT expires_at FROM leases WHERE namespace = ? AND key = ?",
+                    (namespace, key),
+                ).fetchone()
+                taken = row is not None and row[0] > now
+                if not taken:
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO leases (namespace, key, owner, expires_at) VALUES (?, ?, ?, ?)",
+                        (namespace, key, token, now + lease_seconds),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return None if taken else token
+
+    def renew(self, namespace: str, key: str, token: str, lease_seconds: float) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE leases SET expires_at = ? WHERE namespace = ? AND key = ? AND owner = ?",
+                (time.time() + lease_seconds, namespace, key, token),
+            )
+            return cursor.rowcount == 1
+
+    def release(self, namespace: str, key: str, token: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM leases WHERE namespace = ? AND key = ? AND owner = ?", (namespace, key, token)
+            )
+
+    def purge(self, namespace: Optional[str] = None) -> int:
+        now = time.time()
+        with self._lock:
+            if namespace is None:
+                cursor = self._conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (now,))
+                self._conn.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+            else:
+                cursor = self._conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND expires_at < ?", (namespace, now)
+                )
+            return cursor.rowcount
+
+    def flush(self) -> None:
+        """
+        Écrit les compteurs et dates de lecture accumulés (une transaction par lot).
+        """
+        with self._lock:
+            if not self._pending_counts and not self._pending_touches:
+                self._last_flush = time.monotonic()
+                return
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._write_pending()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def stats(self, namespace: Optional[str] = None) -> Dict[str, Any]:
+        self.flush()
+        where, params = ("WHERE namespace = ?", (namespace,)) if namespace is not None else ("", ())
+        with self._lock:
+            entries, size = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries {where}", params
+            ).fetchone()
+            hits, misses = self._conn.execute(
+                f"SELECT COALESCE(SUM(hits), 0), COALESCE(SUM(misses), 0) FROM counters {where}", params
+            ).fetchone()
+        return {
+            "entries": entries,
+            "bytes": size,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else None,
+        }
+
+    def close(self) -> None:
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+    def _select(self, namespace: str, key: str) -> Optional[Tuple[bytes, str]]:
+        # Lecture seule (WAL) : ne bloque ni les autres lecteurs ni l'écrivain
+        with self._lock:
+            return self._conn.execute(
+                "SELECT value, encoding FROM cache_entries WHERE namespace = ? AND key = ? "
+                "AND (expires_at IS NULL OR expires_at >= ?)",
+                (namespace, key, time.time()),
+            ).fetchone()
+
+    def _write_pending(self) -> None:
+        # Appelé sous self._lock, dans une transaction ouverte
+        counts, self._pending_counts = self._pending_counts, {}
+        touches, self._pending_touches = self._pending_touches, {}
+        self._pending_reads = 0
+        self._last_flush = time.monotonic()
+        self._conn.executemany(
+            "INSERT INTO counters (namespace, hits, misses) VALUES (?, ?, ?) "
+            "ON CONFLICT (namespace) DO UPDATE SET hits = hits + excluded.hits, "
+            "misses = misses + excluded.misses",
+            [(namespace, hits, misses) for namespace, (hits, misses) in counts.items()],
+        )
+        self._conn.executemany(
+            "UPDATE cache_entries SET accessed_at = MAX(accessed_at, ?) WHERE namespace = ? AND key = ?",
+            [(at, namespace, key) for (namespace, key), at in touches.items()],
+        )
+
+    def _evict(self, now: float) -> None:
+        """
+        Dans la transaction d'écriture, au-delà de max_bytes : entrées expirées, puis LRU.
+        Le total vient de cache_totals (triggers), pas d'un SUM sur toute la table.
+        """
+        if self._total() <= self.max_bytes:
+            return
+        self._conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (now,))
+        total = self._total()
+        victims = []
+        for namespace, key, size in self._conn.execute(
+            "SELECT namespace, key, size FROM cache_entries ORDER BY accessed_at"
+        ):
+            if total <= self.max_bytes:
+                break
+            victims.append((namespace, key))
+            total -= size
+        self._conn.executemany("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", victims)
+
+    def _total(self) -> int:
+        return self._conn.execute("SELECT bytes FROM cache_totals WHERE id = 1").fetchone()[0]
+
+
+def _encode(value: Any) -> Tuple[bytes, str]:
+    if isinstance(value, bytes):
+        return value, "bytes"
+    return json.dumps(value, ensure_ascii=False).encode("utf-8"), "json"
+
+
+def _decode(blob: bytes, encoding: str) -> Any:
+    if encoding == "bytes":
+        return bytes(blob)
+    return json.loads(blob)
+
+
+_shared: Dict[str, SQLiteCacheBackend] = {}
+_shared_lock = threading.Lock()
+
+
+def shared_cache(path: Optional[str] = None) -> SQLiteCacheBackend:
+    """
+    Backend SQLite unique par process et par fichier (data/cache.sqlite3 par défaut,
+    ou CACHE_PATH) : tous les caches du process partagent la même connexion.
+    """
+    path = path or os.getenv("CACHE_PATH") or DEFAULT_CACHE_PATH
+    with _shared_lock:
+        backend = _shared.get(path)
+        if backend is None:
+            backend = _shared[path] = SQLiteCacheBackend(path)
+        return backend
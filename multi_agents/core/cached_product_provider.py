@@ -0,0 +1,77 @@
+import json
+import threading
+from typing import Any, Dict, List, Optional
+
+from multi_agents.core.cache_backend import CacheBackend, MemoryCacheBackend
+from multi_agents.core.models import Product, ProductCandidate, ProductSearchItemQuery
+from multi_agents.core.product_provider import ProductProvider, candidate_to_product
+from multi_agents.core.product_ranker import normalize_text
+
+
+NAMESPACE = "scrape"
+
+
+class CachedScrapeProvider(ProductProvider):
+    """
+    Résultats de scrapes récents, servis sans appel réseau :
+    - clé : texte de recherche normalisé + chemin genre
+    - une entrée scrappée avec un max_price plus bas que la requête n'est pas servie
+      (des produits abordables pour la requête auraient pu être filtrés)
+    - expiration après ttl_seconds ; stockage dans un CacheBackend (espace "scrape") :
+      en mémoire par défaut (LRU au-delà de max_entries), partagé entre process avec
+      le backend SQLite
+    Alimenté par FederatedProductProvider avec les résultats des sources live.
+    """
+
+    name = "scrape_cache"
+    local = True
+
+    def __init__(
+        self,
+        ttl_seconds: float = 6 * 3600,
+        max_entries: int = 1024,
+        backend: Optional[CacheBackend] = None,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.backend = backend or MemoryCacheBackend(max_entries=max_entries)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def search_products(self, query: ProductSearchItemQuery) -> List[Product]:
+        return [candidate_to_product(c, query, source=self.name) for c in self.lookup(query)]
+
+    async def asearch_candidates(self, query: ProductSearchItemQuery) -> List[ProductCandidate]:
+        return self.lookup(query)
+
+    def lookup(self, query: ProductSearchItemQuery) -> List[ProductCandidate]:
+        max_price = float(query["max_price"])
+        entry = self.backend.get(NAMESPACE, self._key(query))
+        with self._lock:
+            if entry is None or entry["max_price"] < max_price:
+                self.misses += 1
+                return []
+            self.hits += 1
+        return [dict(c) for c in entry["candidates"] if c["price"] <= max_price]  # type: ignore[misc]
+
+    def record(self, query: ProductSearchItemQuery, candidates: List[ProductCandidate]) -> None:
+        if not candidates:
+            return
+        entry = {
+            "candidates": [dict(c) for c in candidates],
+            "max_price": float(query["max_price"]),
+        }
+        self.backend.set(NAMESPACE, self._key(query), entry, self.ttl_seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self.backend.stats(NAMESPACE)["entries"]
+        with self._lock:
+            return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+    @staticmethod
+    def _key(query: ProductSearchItemQuery) -> str:
+        attributes = query.get("attributes", {})
+        text = attributes.get("search_text") or query["role"]
+        return json.dumps([normalize_text(text), attributes.get("gender") or ""], ensure_ascii=False)
@@ -0,0 +1,267 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+from multi_agents.core.models import Product, ProductCandidate, ProductSearchItemQuery
+from multi_agents.core.product_provider import ProductProvider, candidate_to_product
+from multi_agents.core.product_ranker import COLOR_SYNONYMS, normalize_text
+
+
+DEFAULT_CATALOG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "catalog.sqlite3"
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    product_key TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    brand TEXT,
+    color TEXT,
+    price REAL NOT NULL,
+    currency TEXT,
+    url TEXT,
+    image TEXT,
+    sku TEXT,
+    gender TEXT NOT NULL,
+    category TEXT NOT NULL,
+    search_text TEXT NOT NULL,
+    scraped_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS products_lookup ON products (gender, price, scraped_at);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+    name, brand, color, search_text,
+    content='products', content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS products_ai AFTER INSERT ON products BEGIN
+    INSERT INTO products_fts (rowid, name, brand, color, search_text)
+    VALUES (new.id, new.name, new.brand, new.color, new.search_text);
+END;
+CREATE TRIGGER IF NOT EXISTS products_ad AFTER DELETE ON products BEGIN
+    INSERT INTO products_fts (products_fts, rowid, name, brand, color, search_text)
+    VALUES ('delete', old.id, old.name, old.brand, old.color, old.search_text);
+END;
+CREATE TRIGGER IF NOT EXISTS products_au AFTER UPDATE ON products BEGIN
+    INSERT INTO products_fts (products_fts, rowid, name, brand, color, search_text)
+    VALUES ('delete', old.id, old.name, old.brand, old.color, old.search_text);
+    INSERT INTO products_fts (rowid, name, brand, color, search_text)
+    VALUES (new.id, new.name, new.brand, new.color, new.search_text);
+END;
+"""
+
+UPSERT = """
+INSERT INTO products (
+    product_key, name, brand, color, price, currency, url, image, sku,
+    gender, category, search_text, scraped_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (product_key) DO UPDATE SET
+    name = excluded.name,
+    brand = excluded.brand,
+    color = excluded.color,
+    price = excluded.price,
+    currency = excluded.currency,
+    url = excluded.url,
+    image = excluded.image,
+    sku = excluded.sku,
+    gender = excluded.gender,
+    category = CASE WHEN excluded.category != '' THEN excluded.category ELSE products.category END,
+    search_text = excluded.search_text,
+    scraped_at = excluded.scraped_at
+"""
+
+
+class CatalogStore(ProductProvider):
+    """
+    Catalogue local (SQLite + index plein texte FTS5) alimenté par tous les scrapes :
+    - un produit par URL (sinon SKU, sinon marque + nom + prix) ; un nouveau scrape
+      met à jour son prix et son horodatage
+    - index FTS5 sur nom, marque, couleur et textes de recherche qui l'ont trouvé
+      (une requête déjà payée retrouve ses produits même si leur nom est en anglais)
+    - colonnes prix / genre / catégorie filtrées en SQL
+    - fraîcheur : un produit scrappé il y a plus de max_age_seconds n'est plus servi
+      (prix, stocks) ; la fédération retombe alors sur le scraping live
+    Requête locale de quelques millisecondes : FederatedProductProvider la consulte
+    avant de lancer Apify.
+    """
+
+    name = "catalog"
+    local = True
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_age_seconds: float = 3 * 24 * 3600,
+        max_results: int = 20,
+    ) -> None:
+        self.path = path or os.getenv("CATALOG_DB_PATH") or DEFAULT_CATALOG_PATH
+        self.max_age_seconds = max_age_seconds
+        self.max_results = max_results
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # Connexion partagée entre threads (to_thread, rafraîchissements) : accès sous verrou
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            if self.path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    # ---------------- ProductProvider ----------------
+
+    def search_products(self, query: ProductSearchItemQuery) -> List[Product]:
+        return [candidate_to_product(c, query, source=self.name) for c in self.lookup(query)]
+
+    async def asearch_candidates(self, query: ProductSearchItemQuery) -> List[ProductCandidate]:
+        return self.lookup(query)
+
+    # ---------------- API ----------------
+
+    def lookup(self, query: ProductSearchItemQuery) -> List[ProductCandidate]:
+        """
+        Produits frais correspondant au texte de recherche, au genre et au prix maximum,
+        du plus pertinent au moins pertinent.
+        """
+        attributes = query.get("attributes", {})
+        match = self._match_expression(attributes.get("search_text") or query["role"])
+        if not match:
+            return []
+
+        params: List[Any] = [match, attributes.get("gender") or "", float(query["max_price"])]
+        category_filter = ""
+        if query.get("category"):
+            category_filter = "AND p.category IN (?, '')"
+            params.append(query["category"])
+        sql = f"""
+            SELECT p.*, p.scraped_at >= ? AS fresh
+            FROM products_fts JOIN products p ON p.id = products_fts.rowid
+            WHERE products_fts MATCH ? AND p.gender = ? AND p.price <= ? {category_filter}
+            ORDER BY fresh DESC, bm25(products_fts), p.price
+            LIMIT ?
+        """
+        params = [time.time() - self.max_age_seconds] + params + [self.max_results]
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+            fresh = [self._to_candidate(r) for r in rows if r["fresh"]]
+            if fresh:
+                self.hits += 1
+            elif rows:
+                self.stale += 1
+            else:
+                self.misses += 1
+        return fresh
+
+    def record(self, query: ProductSearchItemQuery, candidates: List[ProductCandidate]) -> int:
+        """
+        Enregistre (ou rafraîchit) les candidats d'un scrape. Renvoie le nombre de produits écrits.
+        """
+        attributes = query.get("attributes", {})
+        search_text = normalize_text(attributes.get("search_text") or query["role"])
+        gender = attributes.get("gender") or ""
+        category = query.get("category") or ""
+        now = time.time()
+
+        rows = []
+        for c in candidates:
+            if not c.get("name") or not isinstance(c.get("price"), (int, float)):
+                continue
+            rows.append((
+                self._product_key(c),
+                c["name"],
+                c.get("brand"),
+                c.get("color"),
+                float(c["price"]),
+                c.get("currency") or "EUR",
+                c.get("url"),
+                c.get("image"),
+                c.get("sku"),
+                gender,
+                category,
+                search_text,
+                now,
+            ))
+        if not rows:
+            return 0
+
+        with self._lock, self._conn:
+            for row in rows:
+                # Les textes de recherche qui ont déjà trouvé ce produit sont conservés
+                previous = self._conn.execute(
+                    "SELECT search_text FROM products WHERE product_key = ?", (row[0],)
+                ).fetchone()
+                if previous is not None:
+                    merged = " ".join(dict.fromkeys(previous["search_text"].split() + search_text.split()))
+                    row = row[:11] + (merged,) + row[12:]
+                self._conn.execute(UPSERT, row)
+        return len(rows)
+
+    def purge(self, older_than_seconds: Optional[float] = None) -> int:
+        """
+        Supprime les produits scrappés depuis plus de older_than_seconds (par défaut max_age_seconds).
+        """
+        limit = self.max_age_seconds if older_than_seconds is None else older_than_seconds
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM products WHERE scraped_at < ?", (time.time() - limit,))
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            products = self._conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+            return {"products": products, "hits": self.hits, "misses": self.misses, "stale": self.stale}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ---------------- Interne ----------------
+
+    @staticmethod
+    def _match_expression(search_text: str) -> str:
+        """
+        Requête FTS5 : chaque mot (préfixe) ou l'une de ses traductions de couleur doit apparaître.
+        Les mots de moins de 3 lettres ("de", "t" de "t shirt") sont ignorés.
+        """
+        words = normalize_text(search_text).split()
+        kept = [w for w in words if len(w) >= 3] or words
+        groups = []
+        for word in dict.fromkeys(kept):
+            terms = [f'"{word}"*'] + [f'"{s}"' for s in COLOR_SYNONYMS.get(word, [])]
+            groups.append("(" + " OR ".join(terms) + ")")
+        return " AND ".join(groups)
+
+    @staticmethod
+    def _product_key(candidate: ProductCandidate) -> str:
+        url = candidate.get("url")
+        if url:
+            return "url:" + url.split("?")[0].rstrip("/")
+        if candidate.get("sku"):
+            return "sku:" + str(candidate["sku"])
+        return "name:{}|{}|{:.2f}".format(
+            normalize_text(candidate.get("brand")),
+            normalize_text(candidate.get("name")),
+            float(candidate["price"]),
+        )
+
+    @staticmethod
+    def _to_candidate(row: sqlite3.Row) -> ProductCandidate:
+        return {
+            "name": row["name"],
+            "brand": row["brand"],
+            "price": row["price"],
+            "currency": row["currency"] or "EUR",
+            "url": row["url"],
+            "image": row["image"],
+            "sku": row["sku"],
+            "color": row["color"],
+        }
@@ -0,0 +1,26 @@
+import threading
+from pathlib import Path
+
+# Racine du projet (on remonte de 2 niveaux depuis ce fichier : core/ -> multi_agents/ -> racine)
+BASE_DIR = Path(__file__).resolve().parents[2]
+
+_lock = threading.Lock()
+_loaded = False
+
+
+def load_env() -> None:
+    """
+    Charge le .env une seule fois, au premier client construit (et non à l'import).
+    """
+    global _loaded
+    with _lock:
+        if _loaded:
+            return
+        from dotenv import load_dotenv
+
+        env_path = BASE_DIR / ".env"
+        if env_path.exists():
+            load_dotenv(dotenv_path=env_path)
+        else:
+            load_dotenv()
+        _loaded = True
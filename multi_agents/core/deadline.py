@@ -0,0 +1,82 @@
+import math
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+
+# Temps restant minimal (en secondes) pour faire chaque travail en entier.
+# En dessous, l'étape concernée se dégrade au lieu de dépasser l'échéance.
+DEGRADATION_THRESHOLDS: Dict[str, float] = {
+    "all_outfits": 90.0,    # sinon : au plus 2 tenues recherchées
+    "two_outfits": 45.0,    # sinon : une seule tenue
+    "live_search": 25.0,    # sinon : recherche limitée au cache / catalogue local (pas d'Apify)
+    "llm_event": 20.0,      # sinon : extraction locale seule, sans complément LLM de l'analyse
+    "llm_query": 15.0,      # sinon : requête de recherche par défaut au lieu du Query Builder
+    "llm_selector": 15.0,   # sinon : ranker local au lieu du Product Selector
+    "previews": 40.0,       # sinon : pas d'aperçu mannequin (Modelslab ~120 s au pire)
+}
+
+
+class Deadline:
+    """
+    Échéance d'une demande, transmise à toutes les étapes du pipeline.
+    - remaining() : temps restant (infini si pas d'échéance)
+    - allows(travail) : assez de temps pour faire ce travail en entier ?
+    - cap(secondes) : borne un délai d'attente au temps restant
+    - degrade(étape, action) : note une dégradation appliquée (reprise dans le résultat)
+    """
+
+    def __init__(
+        self,
+        seconds: Optional[float] = None,
+        thresholds: Optional[Dict[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.seconds = seconds
+        self.thresholds = thresholds if thresholds is not None else DEGRADATION_THRESHOLDS
+        self._clock = clock
+        self._end = None if seconds is None else clock() + seconds
+        self.degradations: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        if self._end is None:
+            return math.inf
+        return max(0.0, self._end - self._clock())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+    def allows(self, work: str) -> bool:
+        return self.remaining() >= self.thresholds.get(work, 0.0)
+
+    def cap(self, seconds: Optional[float] = None, reserve: float = 0.0) -> Optional[float]:
+        """
+        Délai d'attente borné au temps restant (moins une réserve pour les étapes suivantes).
+        None si ni délai ni échéance (attente illimitée).
+        """
+        remaining = self.remaining() - reserve
+        if seconds is None:
+            return None if math.isinf(remaining) else max(0.0, remaining)
+        return max(0.0, min(seconds, remaining))
+
+    def degrade(self, stage: str, action: str, detail: Optional[str] = None) -> None:
+        """
+        Une même dégradation (étape, action) n'est notée qu'une fois, avec un compteur.
+        """
+        with self._lock:
+            for entry in self.degradations:
+                if entry["stage"] == stage and entry["action"] == action:
+                    entry["count"] += 1
+                    return
+            remaining = self.remaining()
+            self.degradations.append(
+                {
+                    "stage": stage,
+                    "action": action,
+                    "detail": detail,
+                    "remaining_s": None if math.isinf(remaining) else round(remaining, 2),
+                    "count": 1,
+                }
+            )
+        print(f"[Deadline] {stage}: {action}" + (f" ({detail})" if detail else ""))
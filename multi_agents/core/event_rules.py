@@ -0,0 +1,321 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from multi_agents.core.models import EventExtraction, EventUnderstanding
+from multi_agents.core.product_ranker import normalize_text
+
+
+# Lexiques (textes normalisés : minuscules, sans accents ni ponctuation).
+# Valeur canonique -> expressions qui la désignent ; les valeurs reprennent le
+# vocabulaire attendu par le prompt de l'EventAnalyzer.
+EVENT_TYPES: Dict[str, List[str]] = {
+    # Pas "marie" / "mariee" : prénom ("chez Marie") ou situation ("je suis marié")
+    "mariage": ["mariage", "noces", "ceremonie de mariage", "vin d honneur"],
+    # "30 ans de mariage" : un anniversaire (l'expression longue masque "mariage")
+    "anniversaire": [
+        "anniversaire", "anniv", "ans de mariage", "anniversaire de mariage",
+        "noces d or", "noces d argent", "noces de diamant",
+    ],
+    "travail": ["travail", "bureau", "boulot", "reunion", "entretien", "entretien d embauche", "seminaire"],
+    "conférence": ["conference", "salon professionnel", "colloque"],
+    "rendez-vous": ["rendez vous", "rdv", "premier rencard", "rencard", "diner en amoureux"],
+    "soirée": ["soiree entre amis", "fete", "gala", "cocktail", "bal", "boite", "club"],
+    "enterrement": ["enterrement", "obseques", "funerailles"],
+    "baptême": ["bapteme", "communion"],
+    "remise de diplôme": ["remise de diplome", "remise des diplomes", "graduation"],
+    "plage": ["plage", "bord de mer", "piscine"],
+    "concert": ["concert", "festival"],
+}
+
+TIMES_OF_DAY: Dict[str, List[str]] = {
+    "matin": ["matin", "matinee", "brunch", "petit dejeuner"],
+    "après-midi": ["apres midi", "aprem", "gouter", "dejeuner"],
+    "soirée": ["soir", "soiree", "diner", "gala", "cocktail"],
+    "nuit": ["nuit", "boite", "club"],
+}
+
+# Du plus spécifique au plus général : "très chic" avant "chic"
+FORMALITY_LEVELS: Dict[str, List[str]] = {
+    "très chic": ["tres chic", "black tie", "smoking", "tenue de gala", "tenue de soiree", "tres habille"],
+    "smart casual": ["smart casual", "business casual", "chic decontracte", "decontracte chic", "casual chic"],
+    "très décontracté": ["tres decontracte", "tres casual", "confortable", "jogging"],
+    "chic": ["chic", "elegant", "elegante", "habille", "habillee", "classe", "formel", "formelle"],
+    "décontracté": ["decontracte", "decontractee", "casual", "detendu", "cool", "simple"],
+}
+
+# Formalité habituelle d'un type d'événement (indice faible : le LLM confirme)
+FORMALITY_BY_EVENT: Dict[str, str] = {
+    "mariage": "chic",
+    "enterrement": "chic",
+    "baptême": "chic",
+    "remise de diplôme": "chic",
+    "conférence": "smart casual",
+    "travail": "smart casual",
+    "rendez-vous": "décontracté",
+    "anniversaire": "décontracté",
+    "plage": "très décontracté",
+    "concert": "décontracté",
+}
+
+STYLE_KEYWORDS: Dict[str, List[str]] = {
+    "minimaliste": ["minimaliste", "minimal", "sobre", "epure"],
+    "classique": ["classique", "intemporel"],
+    "élégant": ["elegant", "elegante"],
+    "streetwear": ["streetwear", "street", "urbain"],
+    "hip-hop": ["hip hop", "rap"],
+    "bohème": ["boheme", "boho"],
+    "vintage": ["vintage", "retro"],
+    "rock": ["rock", "punk"],
+    "sportswear": ["sportswear", "sportif", "athleisure"],
+    "preppy": ["preppy", "bcbg"],
+    "romantique": ["romantique"],
+    "traditionnel": ["traditionnel", "traditionnelle", "abaya", "abayas", "djellaba", "boubou"],
+    "coloré": ["colore", "coloree", "couleurs vives"],
+}
+
+# Échelle de formalité : un niveau explicite trop loin de celui du type d'événement
+# (ex: mariage "très décontracté") est une demande à faire confirmer par le LLM
+FORMALITY_RANK: Dict[str, int] = {
+    "très décontracté": 0,
+    "décontracté": 1,
+    "smart casual": 2,
+    "chic": 3,
+    "très chic": 4,
+}
+
+# Un mot-clé précédé d'une négation ("pas trop chic", "sans cravate") ne compte pas
+NEGATIONS = {"ne", "n", "pas", "sans", "jamais", "plus", "eviter"}
+NEGATION_WINDOW = 3
+
+# Style par défaut quand la formalité est connue mais qu'aucun style n'est cité
+STYLE_BY_FORMALITY: Dict[str, str] = {
+    "très chic": "élégant, classique",
+    "chic": "minimaliste, élégant",
+    "smart casual": "minimaliste",
+    "décontracté": "simple, décontracté",
+    "très décontracté": "décontracté, confortable",
+}
+
+# Montant suivi d'une devise, ou précédé de "budget" / "max"
+AMOUNT_RE = re.compile(
+    r"(?:(?:budget|max|maximum|jusqu [aà]|moins de)\s+(?:de\s+)?(\d+(?:[.,]\d+)?))"
+    r"|(?:(\d+(?:[.,]\d+)?)\s*(?:€|euros?|eur)(?!\w))"
+)
+# "N ans" qui n'est pas une durée ("30 ans de mariage", "10 ans d'amitié")
+AGE_RE = re.compile(r"(?<!\d)(\d{1,2})\s*ans(?!\w)(?!\s+(?:de|d|du|des)\b)")
+# "pour ses 30 ans", "les 18 ans de..." : l'âge de quelqu'un d'autre
+OTHER_PERSON_WORDS = {"ses", "son", "sa", "leurs", "leur", "des", "les", "aux", "nos", "vos", "tes"}
+# Montant écrit en lettres : seul le LLM sait le lire
+NUMBER_WORDS_RE = re.compile(r"\b(cent|cents|mille|vingt|trente|quarante|cinquante|soixante|quatre vingt)\b")
+
+# Mots sans contenu propre : tout autre mot absent des lexiques ("plein air",
+# "costume", "couleurs pastel"...) est une contrainte que seul le LLM sait lire
+FILLER_WORDS = {
+    "le", "la", "les", "l", "un", "une", "des", "de", "du", "d", "en", "au", "aux", "a",
+    "et", "ou", "mais", "pour", "avec", "chez", "sur", "dans", "par", "entre", "vers",
+    "je", "j", "me", "m", "moi", "ma", "mon", "mes", "on", "nous", "vous", "il", "elle",
+    "ce", "cet", "cette", "ces", "c", "qui", "que", "qu", "est", "suis", "sera", "etre",
+    "veux", "voudrais", "aimerais", "cherche", "besoin", "faut", "tenue", "look", "style",
+    "tres", "trop", "peu", "plutot", "assez", "bien", "y", "va", "vais",
+    "budget", "max", "maximum", "moins", "jusqu", "euro", "euros", "eur", "ans", "age",
+    "homme", "femme", "amis", "amies", "ami", "amie", "copains", "copines",
+}
+
+# Niveaux de confiance
+EXPLICIT = 0.9      # mot-clé trouvé dans le texte
+UI = 1.0            # valeur saisie dans l'interface
+ABSENT = 0.8        # rien dans un texte entièrement reconnu : le LLM ne ferait pas mieux (null)
+DERIVED = 0.6       # déduit d'un autre champ (ex: formalité d'un mariage, style par défaut)
+AMBIGUOUS = 0.5     # plusieurs valeurs concurrentes
+
+
+# Tous les mots connus des règles
+LEXICON_WORDS = FILLER_WORDS | {
+    word
+    for lexicon in (EVENT_TYPES, TIMES_OF_DAY, FORMALITY_LEVELS, STYLE_KEYWORDS)
+    for phrases in lexicon.values()
+    for phrase in phrases
+    for word in phrase.split()
+}
+
+
+class RuleBasedEventExtractor:
+    """
+    Extraction locale (lexiques français + regex) de l'EventUnderstanding :
+    type d'événement, moment, formalité, style, budget, âge — avec une confiance
+    par champ. Si tous les champs dépassent `threshold`, l'EventAnalyzer n'appelle
+    pas le LLM ; sinon le LLM ne sert qu'à compléter les champs incertains.
+    """
+
+    def __init__(self, threshold: float = 0.75) -> None:
+        self.threshold = threshold
+
+    def extract(
+        self,
+        description: str,
+        ui_budget: Optional[float] = None,
+        ui_gender: Optional[str] = None,
+        ui_age: Optional[int] = None,
+    ) -> EventExtraction:
+        raw = (description or "").lower()
+        text = " " + normalize_text(description) + " "
+
+        event_type, event_conf = self._match_one(text, EVENT_TYPES)
+        time_of_day, time_conf = self._match_one(text, TIMES_OF_DAY)
+        if time_of_day is None:
+            time_of_day, time_conf = "non précisé", ABSENT if event_type else DERIVED
+
+        formality, formality_conf = self._match_one(text, FORMALITY_LEVELS)
+        if formality is None:
+            formality = FORMALITY_BY_EVENT.get(event_type or "", "décontracté")
+            formality_conf = DERIVED if event_type else 0.0
+
+        styles, style_negated = self._match_all(text, STYLE_KEYWORDS)
+        if styles:
+            style, style_conf = ", ".join(styles), AMBIGUOUS if style_negated else EXPLICIT
+        elif style_negated:
+            style, style_conf = STYLE_BY_FORMALITY.get(formality, ""), AMBIGUOUS
+        else:
+            # Style par défaut de la formalité : une supposition, pas une lecture du texte
+            style, style_conf = STYLE_BY_FORMALITY.get(formality, ""), DERIVED
+        if self._unrecognised(text):
+            # Mots hors lexiques ("pas en costume", "plein air") : une contrainte de tenue
+            # que les règles ne savent pas lire, le LLM doit relire le style
+            style_conf = min(style_conf, AMBIGUOUS)
+
+        budget, budget_conf = self._budget(raw, ui_budget)
+        age, age_conf = self._age(text, ui_age)
+
+        if event_type and formality_conf >= EXPLICIT and self._conflicting(event_type, formality):
+            # Indices contradictoires : aucun des deux champs n'est sûr
+            event_conf = formality_conf = AMBIGUOUS
+
+        event: EventUnderstanding = {
+            "event_type": event_type or "autre",
+            "time_of_day": time_of_day,
+            "formality_level": formality,
+            "style": style,
+            "budget": budget,
+            "gender": ui_gender or "non précisé",
+            "age": age,
+        }
+        confidence = {
+            "event_type": event_conf,
+            "time_of_day": time_conf,
+            "formality_level": formality_conf,
+            "style": style_conf,
+            "budget": budget_conf,
+            "gender": UI if ui_gender else 0.0,
+            "age": age_conf,
+        }
+        return {"event": event, "confidence": confidence}
+
+    def confident(self, extraction: EventExtraction) -> bool:
+        return all(c >= self.threshold for c in extraction["confidence"].values())
+
+    def uncertain_fields(self, extraction: EventExtraction) -> List[str]:
+        return [f for f, c in extraction["confidence"].items() if c < self.threshold]
+
+    # ---------------- Interne ----------------
+
+    @staticmethod
+    def _unrecognised(text: str) -> List[str]:
+        """
+        Mots du texte absents des lexiques, des négations et des mots vides.
+        """
+        return [
+            word for word in text.split()
+            if word not in LEXICON_WORDS and word not in NEGATIONS and not word.isdigit()
+        ]
+
+    @staticmethod
+    def _hits(text: str, keyword: str) -> List[Tuple[int, bool]]:
+        """
+        Positions du mot-clé, chacune avec un indicateur de négation (un mot de NEGATIONS
+        parmi les NEGATION_WINDOW mots qui précèdent).
+        """
+        hits = []
+        for match in re.finditer(r"(?<!\w)" + re.escape(keyword) + r"(?!\w)", text):
+            before = text[:match.start()].split()[-NEGATION_WINDOW:]
+            hits.append((match.start(), any(word in NEGATIONS for word in before)))
+        return hits
+
+    @staticmethod
+    def _conflicting(event_type: str, formality: str) -> bool:
+        usual = FORMALITY_BY_EVENT.get(event_type)
+        if usual is None:
+            return False
+        return abs(FORMALITY_RANK[usual] - FORMALITY_RANK[formality]) >= 2
+
+    def _match_one(self, text: str, lexicon: Dict[str, List[str]]) -> Tuple[Optional[str], float]:
+        """
+        Valeur dont une expression apparaît dans le texte. Les expressions plus longues
+        masquent les plus courtes ("tres chic" n'est pas aussi "chic"). Une expression
+        niée ("pas trop chic") n'est pas retenue et rend le champ incertain.
+        """
+        found: Dict[str, int] = {}
+        negated = False
+        masked = text
+        phrases = sorted(
+            ((kw, value) for value, kws in lexicon.items() for kw in kws),
+            key=lambda p: -len(p[0]),
+        )
+        for keyword, value in phrases:
+            for pos, is_negated in self._hits(masked, keyword):
+                masked = masked[:pos] + " " * len(keyword) + masked[pos + len(keyword):]
+                if is_negated:
+                    negated = True
+                else:
+                    found.setdefault(value, pos)
+        if not found:
+            return None, 0.0
+        if len(found) > 1 or negated:
+            # Plusieurs valeurs (ou une négation) : on garde la première citée, sans confiance suffisante
+            return min(found, key=found.get), AMBIGUOUS  # type: ignore[arg-type]
+        return next(iter(found)), EXPLICIT
+
+    def _match_all(self, text: str, lexicon: Dict[str, List[str]]) -> Tuple[List[str], bool]:
+        """
+        Toutes les valeurs citées (hors négation), et si une valeur a été niée.
+        """
+        positions = {}
+        negated = False
+        for value, keywords in lexicon.items():
+            hits = [hit for kw in keywords for hit in self._hits(text, kw)]
+            kept = [pos for pos, is_negated in hits if not is_negated]
+            negated = negated or len(kept) < len(hits)
+            if kept:
+                positions[value] = min(kept)
+        return sorted(positions, key=positions.get), negated  # type: ignore[arg-type]
+
+    @staticmethod
+    def _budget(raw: str, ui_budget: Optional[float]) -> Tuple[Optional[float], float]:
+        if ui_budget is not None:
+            return float(ui_budget), UI
+        # Sur le texte brut (normalize_text retirerait le symbole €)
+        amounts = {
+            float((m.group(1) or m.group(2)).replace(",", "."))
+            for m in AMOUNT_RE.finditer(raw.replace("'", " "))
+        }
+        if len(amounts) == 1:
+            return amounts.pop(), EXPLICIT
+        if amounts:
+            return max(amounts), AMBIGUOUS
+        if NUMBER_WORDS_RE.search(normalize_text(raw)):
+            return None, 0.0
+        return None, ABSENT
+
+    @staticmethod
+    def _age(text: str, ui_age: Optional[int]) -> Tuple[Optional[int], float]:
+        if ui_age is not None:
+            return int(ui_age), UI
+        ages = {
+            int(m.group(1))
+            for m in AGE_RE.finditer(text)
+            if not set(text[:m.start()].split()[-1:]) & OTHER_PERSON_WORDS
+        }
+        if len(ages) == 1:
+            return ages.pop(), EXPLICIT
+        if ages:
+            return None, AMBIGUOUS
+        return None, ABSENT
@@ -12,6 +12,9 @@ class FakeProductProvider(ProductProvider):
     Utilisé pour le développement et les tests.
     """
 
+    name = "fake"
+    local = True
+
     def __init__(self) -> None:
         base_dir = Path(__file__).resolve().parents[1]  # multi_agents/
         data_path = base_dir / "data" / "products_fake.json"
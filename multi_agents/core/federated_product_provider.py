@@ -0,0 +1,241 @@
+import asyncio
+import time
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+from multi_agents.core.cached_product_provider import CachedScrapeProvider
+from multi_agents.core.catalog_store import CatalogStore
+from multi_agents.core.models import Product, ProductCandidate, ProductSearchItemQuery
+from multi_agents.core.product_provider import ProductProvider, candidate_to_product
+from multi_agents.core.product_ranker import normalize_text
+
+
+class FederatedProductProvider(ProductProvider):
+    """
+    Recherche fédérée : une même requête d'article est envoyée en parallèle à
+    plusieurs sources (catalogue local, cache de scrapes, scraper HTML, Apify...).
+    - les résultats sont fusionnés et dédupliqués (URL, sinon SKU, sinon marque + nom + prix)
+    - on rend la main dès que min_results bons candidats sont arrivés, ou à l'expiration
+      du délai par article : une source lente ne retient pas une demande qu'une source
+      rapide sait déjà servir (ses tâches restantes sont annulées, runs Apify compris)
+    - à résultat égal, l'ordre des providers fait foi (le premier listé gagne)
+    - le cache de scrapes puis le catalogue local sont consultés d'abord ; les résultats
+      des sources live les alimentent tous les deux (seul écrivain du catalogue quand
+      il est fourni : les providers fédérés ne l'alimentent pas eux-mêmes)
+    """
+
+    name = "federated"
+
+    def __init__(
+        self,
+        providers: Sequence[ProductProvider],
+        cache: Optional[CachedScrapeProvider] = None,
+        catalog: Optional[CatalogStore] = None,
+        min_results: int = 3,
+        max_results: int = 5,
+        deadline_seconds: float = 45.0,
+    ) -> None:
+        if not providers and cache is None and catalog is None:
+            raise ValueError("FederatedProductProvider : au moins un provider est nécessaire")
+        self.cache = cache
+        self.catalog = catalog
+        self.providers: List[ProductProvider] = list(providers)
+        self.min_results = min_results
+        self.max_results = max_results
+        self.deadline_seconds = deadline_seconds
+
+        self._stats: Dict[str, Dict[str, float]] = {
+            p.name: {"calls": 0, "results": 0, "errors": 0, "cancelled": 0, "latency_s": 0.0}
+            for p in self.providers
+        }
+        self.cache_answers = 0
+        self.catalog_answers = 0
+        self.early_returns = 0
+        self.deadline_expired = 0
+        self._lock = threading.Lock()
+
+    def search_products(self, query: ProductSearchItemQuery) -> List[Product]:
+        from multi_agents.core.async_utils import run_sync
+
+        candidates = run_sync(self.asearch_candidates(query))
+        return [candidate_to_product(c, query, source=self.name) for c in candidates]
+
+    async def asearch_products(self, query: ProductSearchItemQuery) -> List[Product]:
+        candidates = await self.asearch_candidates(query)
+        return [candidate_to_product(c, query, source=self.name) for c in candidates]
+
+    async def asearch_candidates(
+        self,
+        query: ProductSearchItemQuery,
+        deadline_seconds: Optional[float] = None,
+        local_only: bool = False,
+    ) -> List[ProductCandidate]:
+        """
+        deadline_seconds : délai pour cet article (par défaut self.deadline_seconds).
+        local_only : n'interroger que le cache et les sources locales (pas de réseau).
+        Retourne les candidats dédupliqués, du moins cher au plus cher (max_results au plus).
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self.deadline_seconds if deadline_seconds is None else deadline_seconds)
+        max_price = float(query["max_price"])
+        merged: Dict[Any, tuple] = {}
+
+        # Le cache puis le catalogue sont consultés avant de lancer les sources live :
+        # s'ils suffisent, aucun run Apify n'est démarré (même pas pour être aussitôt interrompu).
+        # Lectures SQLite (FTS) hors de la boucle d'événements
+        if self.cache is not None:
+            self._merge(merged, -1, await asyncio.to_thread(self.cache.lookup, query), max_price)
+            if len(merged) >= self.min_results:
+                with self._lock:
+                    self.cache_answers += 1
+                return self._ordered(merged)
+        if self.catalog is not None:
+            self._merge(merged, -1, await asyncio.to_thread(self.catalog.lookup, query), max_price)
+            if len(merged) >= self.min_results:
+                with self._lock:
+                    self.catalog_answers += 1
+                candidates = self._ordered(merged)
+                if self.cache is not None:
+                    await asyncio.to_thread(self.cache.record, query, candidates)
+                return candidates
+
+        # Par source : tous les produits vus (run Apify complet), destinés au catalogue
+        collected: Dict[int, List[ProductCandidate]] = {rank: [] for rank in range(len(self.providers))}
+        tasks: Dict[asyncio.Task, int] = {
+            asyncio.create_task(self._asearch_one(provider, query, collected[rank])): rank
+            for rank, provider in enumerate(self.providers)
+            if provider.local or not local_only
+        }
+        pending = set(tasks)
+        live_results = False
+        # Tous les produits des sources distantes, pas seulement les max_results retenus
+        live: List[ProductCandidate] = []
+
+        try:
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    with self._lock:
+                        self.deadline_expired += 1
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    results = task.result()
+                    live_results = self._merge(merged, tasks[task], results, max_price) or live_results
+                    if not self.providers[tasks[task]].local:
+                        live.extend(collected[tasks[task]])
+                if len(merged) >= self.min_results and pending:
+                    with self._lock:
+                        self.early_returns += 1
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+                with self._lock:
+                    self._stats[self.providers[tasks[task]].name]["cancelled"] += 1
+
+        candidates = self._ordered(merged)
+        if self.cache is not None and live_results:
+            await asyncio.to_thread(self.cache.record, query, candidates)
+        if self.catalog is not None and live:
+            try:
+                await asyncio.to_thread(self.catalog.record, query, live)
+            except Exception as err:
+                print(f"[FederatedProductProvider] Catalog record failed: {err}")
+        return candidates
+
+    def is_warm(self, query: ProductSearchItemQuery) -> bool:
+        """
+        True si le cache de scrapes et le catalogue suffisent pour cette requête
+        (asearch_candidates ne lancerait aucune source live).
+        """
+        merged: Dict[Any, tuple] = {}
+        max_price = float(query["max_price"])
+        for local in (self.cache, self.catalog):
+            if local is not None:
+                self._merge(merged, -1, local.lookup(query), max_price)
+        return len(merged) >= self.min_results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            providers = {
+                name: {
+                    **values,
+                    "avg_latency_s": values["latency_s"] / values["calls"] if values["calls"] else None,
+                }
+                for name, values in self._stats.items()
+            }
+            return {
+                "providers": providers,
+                "cache_answers": self.cache_answers,
+                "catalog_answers": self.catalog_answers,
+                "early_returns": self.early_returns,
+                "deadline_expired": self.deadline_expired,
+            }
+
+    # ---------------- Interne ----------------
+
+    async def _asearch_one(
+        self,
+        provider: ProductProvider,
+        query: ProductSearchItemQuery,
+        collected: List[ProductCandidate],
+    ) -> List[ProductCandidate]:
+        stats = self._stats[provider.name]
+        start = time.perf_counter()
+        try:
+            results = await provider.asearch_collecting(query, collected)
+        except asyncio.CancelledError:
+            raise
+        except Exception as err:
+            print(f"[FederatedProductProvider] Provider '{provider.name}' failed: {err}")
+            with self._lock:
+                stats["calls"] += 1
+                stats["errors"] += 1
+            return []
+        with self._lock:
+            stats["calls"] += 1
+            stats["results"] += len(results)
+            stats["latency_s"] += time.perf_counter() - start
+        return results
+
+    def _merge(self, merged: Dict[Any, tuple], rank: int, candidates: List[ProductCandidate], max_price: float) -> bool:
+        """
+        Ajoute les bons candidats d'un provider (rang -1 = cache) ; à doublon égal,
+        le provider le mieux classé gagne. Renvoie True si un candidat a été retenu.
+        """
+        added = False
+        for seq, candidate in enumerate(candidates):
+            if not self._is_good(candidate, max_price):
+                continue
+            key = self._dedupe_key(candidate)
+            if key not in merged or (rank, seq) < merged[key][:2]:
+                merged[key] = (rank, seq, candidate)
+                added = True
+        return added
+
+    def _ordered(self, merged: Dict[Any, tuple]) -> List[ProductCandidate]:
+        # Du moins cher au plus cher (le sélecteur se rabat sur l'index 0)
+        ordered = sorted(merged.values(), key=lambda e: (e[2]["price"], e[0], e[1]))
+        return [dict(e[2]) for e in ordered[: self.max_results]]  # type: ignore[misc]
+
+    @staticmethod
+    def _is_good(candidate: ProductCandidate, max_price: float) -> bool:
+        price = candidate.get("price")
+        return bool(candidate.get("name")) and isinstance(price, (int, float)) and price <= max_price
+
+    @staticmethod
+    def _dedupe_key(candidate: ProductCandidate) -> Any:
+        url = candidate.get("url")
+        if url:
+            return ("url", url.split("?")[0].rstrip("/"))
+        if candidate.get("sku"):
+            return ("sku", candidate["sku"])
+        return (
+            "name",
+            normalize_text(candidate.get("brand")),
+            normalize_text(candidate.get("name")),
+            round(float(candidate["price"]), 2),
+        )
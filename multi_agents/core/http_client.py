@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import weakref
+import importlib.util
+from typing import Any, Dict, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import httpx
+
+# HTTP/2 seulement si le paquet h2 est installé (pip install "httpx[http2]").
+# find_spec évite d'importer h2 (et httpx) tant qu'aucun client n'est construit.
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+# Timeouts communs à tous les clients sortants (Apify, Modelslab, scraping HTML)
+DEFAULT_TIMEOUT_SECONDS = 30.0
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 10.0
+
+# Pools keep-alive par hôte : les nombreux appels courts de statut Apify
+# réutilisent la même connexion TLS au lieu d'en ouvrir une à chaque fois.
+DEFAULT_LIMITS = {
+    "max_connections": 50,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 60.0,
+}
+
+_lock = threading.Lock()
+_client: Optional["httpx.Client"] = None
+# Un AsyncClient est lié à sa boucle d'événements : un client par boucle
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _client_kwargs() -> Dict[str, Any]:
+    # httpx n'est importé qu'à la construction du premier client
+    import httpx
+
+    return {
+        "http2": HTTP2_AVAILABLE,
+        "timeout": httpx.Timeout(DEFAULT_TIMEOUT_SECONDS, connect=DEFAULT_CONNECT_TIMEOUT_SECONDS),
+        "limits": httpx.Limits(**DEFAULT_LIMITS),
+        "follow_redirects": True,
+    }
+
+
+def get_http_client() -> "httpx.Client":
+    """
+    Client HTTP synchrone partagé par tout le process (thread-safe).
+    """
+    global _client
+    with _lock:
+        if _client is None or _client.is_closed:
+            import httpx
+
+            _client = httpx.Client(**_client_kwargs())
+        return _client
+
+
+def get_async_http_client() -> "httpx.AsyncClient":
+    """
+    Client HTTP asynchrone partagé pour la boucle d'événements courante.
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None or client.is_closed:
+            import httpx
+
+            client = httpx.AsyncClient(**_client_kwargs())
+            _async_clients[loop] = client
+        return client
+
+
+def close_http_client() -> None:
+    """
+    Ferme le client synchrone partagé (les connexions seront rouvertes au besoin).
+    """
+    global _client
+    with _lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+async def aclose_async_http_client() -> None:
+    """
+    Ferme le client asynchrone de la boucle courante (à appeler avant de fermer la boucle).
+    """
+    loop = asyncio.get_running_loop()
+    with _lock:
+        client = _async_clients.pop(loop, None)
+    if client is not None:
+        await client.aclose()
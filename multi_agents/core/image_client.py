@@ -1,11 +1,14 @@
 import os
-from typing import List, Dict, Any, Optional
+import time
+import base64
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple
 import json
 
-import requests
-from dotenv import load_dotenv
+import httpx
 
-load_dotenv()
+from multi_agents.core.config import load_env
+from multi_agents.core.http_client import get_http_client, get_async_http_client
 
 
 class ModelslabImageClient:
@@ -14,13 +17,19 @@ class ModelslabImageClient:
     On ne fait qu'un wrapper autour de l'endpoint v7.
     """
 
+    HEADERS = {"Content-Type": "application/json"}
+
     def __init__(
         self,
         api_key: Optional[str] = None,
         model_id: str = "seedream-4.0-i2i",
         aspect_ratio: str = "1:1",
         api_url: str = "https://modelslab.com/api/v7/images/image-to-image",
+        upload_url: str = "https://modelslab.com/api/v6/base64_to_url",
+        http_client: Optional[httpx.Client] = None,
+        timeout_seconds: float = 120.0,
     ) -> None:
+        load_env()
         self.api_key = api_key or os.getenv("MODELSLAB_API_KEY")
         if not self.api_key:
             raise ValueError(
@@ -30,6 +39,9 @@ class ModelslabImageClient:
         self.model_id = model_id
         self.aspect_ratio = aspect_ratio
         self.api_url = api_url
+        self.upload_url = upload_url
+        self.http = http_client or get_http_client()
+        self.timeout = httpx.Timeout(timeout_seconds, connect=10.0)
 
     def generate_outfit_image(
         self,
@@ -37,64 +49,125 @@ class ModelslabImageClient:
         product_image_urls: List[str],
         prompt: str,
     ) -> Optional[str]:
-        init_images = [user_image_url]  # on reste sur la version user-only
-
-        payload: Dict[str, Any] = {
-            "init_image": init_images,
-            "prompt": prompt,
-            "model_id": self.model_id,
-            "aspect-ratio": self.aspect_ratio,
-            "key": self.api_key,
-        }
-
-        headers = {"Content-Type": "application/json"}
+        payload = self._payload(user_image_url, prompt)
 
         # 🔁 On tente jusqu'à 2 fois max
         for attempt in range(2):
             try:
-                resp = requests.post(self.api_url, headers=headers, json=payload, timeout=120)
+                resp = self.http.post(self.api_url, headers=self.HEADERS, json=payload, timeout=self.timeout)
                 resp.raise_for_status()
-            except requests.exceptions.HTTPError as http_err:
-                print(f"[ModelslabImageClient] HTTP error: {http_err} - {resp.text}")
+            except httpx.HTTPStatusError as http_err:
+                print(f"[ModelslabImageClient] HTTP error: {http_err} - {http_err.response.text}")
                 return None
             except Exception as err:
                 print(f"[ModelslabImageClient] Other error: {err}")
                 return None
 
-            data = resp.json()
-            print("[ModelslabImageClient] Raw response:")
-            print(json.dumps(data, indent=2))
-
-            status = data.get("status")
-            if status == "success":
-                output = data.get("output") or []
-                proxy_links = data.get("proxy_links") or []
+            image_url, retry = self._parse_response(resp.json(), attempt)
+            if not retry:
+                return image_url
+            time.sleep(3)
 
-                if isinstance(output, list) and output:
-                    first = output[0]
-                    if isinstance(first, str):
-                        return first
+        return None
 
-                if isinstance(proxy_links, list) and proxy_links:
-                    first = proxy_links[0]
-                    if isinstance(first, str):
-                        return first
+    async def agenerate_outfit_image(
+        self,
+        user_image_url: str,
+        product_image_urls: List[str],
+        prompt: str,
+    ) -> Optional[str]:
+        """
+        Version asynchrone de generate_outfit_image().
+        """
+        payload = self._payload(user_image_url, prompt)
+        http = get_async_http_client()
 
-                print("[ModelslabImageClient] No usable URL in response.")
+        for attempt in range(2):
+            try:
+                resp = await http.post(self.api_url, headers=self.HEADERS, json=payload, timeout=self.timeout)
+                resp.raise_for_status()
+            except httpx.HTTPStatusError as http_err:
+                print(f"[ModelslabImageClient] HTTP error: {http_err} - {http_err.response.text}")
+                return None
+            except Exception as err:
+                print(f"[ModelslabImageClient] Other error: {err}")
                 return None
 
-            # ici status != "success"
-            message = data.get("message", "")
-            print(f"[ModelslabImageClient] Non-success status: {status} - {message}")
+            image_url, retry = self._parse_response(resp.json(), attempt)
+            if not retry:
+                return image_url
+            await asyncio.sleep(3)
 
-            # si c'est une erreur serveur générique, on retente une fois
-            if "server error occurred" in message.lower() and attempt == 0:
-                print("[ModelslabImageClient] Retry once after server error...")
-                time.sleep(3)
-                continue
+        return None
 
-            # sinon on abandonne direct
+    async def aupload_image(self, photo: Dict[str, Any]) -> Optional[str]:
+        """
+        Héberge une image chez Modelslab (endpoint base64 -> URL) et renvoie son URL publique.
+        photo : IngestedPhoto (data + mime_type).
+        """
+        encoded = base64.b64encode(photo["data"]).decode("ascii")
+        payload = {
+            "key": self.api_key,
+            "base64_string": f"data:{photo['mime_type']};base64,{encoded}",
+        }
+        try:
+            resp = await get_async_http_client().post(self.upload_url, headers=self.HEADERS, json=payload)
+            resp.raise_for_status()
+            data = resp.json()
+        except Exception as err:
+            print(f"[ModelslabImageClient] Upload error: {err}")
             return None
 
+        output = data.get("output") or []
+        if data.get("status") == "success" and output and isinstance(output[0], str):
+            return output[0]
+        print(f"[ModelslabImageClient] Upload failed: {data.get('status')} - {data.get('message', '')}")
         return None
 
+    def _payload(self, user_image_url: str, prompt: str) -> Dict[str, Any]:
+        init_images = [user_image_url]  # on reste sur la version user-only
+
+        return {
+            "init_image": init_images,
+            "prompt": prompt,
+            "model_id": self.model_id,
+            "aspect-ratio": self.aspect_ratio,
+            "key": self.api_key,
+        }
+
+    def _parse_response(self, data: Dict[str, Any], attempt: int) -> Tuple[Optional[str], bool]:
+        """
+        Retourne (url de l'image ou None, faut-il retenter).
+        """
+        print("[ModelslabImageClient] Raw response:")
+        print(json.dumps(data, indent=2))
+
+        status = data.get("status")
+        if status == "success":
+            output = data.get("output") or []
+            proxy_links = data.get("proxy_links") or []
+
+            if isinstance(output, list) and output:
+                first = output[0]
+                if isinstance(first, str):
+                    return first, False
+
+            if isinstance(proxy_links, list) and proxy_links:
+                first = proxy_links[0]
+                if isinstance(first, str):
+                    return first, False
+
+            print("[ModelslabImageClient] No usable URL in response.")
+            return None, False
+
+        # ici status != "success"
+        message = data.get("message", "")
+        print(f"[ModelslabImageClient] Non-success status: {status} - {message}")
+
+        # si c'est une erreur serveur générique, on retente une fois
+        if "server error occurred" in message.lower() and attempt == 0:
+            print("[ModelslabImageClient] Retry once after server error...")
+            return None, True
+
+        # sinon on abandonne direct
+        return None, False
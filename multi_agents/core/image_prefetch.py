@@ -0,0 +1,228 @@
+import io
+import os
+import asyncio
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image, UnidentifiedImageError
+
+from multi_agents.core.config import BASE_DIR
+from multi_agents.core.http_client import get_http_client, get_async_http_client
+
+
+DEFAULT_CACHE_DIR = BASE_DIR / ".cache" / "thumbnails"
+
+# Seuls ces statuts disent que l'image n'existe plus ; le reste (timeout, 5xx, 403
+# d'un CDN qui limite le débit...) peut être passager
+GONE_STATUSES = (404, 410)
+
+
+class ImagePrefetcher:
+    """
+    Téléchargement en tâche de fond des images produits / aperçus :
+    - dès qu'un produit est choisi, son image est téléchargée (en parallèle)
+    - une miniature JPEG est écrite dans un cache disque borné en taille (LRU par mtime)
+    - l'UI sert les miniatures depuis ce cache au lieu des images pleine taille
+    - les URLs mortes (HTTP en erreur, contenu non image) sont repérées et peuvent
+      être écartées avant d'appeler Modelslab (une génération ratée coûte ~120 s) ;
+      la marque est définitive sur 404 / 410, limitée à dead_ttl_seconds sinon ;
+      au plus max_dead_urls marques gardées (LRU)
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        max_bytes: int = 200 * 1024 * 1024,
+        thumbnail_size: Tuple[int, int] = (440, 440),
+        max_workers: int = 8,
+        dead_ttl_seconds: float = 600.0,
+        max_dead_urls: int = 10000,
+    ) -> None:
+        self.cache_dir = Path(cache_dir or DEFAULT_CACHE_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.thumbnail_size = thumbnail_size
+        self.dead_ttl_seconds = dead_ttl_seconds
+        self.max_dead_urls = max_dead_urls
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-prefetch")
+        self._futures: Dict[str, Future] = {}
+        # url -> fin de la marque (None = définitive), du moins au plus récemment vu
+        self._dead: "OrderedDict[str, Optional[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._size = sum(p.stat().st_size for p in self.cache_dir.glob("*.jpg"))
+
+    # ---------------- API ----------------
+
+    def prefetch(self, urls: Iterable[Optional[str]]) -> List[Future]:
+        """
+        Lance (sans attendre) le téléchargement + la miniature de chaque URL.
+        Une URL déjà en cours, déjà en cache ou marquée morte n'est pas retéléchargée.
+        """
+        futures: List[Future] = []
+        for url in urls:
+            if not url or not url.startswith(("http://", "https://")) or self.is_dead(url):
+                continue
+            with self._lock:
+                future = self._futures.get(url)
+                started = future is None
+                if started:
+                    future = self._executor.submit(self._fetch, url)
+                    self._futures[url] = future
+            if started:
+                # Hors du verrou : un futur déjà terminé appelle _forget tout de suite
+                future.add_done_callback(lambda f, u=url: self._forget(u, f))
+            futures.append(future)
+        return futures
+
+    def thumbnail_path(self, url: Optional[str], timeout: Optional[float] = 0.0) -> Optional[Path]:
+        """
+        Chemin de la miniature en cache, ou None si indisponible.
+        timeout : temps max d'attente d'un téléchargement en cours (0 = pas d'attente).
+        """
+        if not url:
+            return None
+        path = self._path(url)
+        if path.exists():
+            return path
+        with self._lock:
+            future = self._futures.get(url)
+        if future is None or (timeout == 0.0 and not future.done()):
+            return None
+        try:
+            return future.result(timeout=timeout)
+        except Exception:
+            return None
+
+    def thumbnail_bytes(self, url: Optional[str], timeout: Optional[float] = 0.0) -> Optional[bytes]:
+        path = self.thumbnail_path(url, timeout=timeout)
+        if path is None:
+            return None
+        try:
+            path.touch()  # LRU : une miniature affichée reste en cache
+            return path.read_bytes()
+        except OSError:
+            return None
+
+    def is_dead(self, url: str) -> bool:
+        with self._lock:
+            if url not in self._dead:
+                return False
+            until = self._dead[url]
+            if until is not None and until <= time.time():
+                # Échec passager expiré : l'URL sera réessayée
+                del self._dead[url]
+                return False
+            self._dead.move_to_end(url)
+            return True
+
+    async def acheck(self, urls: Iterable[str]) -> Dict[str, bool]:
+        """
+        Vérifie en parallèle que chaque URL répond avec une image.
+        Retourne {url: vivante}. Les URLs déjà en cache sont considérées vivantes.
+        """
+        urls = list(dict.fromkeys(u for u in urls if u))
+        results = await asyncio.gather(*(self._acheck_one(url) for url in urls))
+        return dict(zip(urls, results))
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # ---------------- Interne ----------------
+
+    def _path(self, url: str) -> Path:
+        return self.cache_dir / (hashlib.sha1(url.encode("utf-8")).hexdigest() + ".jpg")
+
+    def _forget(self, url: str, future: Future) -> None:
+        # Succès : le cache fichier suffit ; échec : la marque morte (ou son expiration)
+        # décide d'un nouvel essai, pas un futur en échec gardé à vie
+        with self._lock:
+            if self._futures.get(url) is future:
+                del self._futures[url]
+
+    def _mark_dead(self, url: str, reason: str, status: Optional[int] = None) -> None:
+        permanent = status in GONE_STATUSES
+        print(f"[ImagePrefetcher] URL d'image morte {url} : {reason}" + ("" if permanent else " (nouvel essai plus tard)"))
+        with self._lock:
+            self._dead[url] = None if permanent else time.time() + self.dead_ttl_seconds
+            self._dead.move_to_end(url)
+            while len(self._dead) > self.max_dead_urls:
+                self._dead.popitem(last=False)
+
+    async def _acheck_one(self, url: str) -> bool:
+        if not url.startswith(("http://", "https://")) or self._path(url).exists():
+            # data: URI, chemin local... : rien à vérifier côté réseau
+            return True
+        if self.is_dead(url):
+            return False
+        try:
+            resp = await get_async_http_client().head(url)
+            if resp.status_code in (405, 501):
+                # HEAD refusé par certains CDN : petit GET partiel
+                resp = await get_async_http_client().get(url, headers={"Range": "bytes=0-1023"})
+        except Exception as err:
+            self._mark_dead(url, str(err))
+            return False
+        content_type = resp.headers.get("content-type", "")
+        if resp.status_code >= 400 or (content_type and not content_type.startswith("image/")):
+            self._mark_dead(url, f"HTTP {resp.status_code} {content_type}", resp.status_code)
+            return False
+        return True
+
+    def _fetch(self, url: str) -> Optional[Path]:
+        path = self._path(url)
+        if path.exists():
+            return path
+        try:
+            resp = get_http_client().get(url)
+            if resp.status_code >= 400:
+                self._mark_dead(url, f"HTTP {resp.status_code}", resp.status_code)
+                return None
+            with Image.open(io.BytesIO(resp.content)) as img:
+                img = img.convert("RGB")
+                img.thumbnail(self.thumbnail_size, Image.LANCZOS)
+                out = io.BytesIO()
+                img.save(out, format="JPEG", quality=80, optimize=True)
+        except (UnidentifiedImageError, OSError) as err:
+            self._mark_dead(url, f"not an image: {err}")
+            return None
+        except Exception as err:
+            self._mark_dead(url, str(err))
+            return None
+
+        data = out.getvalue()
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)  # écriture atomique : l'UI ne lit jamais une miniature partielle
+        with self._lock:
+            self._size += len(data)
+        self._evict()
+        return path
+
+    def _evict(self) -> None:
+        with self._lock:
+            if self._size <= self.max_bytes:
+                return
+            entries = []
+            for p in self.cache_dir.glob("*.jpg"):
+                try:
+                    stat = p.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, p))
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            for _, size, p in entries:
+                if total <= self.max_bytes * 0.9:
+                    break
+                try:
+                    p.unlink()
+                    total -= size
+                except OSError:
+                    pass
+            self._size = total
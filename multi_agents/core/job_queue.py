@@ -0,0 +1,289 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+
+DEFAULT_JOBS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "jobs.sqlite3"
+)
+
+# Avancement affiché pendant une étape (started) et une fois l'étape terminée (done)
+STAGE_PROGRESS: Dict[str, Tuple[int, int]] = {
+    "event_analyzer": (10, 25),
+    "stylist": (30, 50),
+    "product_search": (55, 85),
+    "visualizer": (88, 98),
+    "memoized": (100, 100),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    request_hash TEXT NOT NULL,
+    status TEXT NOT NULL,
+    request TEXT NOT NULL,
+    photo BLOB,
+    stage TEXT,
+    stage_status TEXT,
+    progress INTEGER NOT NULL DEFAULT 0,
+    partial TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    error TEXT,
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    submitted_at REAL NOT NULL,
+    started_at REAL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, submitted_at);
+CREATE INDEX IF NOT EXISTS jobs_request ON jobs (request_hash, status);
+
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    pid INTEGER NOT NULL,
+    heartbeat_at REAL NOT NULL,
+    jobs_done INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def _dumps(data: Any) -> str:
+    return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class PipelineJobStore:
+    """
+    File de demandes pipeline persistée dans SQLite (WAL), partagée entre le process
+    Streamlit (submit / get) et les workers (claim / record_stage / finish) :
+    - submit() renvoie immédiatement un job_id ; une demande identique déjà en file ou
+      en cours réutilise le même job (double clic, re-run Streamlit)
+    - état, étape en cours, avancement et sorties partielles (événement, tenues...)
+      survivent à un redémarrage de l'UI ou d'un worker
+    - un job dont le worker ne donne plus signe de vie est remis en file (max_attempts)
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        max_attempts: int = 2,
+        keep_finished_seconds: float = 24 * 3600,
+    ) -> None:
+        self.path = path or os.getenv("PIPELINE_JOBS_PATH") or DEFAULT_JOBS_PATH
+        self.max_attempts = max_attempts
+        self.keep_finished_seconds = keep_finished_seconds
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        # isolation_level=None : transactions explicites (BEGIN IMMEDIATE pour claim)
+        self._conn = sqlite3.connect(self.path, timeout=10.0, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            if self.path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    # ---------------- Côté UI ----------------
+
+    def submit(self, request: Dict[str, Any]) -> str:
+        """
+        request : paramètres de Orchestrator.arun_pipeline (user_image_bytes compris).
+        """
+        request = dict(request)
+        photo: Optional[bytes] = request.pop("user_image_bytes", None)
+        encoded = _dumps(request)
+        request_hash = hashlib.sha256(encoded.encode("utf-8") + (photo or b"")).hexdigest()
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE request_hash = ? AND status IN ('queued', 'running')",
+                    (request_hash,),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute("COMMIT")
+                    return row["id"]
+                job_id = uuid.uuid4().hex
+                self._conn.execute(
+                    "INSERT INTO jobs (id, request_hash, status, request, photo, submitted_at, updated_at) "
+                    "VALUES (?, ?, 'queued', ?, ?, ?, ?)",
+                    (job_id, request_hash, encoded, photo, now, now),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        """
+        État d'un job : status ("queued" / "running" / "done" / "error" / "unknown"),
+        stage, stage_status, progress (0-100), partial, result, error, position dans la file.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return {"status": "unknown", "result": None, "error": None}
+            info = {
+                "status": row["status"],
+                "stage": row["stage"],
+                "stage_status": row["stage_status"],
+                "progress": row["progress"],
+                "partial": json.loads(row["partial"]),
+                "result": json.loads(row["result"]) if row["result"] else None,
+                "error": row["error"],
+                "submitted_at": row["submitted_at"],
+                "latency_s": (row["finished_at"] - row["started_at"]) if row["finished_at"] and row["started_at"] else None,
+            }
+            if row["status"] == "queued":
+                info["position"] = self._conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND submitted_at <= ?",
+                    (row["submitted_at"],),
+                ).fetchone()[0]
+            return info
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+
+    # ---------------- Côté workers ----------------
+
+    def claim(self, worker_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Prend le plus ancien job en file (atomique entre process). Renvoie (job_id, request) ou None.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT id, request, photo FROM jobs WHERE status = 'queued' ORDER BY submitted_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, "
+                    "started_at = ?, updated_at = ? WHERE id = ?",
+                    (worker_id, now, now, row["id"]),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        request = json.loads(row["request"])
+        request["user_image_bytes"] = row["photo"]
+        return row["id"], request
+
+    def record_stage(self, job_id: str, stage: str, status: str, data: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Événement d'étape (cf. Orchestrator on_stage) : étape courante, avancement et
+        sorties partielles de l'étape terminée.
+        """
+        started, done = STAGE_PROGRESS.get(stage, (0, 0))
+        progress = done if status == "done" else started
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT partial FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                partial = json.loads(row["partial"]) if row is not None else {}
+                if status == "done" and data and stage != "memoized":
+                    partial.update(data)
+                self._conn.execute(
+                    "UPDATE jobs SET stage = ?, stage_status = ?, progress = MAX(progress, ?), "
+                    "partial = ?, updated_at = ? WHERE id = ?",
+                    (stage, status, progress, _dumps(partial), time.time(), job_id),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def finish(self, job_id: str, result: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'done', progress = 100, result = ?, photo = NULL, "
+                "updated_at = ?, finished_at = ? WHERE id = ?",
+                (_dumps(result), now, now, job_id),
+            )
+
+    def fail(self, job_id: str, error: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'error', error = ?, photo = NULL, updated_at = ?, finished_at = ? "
+                "WHERE id = ?",
+                (error, now, now, job_id),
+            )
+
+    def heartbeat(self, worker_id: str, jobs_done: int = 0) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO workers (id, pid, heartbeat_at, jobs_done) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at, jobs_done = excluded.jobs_done",
+                (worker_id, os.getpid(), time.time(), jobs_done),
+            )
+
+    def unregister(self, worker_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM workers WHERE id = ?", (worker_id,))
+
+    def live_workers(self, max_age_seconds: float = 15.0) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM workers WHERE heartbeat_at >= ?", (time.time() - max_age_seconds,)
+            ).fetchone()[0]
+
+    def requeue_orphans(self, max_age_seconds: float = 60.0) -> int:
+        """
+        Jobs "running" dont le worker ne bat plus : remis en file, ou en erreur après
+        max_attempts tentatives. Renvoie le nombre de jobs remis en file.
+        """
+        limit = time.time() - max_age_seconds
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                orphans = self._conn.execute(
+                    "SELECT j.id, j.attempts FROM jobs j LEFT JOIN workers w ON w.id = j.worker "
+                    "WHERE j.status = 'running' AND (w.id IS NULL OR w.heartbeat_at < ?)",
+                    (limit,),
+                ).fetchall()
+                requeued = 0
+                for row in orphans:
+                    if row["attempts"] >= self.max_attempts:
+                        self._conn.execute(
+                            "UPDATE jobs SET status = 'error', error = 'worker perdu', photo = NULL, "
+                            "updated_at = ?, finished_at = ? WHERE id = ?",
+                            (time.time(), time.time(), row["id"]),
+                        )
+                    else:
+                        self._conn.execute(
+                            "UPDATE jobs SET status = 'queued', worker = NULL, updated_at = ? WHERE id = ?",
+                            (time.time(), row["id"]),
+                        )
+                        requeued += 1
+                self._conn.execute("DELETE FROM workers WHERE heartbeat_at < ?", (limit,))
+                self._conn.execute(
+                    "DELETE FROM jobs WHERE status IN ('done', 'error') AND finished_at < ?",
+                    (time.time() - self.keep_finished_seconds,),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return requeued
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
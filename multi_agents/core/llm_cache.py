@@ -0,0 +1,65 @@
+import os
+import json
+import hashlib
+from typing import Any, Dict, Optional
+
+from multi_agents.core.cache_backend import CacheBackend, SQLiteCacheBackend, shared_cache
+
+
+NAMESPACE = "llm"
+
+
+class LLMResponseCache:
+    """
+    Cache persistant des réponses LLM, stocké dans un CacheBackend (espace "llm") :
+    - clé : modèle + prompt système + prompt utilisateur + max_tokens (hash SHA-256) ;
+      les prompts étant compacts et déterministes, une même entrée d'agent redonne la même clé
+    - expiration après ttl_seconds
+    - partagé entre process (UI, workers, job de préchauffage) par le backend SQLite
+      (data/cache.sqlite3, ou le fichier `path` / LLM_CACHE_PATH)
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        ttl_seconds: float = 7 * 24 * 3600,
+        backend: Optional[CacheBackend] = None,
+    ) -> None:
+        # Fichier dédié (path) : backend propre, fermé avec le cache ; sinon backend partagé du process
+        self._owns_backend = backend is None and bool(path)
+        if backend is None:
+            backend = SQLiteCacheBackend(path) if path else shared_cache(os.getenv("LLM_CACHE_PATH"))
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model: str, system_prompt: str, user_prompt: str, max_tokens: Optional[int] = None) -> str:
+        raw = json.dumps([model, system_prompt, user_prompt, max_tokens], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.backend.get(NAMESPACE, key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["response"]
+
+    def put(self, key: str, response: str, agent: str = "default", model: str = "") -> None:
+        if not response:
+            return
+        self.backend.set(NAMESPACE, key, {"response": response, "agent": agent, "model": model}, self.ttl_seconds)
+
+    def purge(self) -> int:
+        return self.backend.purge(NAMESPACE)
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self.backend.stats(NAMESPACE)["entries"]
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        if self._owns_backend:
+            self.backend.close()
@@ -1,30 +1,193 @@
 import os
-from typing import Optional
-from pathlib import Path
+import math
+import time
+import asyncio
+import weakref
+import threading
+from typing import Callable, Dict, List, Optional, TYPE_CHECKING
 
-from dotenv import load_dotenv
-from groq import Groq
+from multi_agents.core.config import load_env
+from multi_agents.core.prompt_builder import AGENT_MAX_TOKENS
 
+if TYPE_CHECKING:
+    from groq import AsyncGroq
+    from multi_agents.core.llm_cache import LLMResponseCache
 
-# Charger automatiquement le .env à partir de la racine du projet
-# (on remonte de 2 niveaux depuis ce fichier : core/ -> multi_agents/ -> racine)
-BASE_DIR = Path(__file__).resolve().parents[2]
-env_path = BASE_DIR / ".env"
-if env_path.exists():
-    load_dotenv(dotenv_path=env_path)
+
+class LatencyHistogram:
+    """
+    Histogramme de latences à buckets logarithmiques (10 ms -> ~80 s, +10% par bucket).
+    Mémoire constante, quantiles approchés à ~5% près.
+    """
+
+    MIN_S = 0.01
+    GROWTH = 1.1
+    BUCKETS = 96
+
+    def __init__(self) -> None:
+        self.counts: List[int] = [0] * self.BUCKETS
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        index = 0
+        if seconds > self.MIN_S:
+            index = min(int(math.log(seconds / self.MIN_S, self.GROWTH)) + 1, self.BUCKETS - 1)
+        self.counts[index] += 1
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if seen >= target:
+                # borne haute du bucket
+                return self.MIN_S * self.GROWTH ** index
+        return self.MIN_S * self.GROWTH ** (self.BUCKETS - 1)
+
+
+class HedgingPolicy:
+    """
+    Requêtes "hedgées" : si un appel n'a pas répondu au bout du p95 observé pour
+    cet agent, on envoie un doublon et on garde la première réponse.
+    - seuils calculés automatiquement à partir d'un histogramme par agent
+    - pas de hedge tant que l'histogramme n'a pas min_samples mesures
+    - budget : au plus budget_ratio requêtes supplémentaires par appel
+    """
+
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        budget_ratio: float = 0.1,
+        min_samples: int = 20,
+        min_delay_s: float = 0.2,
+    ) -> None:
+        self.quantile = quantile
+        self.budget_ratio = budget_ratio
+        self.min_samples = min_samples
+        self.min_delay_s = min_delay_s
+
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+
+    def observe(self, agent: str, seconds: float) -> None:
+        with self._lock:
+            self.histograms.setdefault(agent, LatencyHistogram()).observe(seconds)
+
+    def threshold(self, agent: str) -> Optional[float]:
+        with self._lock:
+            histogram = self.histograms.get(agent)
+            if histogram is None or histogram.count < self.min_samples:
+                return None
+            return max(histogram.quantile(self.quantile) or 0.0, self.min_delay_s)
+
+    def record_call(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def try_acquire(self) -> bool:
+        """
+        Réserve un hedge dans le budget (False si le budget est épuisé).
+        """
+        with self._lock:
+            if self.hedges + 1 > self.budget_ratio * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def record_win(self) -> None:
+        with self._lock:
+            self.hedge_wins += 1
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "hedge_ratio": self.hedges / self.calls if self.calls else None,
+                "p95_s": {
+                    agent: histogram.quantile(self.quantile)
+                    for agent, histogram in self.histograms.items()
+                },
+            }
+
+
+class AgentLLMClient:
+    """
+    Vue d'un LLMClient liée à un agent : modèle routé pour cet agent,
+    latences et seuils de hedge par agent.
+    """
+
+    # chat / achat acceptent validate (mise en cache des seules réponses valides)
+    caches_validated = True
+
+    def __init__(
+        self,
+        client: "LLMClient",
+        agent: str,
+        model: str,
+        metric_key: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+    ) -> None:
+        self.client = client
+        self.agent = agent
+        self.model = model
+        self.metric_key = metric_key or agent
+        self.max_tokens = max_tokens
+
+    def chat(self, system_prompt: str, user_prompt: str, validate: Optional[Callable[[str], bool]] = None) -> str:
+        return self.client.chat(
+            system_prompt,
+            user_prompt,
+            agent=self.metric_key,
+            model=self.model,
+            max_tokens=self.max_tokens,
+            validate=validate,
+        )
+
+    async def achat(
+        self, system_prompt: str, user_prompt: str, validate: Optional[Callable[[str], bool]] = None
+    ) -> str:
+        return await self.client.achat(
+            system_prompt,
+            user_prompt,
+            agent=self.metric_key,
+            model=self.model,
+            max_tokens=self.max_tokens,
+            validate=validate,
+        )
 
 
 class LLMClient:
     """
     Wrapper pour l'API Groq.
-    Lit la clé dans le .env (GROQ_API_KEY).
+    Lit la clé dans le .env (GROQ_API_KEY). Le SDK groq n'est importé qu'à la construction.
+    Avec une HedgingPolicy, les appels asynchrones lents sont doublés (voir HedgingPolicy).
+    model_routes : modèle par agent (ex: petit modèle rapide pour les tâches simples) ;
+    `model` reste le grand modèle, utilisé par défaut et pour l'escalade.
+    Avec un LLMResponseCache, une requête déjà vue (même modèle, mêmes prompts) est
+    servie sans appel réseau. Seules les réponses validées par l'appelant (validate :
+    JSON parsable, champs attendus...) sont mises en cache : une sortie tronquée ou
+    invalide n'est pas rejouée et l'escalade qu'elle déclenche a lieu à chaque fois.
     """
 
+    caches_validated = True
+
     def __init__(
         self,
         api_key: Optional[str] = None,
         model: str = "llama-3.3-70b-versatile",
+        hedging: Optional[HedgingPolicy] = None,
+        model_routes: Optional[Dict[str, str]] = None,
+        cache: Optional["LLMResponseCache"] = None,
     ) -> None:
+        load_env()
         api_key = api_key or os.getenv("GROQ_API_KEY")
         if not api_key:
             raise ValueError(
@@ -32,16 +195,274 @@ class LLMClient:
                 "Ajoute-le dans un fichier .env à la racine du projet."
             )
 
+        from groq import Groq
+
+        self.api_key = api_key
         self.client = Groq(api_key=api_key)
         self.model = model
+        self.hedging = hedging
+        self.cache = cache
+        self.model_routes: Dict[str, str] = dict(model_routes or {})
+        self._agents: Dict[tuple, AgentLLMClient] = {}
+        # Tokens mesurés par agent (usage renvoyé par l'API)
+        self.usage: Dict[str, Dict[str, int]] = {}
+        self._usage_lock = threading.Lock()
+        # AsyncGroq garde un pool de connexions lié à sa boucle : un client par boucle
+        self._async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncGroq]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _messages(self, system_prompt: str, user_prompt: str) -> list:
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+
+    def _async_client(self) -> "AsyncGroq":
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            from groq import AsyncGroq
 
-    def chat(self, system_prompt: str, user_prompt: str) -> str:
+            client = AsyncGroq(api_key=self.api_key)
+            self._async_clients[loop] = client
+        return client
+
+    def route(self, agent: str, model: str) -> None:
+        self.model_routes[agent] = model
+        # Les vues déjà créées pour cet agent pointent sur l'ancien modèle
+        self._agents.pop((agent, False), None)
+
+    def model_for(self, agent: str, escalate: bool = False) -> str:
+        if escalate:
+            return self.model
+        return self.model_routes.get(agent, self.model)
+
+    def can_escalate(self, agent: str) -> bool:
+        """
+        True si l'agent est routé vers un autre modèle que le grand modèle.
+        """
+        return self.model_for(agent) != self.model
+
+    def for_agent(self, agent: str, escalate: bool = False) -> AgentLLMClient:
+        """
+        Client lié à un agent : modèle routé (ou grand modèle si escalate) et
+        histogramme de latence propre à cet agent.
+        """
+        key = (agent, escalate)
+        bound = self._agents.get(key)
+        if bound is None:
+            metric_key = f"{agent}:escalade" if escalate else agent
+            bound = self._agents.setdefault(
+                key,
+                AgentLLMClient(
+                    self,
+                    agent,
+                    self.model_for(agent, escalate),
+                    metric_key,
+                    max_tokens=AGENT_MAX_TOKENS.get(agent),
+                ),
+            )
+        return bound
+
+    def chat(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        agent: str = "default",
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        validate: Optional[Callable[[str], bool]] = None,
+    ) -> str:
+        model = model or self.model
+        key = self._cache_key(model, system_prompt, user_prompt, max_tokens, validate)
+        cached = self.cache.get(key) if key is not None and self.cache is not None else None
+        if cached is not None:
+            return cached
+
+        # Pas de hedge en synchrone (il faudrait un thread par doublon) : on mesure seulement
+        start = time.perf_counter()
         completion = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
+            model=model,
+            messages=self._messages(system_prompt, user_prompt),
+            temperature=0.2,
+            max_tokens=max_tokens,
+        )
+        if self.hedging is not None:
+            self.hedging.observe(agent, time.perf_counter() - start)
+        self._record_usage(agent, completion)
+        if max_tokens is not None and self._truncated(completion):
+            # JSON coupé par la limite : refait sans limite plutôt que rendu invalide
+            print(f"[LLMClient] Réponse {agent} tronquée à max_tokens={max_tokens}, nouvel essai sans limite")
+            completion = self.client.chat.completions.create(
+                model=model,
+                messages=self._messages(system_prompt, user_prompt),
+                temperature=0.2,
+            )
+            self._record_usage(agent, completion)
+        response = completion.choices[0].message.content
+        if self._valid(response, validate):
+            self._cache_put(key, response, agent, model)
+        return response
+
+    async def achat(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        agent: str = "default",
+        model: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        validate: Optional[Callable[[str], bool]] = None,
+    ) -> str:
+        model = model or self.model
+        key = self._cache_key(model, system_prompt, user_prompt, max_tokens, validate)
+        # Lecture SQLite hors de la boucle d'événements
+        cached = await asyncio.to_thread(self.cache.get, key) if key is not None and self.cache is not None else None
+        if cached is not None:
+            return cached
+
+        if self.hedging is None:
+            response = await self._acomplete(system_prompt, user_prompt, model, agent=agent, max_tokens=max_tokens)
+        else:
+            response = await self._ahedged(system_prompt, user_prompt, agent, model, max_tokens)
+        if self._valid(response, validate):
+            await asyncio.to_thread(self._cache_put, key, response, agent, model)
+        return response
+
+    def _cache_key(
+        self,
+        model: str,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: Optional[int],
+        validate: Optional[Callable[[str], bool]],
+    ) -> Optional[str]:
+        # Sans validation par l'appelant, rien n'est mis en cache (ni relu)
+        if self.cache is None or validate is None:
+            return None
+        return self.cache.key(model, system_prompt, user_prompt, max_tokens)
+
+    @staticmethod
+    def _valid(response: Optional[str], validate: Optional[Callable[[str], bool]]) -> bool:
+        if not response or validate is None:
+            return False
+        try:
+            return bool(validate(response))
+        except Exception:
+            return False
+
+    def _cache_put(self, key: Optional[str], response: str, agent: str, model: str) -> None:
+        if key is None or self.cache is None:
+            return
+        # Le cache est un bonus : une erreur d'écriture ne fait pas échouer l'appel
+        try:
+            self.cache.put(key, response, agent=agent, model=model)
+        except Exception as err:
+            print(f"[LLMClient] Écriture en cache échouée : {err}")
+
+    async def _acomplete(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        model: str,
+        agent: str = "default",
+        max_tokens: Optional[int] = None,
+    ) -> str:
+        completion = await self._async_client().chat.completions.create(
+            model=model,
+            messages=self._messages(system_prompt, user_prompt),
             temperature=0.2,
+            max_tokens=max_tokens,
         )
+        self._record_usage(agent, completion)
+        if max_tokens is not None and self._truncated(completion):
+            print(f"[LLMClient] Réponse {agent} tronquée à max_tokens={max_tokens}, nouvel essai sans limite")
+            completion = await self._async_client().chat.completions.create(
+                model=model,
+                messages=self._messages(system_prompt, user_prompt),
+                temperature=0.2,
+            )
+            self._record_usage(agent, completion)
         return completion.choices[0].message.content
+
+    @staticmethod
+    def _truncated(completion: object) -> bool:
+        """
+        True si la réponse a été coupée par max_tokens (finish_reason "length").
+        """
+        choices = getattr(completion, "choices", None) or []
+        return bool(choices) and getattr(choices[0], "finish_reason", None) == "length"
+
+    def _record_usage(self, agent: str, completion: object) -> None:
+        """
+        Tokens réellement facturés par agent (champ usage de la réponse Groq).
+        """
+        usage = getattr(completion, "usage", None)
+        if usage is None:
+            return
+        with self._usage_lock:
+            totals = self.usage.setdefault(agent, {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            totals["calls"] += 1
+            totals["prompt_tokens"] += getattr(usage, "prompt_tokens", 0) or 0
+            totals["completion_tokens"] += getattr(usage, "completion_tokens", 0) or 0
+
+    async def _ahedged(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        agent: str,
+        model: str,
+        max_tokens: Optional[int] = None,
+    ) -> str:
+        policy = self.hedging
+        assert policy is not None
+        policy.record_call()
+
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(
+            self._acomplete(system_prompt, user_prompt, model, agent=agent, max_tokens=max_tokens)
+        )
+
+        def observe_primary(task: "asyncio.Future[str]") -> None:
+            # Latence propre du primaire (jamais celle, raccourcie, du doublon gagnant) :
+            # sinon le p95 baisse à chaque hedge gagné et les hedges se multiplient.
+            # Primaire annulé : échantillon censuré, le temps écoulé est un minorant
+            if not task.cancelled():
+                task.exception()  # marque l'erreur éventuelle comme lue
+            policy.observe(agent, time.perf_counter() - start)
+
+        primary.add_done_callback(observe_primary)
+        threshold = policy.threshold(agent)
+
+        if threshold is not None:
+            done, _ = await asyncio.wait({primary}, timeout=threshold)
+            if not done and policy.try_acquire():
+                print(f"[LLMClient] Appel {agent} doublé après {threshold:.2f} s")
+                hedge = asyncio.ensure_future(
+                    self._acomplete(system_prompt, user_prompt, model, agent=agent, max_tokens=max_tokens)
+                )
+                # Le perdant (primaire ou doublon) est annulé : pas d'appel payé pour rien
+                winner = await self._first_success(primary, hedge)
+                if winner is hedge:
+                    policy.record_win()
+                return winner.result()
+
+        return await primary
+
+    @staticmethod
+    async def _first_success(*tasks: "asyncio.Future[str]") -> "asyncio.Future[str]":
+        """
+        Renvoie la première tâche terminée sans erreur (ou la dernière en erreur) et annule
+        les autres.
+        """
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None or not pending:
+                        return task
+            raise RuntimeError("unreachable")
+        finally:
+            for task in pending:
+                task.cancel()
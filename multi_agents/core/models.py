@@ -25,6 +25,11 @@ class EventUnderstanding(TypedDict):
     gender: str
     age: Optional[int]
 
+# 🔹 Extraction locale (règles) de l'événement, avec une confiance par champ (0 à 1)
+class EventExtraction(TypedDict):
+    event: EventUnderstanding
+    confidence: Dict[str, float]
+
 """styliste stuff"""
 
 class OutfitItemBudget(TypedDict):
@@ -83,6 +88,25 @@ class MannequinPromptOutput(TypedDict):
     prompt: str
 
 
+# 🔹 Tous les candidats scrappés pour un item, avec leur score de sélection
+class ItemCandidatePool(TypedDict):
+    item: OutfitItemBudget
+    candidates: List[ProductCandidate]
+    scores: List[float]     # score du ranker (+ bonus pour le produit sélectionné)
+    chosen_index: int       # choix du sélecteur (ranker local ou LLM)
+
+
+# 🔹 Photo utilisateur après ingestion (EXIF retiré, redimensionnée, ré-encodée)
+class IngestedPhoto(TypedDict):
+    sha256: str             # empreinte du contenu ré-encodé (clé des caches d'aperçus)
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    original_size: int      # taille en octets de la photo reçue
+    url: Optional[str]      # URL publique de la copie ingérée (une fois uploadée)
+
+
 
 # 🔹 Une tenue après résolution complète
 class ResolvedOutfit(TypedDict):
@@ -176,6 +200,14 @@ class ProductSelectorInput(TypedDict):
 class ProductSelectorOutput(TypedDict):
     chosen_index: int
     reason: Optional[str]
+
+
+class PrewarmItem(TypedDict):
+    season: str
+    event_type: str
+    event: EventUnderstanding       # dernier événement des sessions où l'article apparaît
+    item: OutfitItemBudget          # max_price = le plus haut observé
+    count: int
 """pRODUIT / SCRAPPING"""
 
 
@@ -0,0 +1,63 @@
+import math
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+
+def optimize_outfit(
+    prices: Sequence[Sequence[float]],
+    scores: Sequence[Sequence[float]],
+    budget: float,
+    resolution: float = 0.01,
+) -> Optional[List[int]]:
+    """
+    Sac à dos à choix multiples : choisit exactement un candidat par article
+    (prices[i][j], scores[i][j]) pour maximiser la somme des scores sous le budget global.
+
+    Programmation dynamique sur le coût discrétisé (au centime par défaut),
+    vectorisée avec NumPy : O(nb_articles * nb_candidats * budget / resolution).
+    Les prix sont arrondis au supérieur pour ne jamais dépasser le budget.
+
+    Retourne la liste des index choisis (un par article), ou None si aucune
+    combinaison ne tient dans le budget.
+    """
+    if len(prices) != len(scores):
+        raise ValueError("prices et scores doivent avoir le même nombre d'articles")
+    if not prices:
+        return []
+    if any(len(p) == 0 for p in prices):
+        return None
+
+    capacity = int(math.floor(budget / resolution + 1e-9))
+    if capacity < 0:
+        return None
+
+    # best[b] = meilleur score total avec un coût <= b (sur les articles déjà traités)
+    best = np.zeros(capacity + 1, dtype=np.float64)
+    choices = np.full((len(prices), capacity + 1), -1, dtype=np.int32)
+
+    for i, (item_prices, item_scores) in enumerate(zip(prices, scores)):
+        new = np.full(capacity + 1, -np.inf)
+        for j, (price, score) in enumerate(zip(item_prices, item_scores)):
+            cost = int(math.ceil(float(price) / resolution - 1e-9))
+            if cost > capacity:
+                continue
+            shifted = np.full(capacity + 1, -np.inf)
+            shifted[cost:] = best[: capacity + 1 - cost] + float(score)
+            better = shifted > new
+            new[better] = shifted[better]
+            choices[i, better] = j
+        best = new
+
+    if not np.isfinite(best[capacity]):
+        return None
+
+    # Reconstruction à partir du budget total
+    picked: List[int] = [0] * len(prices)
+    b = capacity
+    for i in range(len(prices) - 1, -1, -1):
+        j = int(choices[i, b])
+        picked[i] = j
+        b -= int(math.ceil(float(prices[i][j]) / resolution - 1e-9))
+
+    return picked
@@ -0,0 +1,134 @@
+import io
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Union
+
+from PIL import Image, ImageOps
+
+from multi_agents.core.http_client import get_async_http_client
+from multi_agents.core.models import IngestedPhoto
+
+
+# Résolution de travail du modèle image-to-image (côté le plus long)
+DEFAULT_MAX_SIDE = 1024
+DEFAULT_JPEG_QUALITY = 85
+
+
+def ingest_photo(
+    raw: bytes,
+    max_side: int = DEFAULT_MAX_SIDE,
+    quality: int = DEFAULT_JPEG_QUALITY,
+) -> IngestedPhoto:
+    """
+    Prépare une photo utilisateur pour la génération d'images :
+    - applique l'orientation EXIF puis retire toutes les métadonnées (GPS, appareil...)
+    - réduit au côté max de travail du modèle (jamais d'agrandissement)
+    - ré-encode en JPEG progressif optimisé
+    - calcule l'empreinte sha256 du résultat (clé des caches d'aperçus)
+    """
+    with Image.open(io.BytesIO(raw)) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "L"):
+            # Transparence éventuelle aplatie sur fond blanc
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            rgba = img.convert("RGBA")
+            background.paste(rgba, mask=rgba.getchannel("A"))
+            img = background
+        img = img.convert("RGB")
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+
+        out = io.BytesIO()
+        # Pas de paramètre exif= : l'image ré-encodée ne porte aucune métadonnée
+        img.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+        width, height = img.size
+
+    data = out.getvalue()
+    return {
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "data": data,
+        "mime_type": "image/jpeg",
+        "width": width,
+        "height": height,
+        "original_size": len(raw),
+        "url": None,
+    }
+
+
+class PhotoIngestor:
+    """
+    Ingestion de la photo utilisateur, une seule fois par photo :
+    - la même photo (mêmes octets ou même URL) n'est ni re-téléchargée ni ré-encodée
+    - la copie compacte n'est uploadée qu'une fois (cache par empreinte) et son URL
+      est réutilisée pour toutes les tenues d'une demande et pour les re-runs ;
+      au plus max_uploaded URLs gardées (LRU)
+    """
+
+    def __init__(
+        self,
+        uploader: Optional[Callable[[IngestedPhoto], Awaitable[Optional[str]]]] = None,
+        max_side: int = DEFAULT_MAX_SIDE,
+        quality: int = DEFAULT_JPEG_QUALITY,
+        max_entries: int = 64,
+        max_uploaded: int = 512,
+    ) -> None:
+        self.uploader = uploader
+        self.max_side = max_side
+        self.quality = quality
+        self.max_entries = max_entries
+        self.max_uploaded = max_uploaded
+
+        self._by_source: Dict[str, IngestedPhoto] = {}
+        # empreinte -> URL uploadée, de la moins à la plus récemment utilisée
+        self._uploaded: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def aingest(self, source: Union[str, bytes]) -> IngestedPhoto:
+        """
+        source : URL publique de la photo ou contenu brut (upload dans l'UI).
+        """
+        source_key = self._source_key(source)
+        with self._lock:
+            photo = self._by_source.get(source_key)
+
+        if photo is None:
+            raw = source if isinstance(source, bytes) else await self._adownload(source)
+            photo = await asyncio.to_thread(ingest_photo, raw, self.max_side, self.quality)
+            print(
+                f"[PhotoIngestor] {photo['original_size'] // 1024} KB -> {len(photo['data']) // 1024} KB "
+                f"({photo['width']}x{photo['height']})"
+            )
+
+        if photo["url"] is None and self.uploader is not None:
+            with self._lock:
+                url = self._uploaded.get(photo["sha256"])
+                if url is not None:
+                    self._uploaded.move_to_end(photo["sha256"])
+            if url is None:
+                url = await self.uploader(photo)
+            if url:
+                photo = {**photo, "url": url}  # type: ignore[misc]
+                with self._lock:
+                    self._uploaded[photo["sha256"]] = url
+                    self._uploaded.move_to_end(photo["sha256"])
+                    while len(self._uploaded) > self.max_uploaded:
+                        self._uploaded.popitem(last=False)
+
+        with self._lock:
+            self._by_source[source_key] = photo
+            while len(self._by_source) > self.max_entries:
+                self._by_source.pop(next(iter(self._by_source)))
+        return photo
+
+    @staticmethod
+    def _source_key(source: Union[str, bytes]) -> str:
+        if isinstance(source, bytes):
+            return "sha256:" + hashlib.sha256(source).hexdigest()
+        return "url:" + source
+
+    @staticmethod
+    async def _adownload(url: str) -> bytes:
+        resp = await get_async_http_client().get(url)
+        resp.raise_for_status()
+        return resp.content
@@ -0,0 +1,222 @@
+import os
+import sys
+import time
+import uuid
+import argparse
+import threading
+import subprocess
+import multiprocessing
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-process, un seul serveur attendu
+    fcntl = None
+
+from multi_agents.core.job_queue import PipelineJobStore
+
+
+class PipelineWorker:
+    """
+    Worker de la file de demandes : garde un Orchestrator chaud (clients LLM / HTTP,
+    caches, catalogue) et traite les jobs un par un.
+    - chaque étape du pipeline est publiée dans le job (on_stage) : l'UI suit
+      l'avancement réel et affiche les sorties partielles
+    - un battement de cœur (heartbeat) signale le worker vivant ; les jobs d'un worker
+      disparu sont remis en file par les autres (toutes les requeue_interval secondes,
+      pas à chaque scrutation de la file)
+    """
+
+    def __init__(
+        self,
+        store: PipelineJobStore,
+        orchestrator: Any,
+        worker_id: Optional[str] = None,
+        poll_interval: float = 0.5,
+        heartbeat_interval: float = 5.0,
+        requeue_interval: float = 15.0,
+    ) -> None:
+        self.store = store
+        self.orchestrator = orchestrator
+        self.worker_id = worker_id or f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.requeue_interval = requeue_interval
+        self.jobs_done = 0
+
+    def run_once(self) -> bool:
+        """
+        Traite le prochain job en file. Renvoie False si la file est vide.
+        """
+        claimed = self.store.claim(self.worker_id)
+        if claimed is None:
+            return False
+        job_id, request = claimed
+        print(f"[PipelineWorker] {self.worker_id} traite le job {job_id}")
+
+        def on_stage(stage: str, status: str, data: dict) -> None:
+            self.store.record_stage(job_id, stage, status, data)
+
+        try:
+            result = self.orchestrator.run_pipeline(**request, on_stage=on_stage)
+            self.store.finish(job_id, result)
+        except Exception as err:
+            print(f"[PipelineWorker] Job {job_id} en échec : {err}")
+            self.store.fail(job_id, str(err))
+        self.jobs_done += 1
+        return True
+
+    def run_forever(self, stop_event: Optional[threading.Event] = None) -> None:
+        stop_event = stop_event or threading.Event()
+        self.store.heartbeat(self.worker_id, self.jobs_done)
+        # Le battement continue pendant un job long (plusieurs minutes de scraping)
+        beat = threading.Thread(target=self._beat, args=(stop_event,), name="pipeline-heartbeat", daemon=True)
+        beat.start()
+        next_requeue = 0.0
+        try:
+            while not stop_event.is_set():
+                # Transaction d'écriture : périodique, pas à chaque scrutation de chaque worker
+                if time.monotonic() >= next_requeue:
+                    self.store.requeue_orphans(max_age_seconds=self.heartbeat_interval * 6)
+                    next_requeue = time.monotonic() + self.requeue_interval
+                if not self.run_once():
+                    stop_event.wait(self.poll_interval)
+        finally:
+            stop_event.set()
+            self.store.unregister(self.worker_id)
+
+    def _beat(self, stop_event: threading.Event) -> None:
+        while not stop_event.wait(self.heartbeat_interval):
+            self.store.heartbeat(self.worker_id, self.jobs_done)
+
+
+def build_orchestrator() -> Any:
+    """
+    Orchestrateur d'un worker : mêmes caches persistants que l'application.
+    """
+    from multi_agents.orchestrator import Orchestrator
+    from multi_agents.core.cache_backend import shared_cache
+    from multi_agents.core.catalog_store import CatalogStore
+    from multi_agents.core.llm_cache import LLMResponseCache
+    from multi_agents.core.result_store import PipelineResultStore
+
+    return Orchestrator(
+        result_store=PipelineResultStore(),
+        catalog=CatalogStore(),
+        llm_cache=LLMResponseCache(),
+        cache=shared_cache(),
+    )
+
+
+def worker_main(path: Optional[str] = None) -> None:
+    worker = PipelineWorker(PipelineJobStore(path), build_orchestrator())
+    print(f"[PipelineWorker] {worker.worker_id} prêt")
+    worker.run_forever()
+
+
+def serve(processes: int = 2, path: Optional[str] = None) -> None:
+    """
+    Lance un pool de workers (bloquant) et redémarre ceux qui s'arrêtent.
+        python -m multi_agents.core.pipeline_worker --processes 2
+    """
+    context = multiprocessing.get_context("spawn")
+    pool: List[Any] = []
+
+    def start() -> Any:
+        process = context.Process(target=worker_main, args=(path,), name="pipeline-worker", daemon=True)
+        process.start()
+        return process
+
+    pool = [start() for _ in range(processes)]
+    print(f"[PipelineWorker] Pool de {processes} workers démarré")
+    try:
+        while True:
+            time.sleep(2.0)
+            for index, process in enumerate(pool):
+                if not process.is_alive():
+                    print(f"[PipelineWorker] Worker {process.pid} arrêté ({process.exitcode}), redémarrage")
+                    pool[index] = start()
+    except KeyboardInterrupt:
+        for process in pool:
+            process.terminate()
+
+
+def ensure_workers(
+    store: PipelineJobStore,
+    processes: int = 2,
+    timeout_seconds: float = 30.0,
+    spawn: Optional[Callable[[], Any]] = None,
+) -> int:
+    """
+    Vérifie qu'au moins un worker est vivant (battement récent) ; sinon démarre le
+    pool dans un process détaché (partagé ensuite par toutes les sessions). Appelé à
+    chaque soumission : un pool mort est relancé. Le lancement se fait sous verrou de
+    fichier, deux sessions (ou deux serveurs) ne démarrent pas deux pools.
+    Lève TimeoutError si aucun worker ne s'annonce à temps. Renvoie le nombre de
+    workers vivants.
+    """
+    alive = store.live_workers()
+    if alive:
+        return alive
+
+    with _spawn_lock(store.path):
+        # Un autre process a pu lancer le pool pendant l'attente du verrou
+        alive = store.live_workers()
+        if alive:
+            return alive
+
+        if spawn is None:
+            process = subprocess.Popen(
+                [sys.executable, "-m", "multi_agents.core.pipeline_worker", "--processes", str(processes)],
+                cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                env={**os.environ, "PIPELINE_JOBS_PATH": store.path},
+                stdin=subprocess.DEVNULL,
+                start_new_session=True,
+            )
+            print(f"[PipelineWorker] Pool de workers démarré, pid {process.pid}")
+        else:
+            spawn()
+
+        deadline = time.monotonic() + timeout_seconds
+        while True:
+            alive = store.live_workers()
+            if alive:
+                return alive
+            if time.monotonic() > deadline:
+                raise TimeoutError("aucun worker pipeline n'a démarré")
+            time.sleep(0.2)
+
+
+@contextmanager
+def _spawn_lock(path: str) -> Iterator[None]:
+    # Verrou exclusif à côté de la base de la file ; relâché par le système si le
+    # process meurt pendant le lancement
+    if fcntl is None or path == ":memory:":
+        yield
+        return
+    with open(path + ".spawn.lock", "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def start_in_process_worker(store: PipelineJobStore, orchestrator: Any) -> threading.Event:
+    """
+    Repli sans process séparé : un worker dans un thread du process courant.
+    Renvoie l'événement qui l'arrête.
+    """
+    stop_event = threading.Event()
+    worker = PipelineWorker(store, orchestrator, worker_id=f"inprocess-{os.getpid()}")
+    threading.Thread(target=worker.run_forever, args=(stop_event,), name="pipeline-worker", daemon=True).start()
+    return stop_event
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pool de workers du pipeline de tenues")
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--db", default=None, help="fichier SQLite de la file (défaut : data/jobs.sqlite3)")
+    args = parser.parse_args()
+    serve(args.processes, args.db)
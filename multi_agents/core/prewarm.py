@@ -0,0 +1,230 @@
+import os
+import re
+import glob
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+from multi_agents.core.models import EventUnderstanding, PrewarmItem
+from multi_agents.core.product_ranker import normalize_text
+
+if TYPE_CHECKING:
+    from multi_agents.orchestrator import Orchestrator
+
+
+# Mois -> saison (hémisphère nord)
+SEASONS: Dict[int, str] = {
+    12: "hiver", 1: "hiver", 2: "hiver",
+    3: "printemps", 4: "printemps", 5: "printemps",
+    6: "été", 7: "été", 8: "été",
+    9: "automne", 10: "automne", 11: "automne",
+}
+
+SESSION_NAME_RE = re.compile(r"session_(\d{8}_\d{6})\.json$")
+
+
+def season_of(moment: datetime) -> str:
+    return SEASONS[moment.month]
+
+
+def session_time(path: str) -> datetime:
+    """
+    Date d'une session : horodatage du nom de fichier (session_AAAAMMJJ_HHMMSS.json),
+    sinon date de modification du fichier.
+    """
+    match = SESSION_NAME_RE.search(os.path.basename(path))
+    if match:
+        return datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+    return datetime.fromtimestamp(os.path.getmtime(path))
+
+
+def mine_session_logs(log_dir: str) -> Dict[Tuple[str, str], List[PrewarmItem]]:
+    """
+    Articles demandés au styliste dans les sessions enregistrées, comptés par
+    (saison, type d'événement), du plus fréquent au moins fréquent.
+    Deux articles sont identiques s'ils ont même nom / catégorie normalisés, même genre
+    et même style d'événement (le Query Builder et le sélecteur en dépendent).
+    """
+    mined: Dict[Tuple[str, str], Dict[Tuple[Any, ...], PrewarmItem]] = {}
+
+    for path in sorted(glob.glob(os.path.join(log_dir, "session_*.json"))):
+        try:
+            with open(path, encoding="utf-8") as f:
+                session = json.load(f)
+        except (OSError, json.JSONDecodeError) as err:
+            print(f"[Prewarm] Session illisible {path}: {err}")
+            continue
+
+        event: Optional[EventUnderstanding] = session.get("event")
+        outfits = (session.get("stylist_output") or {}).get("outfits") or []
+        if not event or not outfits:
+            continue
+
+        season = season_of(session_time(path))
+        event_type = normalize_text(event.get("event_type")) or "autre"
+        bucket = mined.setdefault((season, event_type), {})
+
+        for outfit in outfits:
+            for item in outfit.get("items") or []:
+                if not item.get("name") or item.get("max_price") is None:
+                    continue
+                key = (
+                    normalize_text(item["name"]),
+                    normalize_text(item.get("category")),
+                    event.get("gender"),
+                    normalize_text(event.get("style")),
+                    normalize_text(event.get("formality_level")),
+                )
+                entry = bucket.get(key)
+                if entry is None:
+                    bucket[key] = {
+                        "season": season,
+                        "event_type": event_type,
+                        "event": dict(event),  # type: ignore[typeddict-item]
+                        "item": {
+                            "name": item["name"],
+                            "category": item.get("category") or "",
+                            "max_price": float(item["max_price"]),
+                        },
+                        "count": 1,
+                    }
+                    continue
+                entry["count"] += 1
+                entry["event"] = dict(event)  # type: ignore[typeddict-item]
+                entry["item"]["max_price"] = max(entry["item"]["max_price"], float(item["max_price"]))
+
+    return {
+        key: sorted(bucket.values(), key=lambda e: -e["count"])
+        for key, bucket in mined.items()
+    }
+
+
+def select_items(
+    mined: Dict[Tuple[str, str], List[PrewarmItem]],
+    season: str,
+    per_event_type: int = 10,
+) -> List[PrewarmItem]:
+    """
+    Les per_event_type articles les plus fréquents de chaque type d'événement pour la
+    saison, puis classés par fréquence. Sans historique pour cette saison, toutes les
+    saisons sont utilisées.
+    """
+    buckets = {k: v for k, v in mined.items() if k[0] == season}
+    if not buckets:
+        merged: Dict[str, List[PrewarmItem]] = {}
+        for (_, event_type), items in mined.items():
+            merged.setdefault(event_type, []).extend(items)
+        buckets = {("", t): sorted(v, key=lambda e: -e["count"]) for t, v in merged.items()}
+
+    selected = [item for items in buckets.values() for item in items[:per_event_type]]
+    return sorted(selected, key=lambda e: -e["count"])
+
+
+class PrewarmJob:
+    """
+    Job hors pointe : rejoue les articles les plus demandés (sessions de logs/) pour
+    remplir le cache de scrapes, le catalogue local et le cache LLM avant les heures
+    de pointe.
+    - saison courante (ou `season`), les per_event_type articles les plus fréquents
+      de chaque type d'événement
+    - apify_budget : nombre max d'articles scrappés en live ; un article déjà servi
+      localement ne consomme rien, les autres sont ignorés une fois le budget épuisé
+    - off_peak_hours (début, fin) : le job s'arrête s'il déborde sur les heures de pointe
+    - warm_stylist : rejoue aussi les événements les plus fréquents sur le styliste
+      (cache LLM seulement)
+    Avec un orchestrateur sur le cache partagé (cache=shared_cache()), le cache de
+    scrapes préchauffé sert tous les process ; sinon il n'est préchauffé que si le job
+    tourne dans le process de l'application. Le catalogue et le cache LLM sont persistants.
+    """
+
+    def __init__(
+        self,
+        orchestrator: "Orchestrator",
+        log_dir: str = "logs",
+        apify_budget: int = 20,
+        per_event_type: int = 10,
+        season: Optional[str] = None,
+        off_peak_hours: Optional[Tuple[int, int]] = (1, 7),
+        warm_stylist: bool = True,
+        clock: Callable[[], datetime] = datetime.now,
+    ) -> None:
+        self.orchestrator = orchestrator
+        self.log_dir = log_dir
+        self.apify_budget = apify_budget
+        self.per_event_type = per_event_type
+        self.season = season
+        self.off_peak_hours = off_peak_hours
+        self.warm_stylist = warm_stylist
+        self.clock = clock
+
+    def run(self) -> Dict[str, Any]:
+        from multi_agents.core.async_utils import run_sync
+
+        return run_sync(self.arun())
+
+    async def arun(self) -> Dict[str, Any]:
+        season = self.season or season_of(self.clock())
+        items = select_items(mine_session_logs(self.log_dir), season, self.per_event_type)
+        report: Dict[str, Any] = {
+            "season": season,
+            "items": len(items),
+            "warm": 0,
+            "scraped": 0,
+            "skipped": 0,
+            "failed": 0,
+            "stylist_events": 0,
+            "stopped": None,
+        }
+        print(f"[Prewarm] Saison {season} : {len(items)} articles, budget Apify {self.apify_budget}")
+
+        if self.warm_stylist:
+            if not await self._warm_events(items, report):
+                return report
+
+        product_search = self.orchestrator.product_search
+        for entry in items:
+            if not self._off_peak():
+                report["stopped"] = "peak_hours"
+                break
+            allow_live = report["scraped"] < self.apify_budget
+            try:
+                outcome = await product_search.awarm_item(entry["event"], entry["item"], allow_live=allow_live)
+            except Exception as err:
+                print(f"[Prewarm] Article '{entry['item']['name']}' en échec : {err}")
+                report["failed"] += 1
+                continue
+            report[outcome] += 1
+
+        print(f"[Prewarm] Terminé : {report}")
+        return report
+
+    async def _warm_events(self, items: List[PrewarmItem], report: Dict[str, Any]) -> bool:
+        """
+        Rejoue une fois chaque événement distinct sur le styliste. False si le job doit s'arrêter.
+        """
+        seen = set()
+        for entry in items:
+            key = json.dumps(entry["event"], sort_keys=True, ensure_ascii=False)
+            if key in seen:
+                continue
+            seen.add(key)
+            if not self._off_peak():
+                report["stopped"] = "peak_hours"
+                return False
+            try:
+                await self.orchestrator.stylist.arun({"event": entry["event"]})
+            except Exception as err:
+                print(f"[Prewarm] Styliste en échec : {err}")
+                report["failed"] += 1
+                continue
+            report["stylist_events"] += 1
+        return True
+
+    def _off_peak(self) -> bool:
+        if self.off_peak_hours is None:
+            return True
+        start, end = self.off_peak_hours
+        hour = self.clock().hour
+        if start <= end:
+            return start <= hour < end
+        return hour >= start or hour < end
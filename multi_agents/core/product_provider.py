@@ -1,17 +1,101 @@
+import asyncio
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional
 
-from multi_agents.core.models import Product, ProductSearchItemQuery
+from multi_agents.core.models import Product, ProductCandidate, ProductSearchItemQuery
 
 
 class ProductProvider(ABC):
     """
     Interface générique pour une source de produits (API, scraping, catalogue local...).
+
+    search_products / asearch_products renvoient des Product ; l'agent de recherche
+    travaille sur des ProductCandidate (asearch_candidates). Les sources qui produisent
+    directement des candidats (Apify, cache de scrapes) surchargent asearch_candidates
+    pour ne pas perdre la marque / la couleur dans la conversion.
     """
 
+    # Nom court utilisé dans les logs et les statistiques
+    name: str = "provider"
+    # Source locale (fichier, base, cache) : rapide et gratuite, interrogée même
+    # quand l'échéance de la demande interdit les sources distantes
+    local: bool = False
+
     @abstractmethod
     def search_products(self, query: ProductSearchItemQuery) -> List[Product]:
         """
         Recherche des produits pour un item précis.
         """
         raise NotImplementedError
+
+    async def asearch_products(self, query: ProductSearchItemQuery) -> List[Product]:
+        """
+        Version asynchrone ; par défaut search_products est exécuté dans un thread.
+        """
+        return await asyncio.to_thread(self.search_products, query)
+
+    async def asearch_candidates(self, query: ProductSearchItemQuery) -> List[ProductCandidate]:
+        products = await self.asearch_products(query)
+        return [product_to_candidate(p) for p in products]
+
+    async def asearch_collecting(
+        self,
+        query: ProductSearchItemQuery,
+        collected: List[ProductCandidate],
+    ) -> List[ProductCandidate]:
+        """
+        Comme asearch_candidates ; collected reçoit tous les produits vus par la source
+        (pour le catalogue), pas seulement ceux renvoyés. Par défaut : les mêmes.
+        """
+        results = await self.asearch_candidates(query)
+        collected.extend(results)
+        return results
+
+
+def item_query(
+    search_text: str,
+    gender_path: str,
+    max_price: float,
+    category: Optional[str] = None,
+) -> ProductSearchItemQuery:
+    """
+    Requête provider construite à partir de la requête Zalando d'un article
+    (search_text / gender_path produits par le template ou le Query Builder).
+    """
+    return {
+        "role": search_text,
+        "category": category or "",
+        "max_price": float(max_price),
+        "attributes": {"gender": gender_path, "search_text": search_text},
+    }
+
+
+def product_to_candidate(product: Product) -> ProductCandidate:
+    return {
+        "name": product["name"],
+        "brand": product.get("brand"),  # type: ignore[typeddict-item]
+        "price": float(product["price"]),
+        "currency": product.get("currency") or "EUR",
+        "url": product["product_url"],
+        "image": product.get("image_url") or None,
+        "sku": product.get("id"),
+        "color": product.get("color"),  # type: ignore[typeddict-item]
+    }
+
+
+def candidate_to_product(
+    candidate: ProductCandidate,
+    query: ProductSearchItemQuery,
+    source: str,
+) -> Product:
+    return {
+        "id": candidate.get("sku") or candidate.get("url") or "",
+        "name": candidate.get("name") or "",
+        "price": float(candidate["price"]),
+        "currency": candidate.get("currency") or "EUR",
+        "product_url": candidate.get("url") or "",
+        "image_url": candidate.get("image") or "",
+        "source": source,
+        "category": query["category"],
+        "gender": query["attributes"].get("gender") or "unisex",
+    }
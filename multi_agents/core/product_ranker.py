@@ -0,0 +1,237 @@
+import unicodedata
+import zlib
+from typing import Iterable, List, Dict, Any, Optional
+
+import numpy as np
+
+from multi_agents.core.models import ProductCandidate, ProductSelectorInput
+
+
+# Traductions des couleurs : les noms Zalando mélangent français, anglais et allemand
+COLOR_SYNONYMS: Dict[str, List[str]] = {
+    "noir": ["black", "schwarz"],
+    "noire": ["black", "schwarz"],
+    "blanc": ["white", "weiss", "offwhite"],
+    "blanche": ["white", "weiss", "offwhite"],
+    "bleu": ["blue", "navy", "blau"],
+    "marine": ["navy", "dark blue"],
+    "gris": ["grey", "gray", "grau"],
+    "grise": ["grey", "gray", "grau"],
+    "rouge": ["red", "rot"],
+    "vert": ["green", "grun", "olive"],
+    "verte": ["green", "grun", "olive"],
+    "beige": ["beige", "camel", "sand"],
+    "marron": ["brown", "braun", "cognac"],
+    "rose": ["pink", "rosa"],
+    "jaune": ["yellow", "gelb"],
+}
+
+# Mots-clés qui signalent qu'un produit appartient bien à la catégorie du styliste
+CATEGORY_KEYWORDS: Dict[str, List[str]] = {
+    "costume": ["costume", "suit", "blazer", "veste de costume", "anzug"],
+    "veste": ["veste", "blazer", "jacket", "blouson"],
+    "manteau": ["manteau", "coat", "trench", "parka", "cape", "abaya"],
+    "chemise": ["chemise", "shirt", "hemd"],
+    "t-shirt": ["t-shirt", "tee", "shirt"],
+    "pull": ["pull", "sweat", "cardigan", "jumper", "knit"],
+    "pantalon": ["pantalon", "chino", "trousers", "jean", "jogger"],
+    "jean": ["jean", "denim"],
+    "short": ["short", "bermuda"],
+    "jupe": ["jupe", "skirt"],
+    "robe": ["robe", "dress", "kleid"],
+    "chaussures": [
+        "chaussures", "derbies", "richelieu", "mocassins", "baskets",
+        "sneakers", "bottines", "boots", "escarpins", "sandales", "talons",
+    ],
+    "accessoire": ["ceinture", "cravate", "noeud", "foulard", "echarpe", "sac", "chapeau"],
+    "bijou": ["collier", "bracelet", "boucles", "bague", "montre"],
+}
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """
+    Minuscules, sans accents, ponctuation remplacée par des espaces.
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = "".join(c if c.isalnum() else " " for c in text)
+    return " ".join(text.split())
+
+
+class ProductRanker:
+    """
+    Ranker local (NumPy) pour choisir un produit parmi les candidats scrappés,
+    sans appeler le LLM quand le choix est évident.
+
+    Score d'un candidat = combinaison pondérée de :
+    - similarité cosinus entre n-grammes de caractères hashés
+      (nom de l'article + couleurs) vs (nom + marque + couleur du produit),
+    - adéquation du prix avec max_price,
+    - présence de mots-clés de la catégorie dans le nom du produit.
+
+    Si l'écart entre le meilleur et le second score dépasse `threshold`,
+    le choix local est utilisé directement ; sinon on laisse décider le LLM.
+    threshold=None désactive le fast path, threshold=0 ne fait jamais appel au LLM.
+    """
+
+    def __init__(
+        self,
+        threshold: Optional[float] = 0.15,
+        ngram_size: int = 3,
+        dim: int = 1024,
+        text_weight: float = 0.6,
+        price_weight: float = 0.15,
+        category_weight: float = 0.25,
+        target_price_ratio: float = 0.75,
+    ) -> None:
+        self.threshold = threshold
+        self.ngram_size = ngram_size
+        self.dim = dim
+        self.weights = np.array([text_weight, price_weight, category_weight], dtype=np.float32)
+        self.target_price_ratio = target_price_ratio
+
+        # Statistiques de décision
+        self.local_decisions = 0
+        self.llm_decisions = 0
+        self.comparisons = 0
+        self.agreements = 0
+
+    # ---------- Vectorisation ----------
+
+    def _vectorize(self, text: str) -> np.ndarray:
+        padded = f" {text} "
+        n = self.ngram_size
+        vec = np.zeros(self.dim, dtype=np.float32)
+        if len(padded) < n:
+            return vec
+
+        idx = np.fromiter(
+            (zlib.crc32(padded[i:i + n].encode("utf-8")) % self.dim for i in range(len(padded) - n + 1)),
+            dtype=np.int64,
+        )
+        vec += np.bincount(idx, minlength=self.dim).astype(np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def _item_text(self, item_name: str) -> str:
+        words = normalize_text(item_name).split()
+        extra: List[str] = []
+        for w in words:
+            extra.extend(COLOR_SYNONYMS.get(w, []))
+        return " ".join(words + extra)
+
+    @staticmethod
+    def _candidate_text(candidate: ProductCandidate) -> str:
+        parts = [candidate.get("name"), candidate.get("brand"), candidate.get("color")]
+        return normalize_text(" ".join(p for p in parts if p))
+
+    # ---------- Scoring ----------
+
+    def score(
+        self,
+        selector_input: ProductSelectorInput,
+        max_price: Optional[float] = None,
+    ) -> np.ndarray:
+        """
+        Retourne un tableau de scores (un par candidat de selector_input["candidates"]).
+        """
+        candidates = selector_input.get("candidates", [])
+        if not candidates:
+            return np.zeros(0, dtype=np.float32)
+
+        item_vec = self._vectorize(self._item_text(selector_input.get("item_name", "")))
+        cand_texts = [self._candidate_text(c) for c in candidates]
+        cand_matrix = np.stack([self._vectorize(t) for t in cand_texts])
+        text_sim = cand_matrix @ item_vec
+
+        prices = np.array([float(c.get("price") or 0.0) for c in candidates], dtype=np.float32)
+        if max_price:
+            ratio = prices / float(max_price)
+            target = self.target_price_ratio
+            price_fit = np.clip(1.0 - np.abs(ratio - target) / target, 0.0, 1.0)
+            price_fit[ratio > 1.0] = 0.0
+        else:
+            price_fit = np.ones_like(prices)
+
+        category = normalize_text(selector_input.get("category", ""))
+        keywords = [normalize_text(k) for k in CATEGORY_KEYWORDS.get(category, [category])]
+        category_match = np.array(
+            [1.0 if any(k and f" {k} " in f" {t} " for k in keywords) else 0.0 for t in cand_texts],
+            dtype=np.float32,
+        )
+
+        features = np.stack([text_sim, price_fit, category_match], axis=1)
+        return features @ self.weights
+
+    @staticmethod
+    def margin(scores: np.ndarray) -> float:
+        if scores.size == 0:
+            return 0.0
+        if scores.size == 1:
+            return float("inf")
+        top2 = np.partition(scores, -2)[-2:]
+        return float(top2[1] - top2[0])
+
+    def confident_choice(self, scores: np.ndarray) -> Optional[int]:
+        """
+        Index choisi localement si la marge est suffisante, sinon None (→ LLM).
+        """
+        if scores.size == 0 or self.threshold is None:
+            return None
+        if self.margin(scores) < self.threshold:
+            return None
+        self.local_decisions += 1
+        return int(np.argmax(scores))
+
+    # ---------- Accord avec le LLM ----------
+
+    def record_llm_choice(self, scores: np.ndarray, llm_index: int) -> None:
+        """
+        Appelé quand le LLM a tranché : on compare avec le top-1 local.
+        """
+        self.llm_decisions += 1
+        if scores.size == 0:
+            return
+        self.comparisons += 1
+        if int(np.argmax(scores)) == llm_index:
+            self.agreements += 1
+
+    def replay(self, records: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Rejoue des décisions LLM enregistrées :
+        [{"selector_input": ..., "max_price": ..., "llm_index": int}, ...]
+
+        Retourne le taux d'accord global et, au seuil courant,
+        la couverture (part décidée localement) et la précision de ces décisions.
+        """
+        total = agreed = confident = confident_agreed = 0
+        for rec in records:
+            scores = self.score(rec["selector_input"], rec.get("max_price"))
+            if scores.size == 0:
+                continue
+            top = int(np.argmax(scores))
+            ok = top == rec["llm_index"]
+            total += 1
+            agreed += ok
+            if self.threshold is not None and self.margin(scores) >= self.threshold:
+                confident += 1
+                confident_agreed += ok
+
+        return {
+            "records": total,
+            "agreement_rate": agreed / total if total else None,
+            "coverage": confident / total if total else None,
+            "confident_agreement_rate": confident_agreed / confident if confident else None,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        decisions = self.local_decisions + self.llm_decisions
+        return {
+            "threshold": self.threshold,
+            "local_decisions": self.local_decisions,
+            "llm_decisions": self.llm_decisions,
+            "local_rate": self.local_decisions / decisions if decisions else None,
+            "agreement_rate": self.agreements / self.comparisons if self.comparisons else None,
+        }
@@ -0,0 +1,134 @@
+import json
+import math
+import threading
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional
+
+
+# Limite de tokens de sortie par agent : taille de la réponse la plus longue attendue
+# (exemples des prompts système) avec une marge de x2 au moins. Une réponse coupée
+# (finish_reason "length") est refaite sans limite par LLMClient, jamais utilisée.
+# - stylist : 4 tenues x ~6 articles ≈ 1 600 tokens
+# - product_selector : {"chosen_index": n} seul (pas de texte libre) ≈ 10 tokens
+AGENT_MAX_TOKENS: Dict[str, int] = {
+    "event_analyzer": 300,
+    "stylist": 4000,
+    "query_builder": 120,
+    "product_selector": 80,
+    "mannequin_prompt": 600,
+}
+
+# Champs utiles au sélecteur : ni URL, ni image, ni SKU (le modèle ne s'en sert pas)
+SELECTOR_CANDIDATE_FIELDS = ("name", "brand", "price", "color")
+
+
+# Compteur de la demande en cours (hérité par les tâches asyncio / threads de la demande)
+_request_tokens: ContextVar[Optional[Dict[str, int]]] = ContextVar("request_tokens", default=None)
+
+
+def start_request_tracking() -> Dict[str, int]:
+    """
+    À appeler au début d'une demande : le dict renvoyé cumule les tokens de prompt
+    envoyés et économisés par tous les agents de cette demande.
+    """
+    counters = {"prompt_tokens": 0, "baseline_tokens": 0, "saved_tokens": 0}
+    _request_tokens.set(counters)
+    return counters
+
+
+def compact_json(data: Any) -> str:
+    """
+    Sérialisation sans indentation ni espaces superflus.
+    """
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimation grossière (~4 caractères par token pour le texte mêlé FR / JSON) :
+    suffisante pour comparer deux sérialisations et suivre un budget.
+    """
+    return math.ceil(len(text) / 4) if text else 0
+
+
+def _project_selector(payload: Dict[str, Any]) -> Dict[str, Any]:
+    projected = {k: v for k, v in payload.items() if k != "candidates"}
+    # id = index dans la liste : c'est ce que le modèle renvoie dans chosen_index
+    projected["candidates"] = [
+        {"id": i, **{k: c[k] for k in SELECTOR_CANDIDATE_FIELDS if c.get(k) not in (None, "")}}
+        for i, c in enumerate(payload.get("candidates", []))
+    ]
+    return projected
+
+
+def _drop_empty(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in payload.items() if v not in (None, "", [], {})}
+
+
+# Projection des données envoyées à chaque agent
+PROJECTIONS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {
+    "product_selector": _project_selector,
+    "query_builder": _drop_empty,
+    "mannequin_prompt": _drop_empty,
+}
+
+
+class PromptBuilder:
+    """
+    Construit les user prompts des agents :
+    - projection des seuls champs utiles à l'agent
+    - JSON compact au lieu de indent=2
+    - mesure des tokens envoyés vs. l'ancienne sérialisation (indent=2, sans projection)
+    """
+
+    def __init__(self) -> None:
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def build(self, agent: str, intro: str, payload: Any, outro: str = "") -> str:
+        project = PROJECTIONS.get(agent)
+        data = project(payload) if project is not None and isinstance(payload, dict) else payload
+
+        prompt = intro + compact_json(data) + outro
+        baseline = intro + json.dumps(payload, ensure_ascii=False, indent=2) + outro
+        self._record(agent, estimate_tokens(prompt), estimate_tokens(baseline))
+        return prompt
+
+    @staticmethod
+    def max_tokens(agent: str) -> Optional[int]:
+        return AGENT_MAX_TOKENS.get(agent)
+
+    def _record(self, agent: str, tokens: int, baseline_tokens: int) -> None:
+        with self._lock:
+            stats = self._stats.setdefault(agent, {"calls": 0, "prompt_tokens": 0, "baseline_tokens": 0})
+            stats["calls"] += 1
+            stats["prompt_tokens"] += tokens
+            stats["baseline_tokens"] += baseline_tokens
+            counters = _request_tokens.get()
+            if counters is not None:
+                counters["prompt_tokens"] += tokens
+                counters["baseline_tokens"] += baseline_tokens
+                counters["saved_tokens"] += baseline_tokens - tokens
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Tokens de prompt estimés par agent, et tokens économisés par rapport à indent=2.
+        """
+        with self._lock:
+            per_agent = {
+                agent: {
+                    **values,
+                    "saved_tokens": values["baseline_tokens"] - values["prompt_tokens"],
+                    "avg_prompt_tokens": values["prompt_tokens"] / values["calls"],
+                    "max_tokens": AGENT_MAX_TOKENS.get(agent),
+                }
+                for agent, values in self._stats.items()
+            }
+        return {
+            "agents": per_agent,
+            "saved_tokens": sum(v["saved_tokens"] for v in per_agent.values()),
+        }
+
+
+# Partagé par tous les agents du process
+prompt_builder = PromptBuilder()
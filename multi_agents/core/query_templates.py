@@ -0,0 +1,161 @@
+from typing import Dict, Any, List, Optional, Tuple
+
+from multi_agents.core.models import QueryBuilderInput
+from multi_agents.core.product_ranker import normalize_text
+
+
+# Catégories du styliste (variantes comprises) -> catégorie canonique
+CATEGORY_ALIASES: Dict[str, str] = {
+    "costume": "costume",
+    "costumes": "costume",
+    "veste de costume": "costume",
+    "chemise": "chemise",
+    "chemises": "chemise",
+    "t shirt": "t-shirt",
+    "tee shirt": "t-shirt",
+    "polo": "t-shirt",
+    "pull": "pull",
+    "sweat": "pull",
+    "pantalon": "pantalon",
+    "jean": "pantalon",
+    "veste": "veste",
+    "blazer": "veste",
+    "manteau": "manteau",
+    "robe": "robe",
+    "jupe": "jupe",
+    "chaussures": "chaussures",
+    "chaussure": "chaussures",
+    "souliers": "chaussures",
+    "accessoire": "accessoire",
+    "accessoires": "accessoire",
+}
+
+# Catégorie canonique -> mots-clés reconnus dans le nom de l'article,
+# chemin genre Zalando forcé (None = celui de l'événement)
+# et termes de recherche Zalando par chemin genre (ajoutés au nom de l'article ;
+# chemin absent = nom de la catégorie, "" = rien)
+QUERY_TEMPLATES: Dict[str, Dict[str, Any]] = {
+    "costume": {
+        "keywords": ["costume", "blazer", "smoking"],
+        "gender_path": None,
+        "terms": {"homme": "costume homme", "femme": "tailleur femme"},
+    },
+    "chemise": {
+        "keywords": ["chemise"],
+        "gender_path": None,
+        "terms": {"homme": "chemise homme", "femme": "chemisier femme"},
+    },
+    "t-shirt": {
+        "keywords": ["t shirt", "tee shirt", "polo", "debardeur"],
+        "gender_path": None,
+        "terms": {"homme": "t-shirt homme", "femme": "t-shirt femme"},
+    },
+    "pull": {
+        "keywords": ["pull", "sweat", "cardigan", "gilet"],
+        "gender_path": None,
+        "terms": {"homme": "pull homme", "femme": "pull femme"},
+    },
+    "pantalon": {
+        "keywords": ["pantalon", "chino", "jean", "jogging"],
+        "gender_path": None,
+        "terms": {"homme": "pantalon homme", "femme": "pantalon femme"},
+    },
+    "veste": {
+        "keywords": ["veste", "blazer", "blouson", "perfecto"],
+        "gender_path": None,
+        "terms": {"homme": "veste homme", "femme": "veste femme"},
+    },
+    "manteau": {
+        "keywords": ["manteau", "trench", "parka", "doudoune", "caban"],
+        "gender_path": None,
+        "terms": {"homme": "manteau homme", "femme": "manteau femme"},
+    },
+    "robe": {"keywords": ["robe"], "gender_path": "femme", "terms": {"femme": "robe femme"}},
+    "jupe": {"keywords": ["jupe"], "gender_path": "femme", "terms": {"femme": "jupe femme"}},
+    "chaussures": {
+        "keywords": [
+            "chaussures", "derbies", "richelieu", "mocassins", "baskets", "sneakers",
+            "bottines", "boots", "escarpins", "sandales", "ballerines", "talons",
+        ],
+        "gender_path": None,
+        "terms": {"homme": "chaussures homme", "femme": "chaussures femme"},
+    },
+    "accessoire": {
+        "keywords": ["ceinture", "cravate", "noeud papillon", "echarpe"],
+        "gender_path": None,
+        "terms": {"homme": "homme", "femme": "femme", "unisex": ""},
+    },
+}
+
+
+class QueryTemplateEngine:
+    """
+    Construction déterministe des requêtes Zalando pour les articles courants.
+
+    Si la catégorie du styliste est connue et que le nom de l'article contient
+    un mot-clé de cette catégorie, la requête est le nom de l'article complété par
+    les termes Zalando de la catégorie ("Costume bleu marine" -> "Costume bleu marine
+    homme") + le chemin genre : pas besoin d'appeler le LLM (Query Builder).
+    Sinon build() renvoie None et le LLM prend le relais.
+    """
+
+    def __init__(
+        self,
+        templates: Optional[Dict[str, Dict[str, Any]]] = None,
+        aliases: Optional[Dict[str, str]] = None,
+    ) -> None:
+        self.templates = templates if templates is not None else QUERY_TEMPLATES
+        self.aliases = aliases if aliases is not None else CATEGORY_ALIASES
+
+        self.hits = 0
+        self.misses = 0
+        self._llm_latency_total = 0.0
+        self._llm_calls = 0
+
+    def canonical_category(self, category: str) -> Optional[str]:
+        norm = normalize_text(category)
+        if norm in self.templates:
+            return norm
+        return self.aliases.get(norm)
+
+    def build(self, qb_input: QueryBuilderInput) -> Optional[Tuple[str, str, float]]:
+        """
+        Retourne (search_text, gender_path, max_price) ou None si non reconnu.
+        """
+        canonical = self.canonical_category(qb_input["category"])
+        template = self.templates.get(canonical) if canonical else None
+        item_name = normalize_text(qb_input["item_name"])
+
+        keywords: List[str] = template["keywords"] if template else []
+        padded = f" {item_name} "
+        if not any(f" {k} " in padded or f" {k}s " in padded for k in keywords):
+            self.misses += 1
+            return None
+
+        gender_path = template["gender_path"] or qb_input["gender"]
+        if gender_path not in ("homme", "femme"):
+            gender_path = "unisex"
+
+        # Termes Zalando absents du nom de l'article (pas de mot répété)
+        term = template.get("terms", {}).get(gender_path, canonical)
+        words = item_name.split()
+        extra = [w for w in term.split() if normalize_text(w) not in words]
+
+        self.hits += 1
+        return " ".join(qb_input["item_name"].split() + extra), gender_path, float(qb_input["max_price"])
+
+    def record_llm_latency(self, seconds: float) -> None:
+        self._llm_latency_total += seconds
+        self._llm_calls += 1
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        avg_llm = self._llm_latency_total / self._llm_calls if self._llm_calls else None
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else None,
+            "avg_llm_latency_s": avg_llm,
+            # Estimation : chaque requête construite par gabarit aurait coûté un appel LLM moyen
+            "estimated_latency_saved_s": self.hits * avg_llm if avg_llm is not None else None,
+        }
@@ -0,0 +1,277 @@
+import copy
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Optional, Tuple, Union
+
+from multi_agents.core.models import EventUnderstanding
+from multi_agents.core.product_ranker import COLOR_SYNONYMS, normalize_text
+
+
+# Mots sans effet sur la demande ("un mariage le soir" == "mariage soir").
+# Les négations (ne, pas, sans...) changent le sens : elles sont conservées.
+STOPWORDS: FrozenSet[str] = frozenset(
+    """
+    a au aux avec ce ces cet cette d de des du en et il j je l la le les leur
+    ma me mes mon nous on ou par pour qu que qui sa se ses son sur
+    ta te tes ton tu un une vos votre vous y est suis serai vais
+    euro euros eur budget max maximum environ
+    """.split()
+)
+
+NEGATIONS: FrozenSet[str] = frozenset("n ne pas sans ni jamais plus aucun aucune".split())
+
+# Couleurs (singulier ; le pluriel est ramené au singulier) et genres : une demande
+# qui en change n'est pas la même demande, même si le reste du texte est identique
+COLOR_WORDS: FrozenSet[str] = frozenset(COLOR_SYNONYMS) | frozenset(
+    "bleue bordeaux kaki violet violette orange dore doree argente argentee camel".split()
+)
+GENDER_WORDS: FrozenSet[str] = frozenset("homme femme mixte enfant garcon fille".split())
+
+# Champs de l'EventUnderstanding qui doivent être identiques pour réutiliser un résultat
+EVENT_EXACT_FIELDS = ("event_type", "time_of_day", "formality_level", "gender")
+
+
+def normalize_description(text: Optional[str]) -> str:
+    """
+    Minuscules, sans accents ni ponctuation, sans mots vides. L'ordre des mots est
+    conservé : "robe noire chemise blanche" n'est pas "robe blanche chemise noire".
+    """
+    return " ".join(t for t in normalize_text(text).split() if t not in STOPWORDS)
+
+
+def exact_tokens(normalized: str) -> FrozenSet[str]:
+    """
+    Éléments d'une description normalisée qui doivent être identiques avant toute
+    comparaison approchée : nombres (budget, âge...), négations, genres, et chaque
+    couleur avec le mot qu'elle qualifie ("robe noire").
+    """
+    tokens = normalized.split()
+    exact = set()
+    for i, token in enumerate(tokens):
+        singular = token[:-1] if token.endswith("s") else token
+        if token in NEGATIONS or any(c.isdigit() for c in token):
+            exact.add(token)
+        elif singular in GENDER_WORDS:
+            exact.add(singular)
+        elif singular in COLOR_WORDS or token in COLOR_WORDS:
+            color = token if token in COLOR_WORDS else singular
+            exact.add(f"{tokens[i - 1]} {color}" if i > 0 else color)
+    return frozenset(exact)
+
+
+def jaccard(a: str, b: str) -> float:
+    sa, sb = set(a.split()), set(b.split())
+    if not sa and not sb:
+        return 1.0
+    return len(sa & sb) / len(sa | sb)
+
+
+def photo_key(user_image_url: Optional[str], user_image_bytes: Optional[bytes]) -> Optional[str]:
+    """
+    Identifiant de la photo utilisateur : les aperçus en dépendent.
+    """
+    if user_image_bytes:
+        return "sha256:" + hashlib.sha256(user_image_bytes).hexdigest()
+    return user_image_url or None
+
+
+class PipelineResultStore:
+    """
+    Mémoïsation des résultats complets du pipeline :
+    - clé exacte : description normalisée + budget + genre + âge + photo
+    - quasi-doublons avant analyse : même budget / genre / âge / photo, mêmes nombres,
+      négations, genres et couleurs (rattachées à leur article) dans le texte, et
+      descriptions proches (Jaccard sur les mots normalisés >= text_similarity)
+    - quasi-doublons après analyse : mêmes saisies UI, mêmes type / moment / formalité /
+      genre, style proche, budget compris à budget_tolerance près (évite stylisme +
+      recherche + aperçus)
+    - fraîcheur : au-delà de ttl_seconds l'entrée n'est plus servie (prix, stocks) ;
+      au-delà de refresh_after_seconds elle est servie mais marquée à rafraîchir
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float = 6 * 3600,
+        refresh_after_seconds: Optional[float] = 3600,
+        text_similarity: float = 0.8,
+        style_similarity: float = 0.5,
+        budget_tolerance: float = 0.05,
+        max_entries: int = 512,
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.refresh_after_seconds = refresh_after_seconds
+        self.text_similarity = text_similarity
+        self.style_similarity = style_similarity
+        self.budget_tolerance = budget_tolerance
+        self.max_entries = max_entries
+
+        self._entries: "OrderedDict[Tuple[Any, ...], Dict[str, Any]]" = OrderedDict()
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+
+        self.hits = {"exact": 0, "similar_text": 0, "similar_event": 0}
+        # Échecs par étape : avant analyse (lookup) et après (lookup_event)
+        self.misses = {"text": 0, "event": 0}
+        self.refreshes = 0
+
+    # ---------------- API ----------------
+
+    def lookup(
+        self,
+        description: str,
+        budget: Optional[float],
+        gender: Optional[str],
+        age: Optional[int],
+        photo: Optional[str],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Recherche avant toute analyse : clé exacte, puis description proche.
+        """
+        key = self.request_key(description, budget, gender, age, photo)
+        with self._lock:
+            self._expire()
+            entry = self._entries.get(key)
+            if entry is not None:
+                return self._hit(key, entry, "exact")
+
+            exact = exact_tokens(key[0])
+            for other_key, other in reversed(self._entries.items()):
+                if other_key[1:] != key[1:] or exact_tokens(other_key[0]) != exact:
+                    continue
+                if jaccard(other_key[0], key[0]) >= self.text_similarity:
+                    return self._hit(other_key, other, "similar_text")
+            self.misses["text"] += 1
+        return None
+
+    def lookup_event(
+        self,
+        event: EventUnderstanding,
+        budget: Optional[float],
+        gender: Optional[str],
+        age: Optional[int],
+        photo: Optional[str],
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Recherche après l'analyse d'événement : une autre formulation du même besoin
+        (mêmes informations saisies dans l'UI).
+        """
+        context = self.request_key("", budget, gender, age, photo)[1:]
+        with self._lock:
+            self._expire()
+            for key, entry in reversed(self._entries.items()):
+                if key[1:] == context and self._same_event(entry["result"]["event"], event):
+                    return self._hit(key, entry, "similar_event")
+            self.misses["event"] += 1
+        return None
+
+    def put(
+        self,
+        description: str,
+        budget: Optional[float],
+        gender: Optional[str],
+        age: Optional[int],
+        photo: Optional[str],
+        result: Dict[str, Any],
+        replaces: Optional[Tuple[Any, ...]] = None,
+    ) -> None:
+        """
+        replaces : clé d'une entrée rafraîchie par ce résultat (retirée du store).
+        """
+        key = self.request_key(description, budget, gender, age, photo)
+        with self._lock:
+            if replaces is not None and replaces != key:
+                self._entries.pop(replaces, None)
+            self._entries[key] = {"result": copy.deepcopy(result), "stored_at": time.time()}
+            self._entries.move_to_end(key)
+            self._refreshing.discard(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def claim_refresh(self, key: Tuple[Any, ...]) -> bool:
+        """
+        True si l'appelant doit lancer le rafraîchissement de cette entrée
+        (un seul rafraîchissement à la fois par entrée).
+        """
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self.refreshes += 1
+            return True
+
+    def release_refresh(self, key: Tuple[Any, ...]) -> None:
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        hit_rate : part des demandes servies (une demande = un lookup ; celles qui
+        l'ont manqué peuvent encore être servies par lookup_event).
+        """
+        with self._lock:
+            requests = self.hits["exact"] + self.hits["similar_text"] + self.misses["text"]
+            return {
+                "entries": len(self._entries),
+                "hits": dict(self.hits),
+                "misses": dict(self.misses),
+                "hit_rate": sum(self.hits.values()) / requests if requests else None,
+                "refreshes": self.refreshes,
+            }
+
+    @staticmethod
+    def request_key(
+        description: str,
+        budget: Optional[float],
+        gender: Optional[str],
+        age: Optional[int],
+        photo: Optional[str],
+    ) -> Tuple[Any, ...]:
+        return (
+            normalize_description(description),
+            None if budget is None else round(float(budget), 2),
+            gender,
+            age,
+            photo,
+        )
+
+    # ---------------- Interne ----------------
+
+    def _hit(self, key: Tuple[Any, ...], entry: Dict[str, Any], match: str) -> Dict[str, Any]:
+        self.hits[match] += 1
+        self._entries.move_to_end(key)
+        age_s = time.time() - entry["stored_at"]
+        return {
+            "key": key,
+            "match": match,
+            "age_s": age_s,
+            "stale": self.refresh_after_seconds is not None and age_s > self.refresh_after_seconds,
+            "result": copy.deepcopy(entry["result"]),
+        }
+
+    def _expire(self) -> None:
+        now = time.time()
+        expired = [k for k, e in self._entries.items() if now - e["stored_at"] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+
+    def _same_event(self, stored: EventUnderstanding, event: EventUnderstanding) -> bool:
+        for field in EVENT_EXACT_FIELDS:
+            if normalize_text(stored.get(field)) != normalize_text(event.get(field)):  # type: ignore[arg-type]
+                return False
+        if stored.get("age") != event.get("age"):
+            return False
+        if not _close(stored.get("budget"), event.get("budget"), self.budget_tolerance):
+            return False
+        return jaccard(
+            normalize_description(stored.get("style")),
+            normalize_description(event.get("style")),
+        ) >= self.style_similarity
+
+
+def _close(a: Union[float, None], b: Union[float, None], tolerance: float) -> bool:
+    if a is None or b is None:
+        return a is None and b is None
+    a, b = float(a), float(b)
+    return abs(a - b) <= tolerance * max(abs(a), abs(b))
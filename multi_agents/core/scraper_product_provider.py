@@ -1,10 +1,11 @@
 import time
-from typing import List
+from typing import List, Optional
 from urllib.parse import urlencode
 
-import requests
+import httpx
 from bs4 import BeautifulSoup
 
+from multi_agents.core.http_client import get_http_client
 from multi_agents.core.models import Product, ProductSearchItemQuery
 from multi_agents.core.product_provider import ProductProvider
 
@@ -15,18 +16,23 @@ class ScraperProductProvider(ProductProvider):
     ⚠️ À ADAPTER : URL de base, paramètres, sélecteurs CSS, respect des CGU du site.
     """
 
+    name = "html_scraper"
     BASE_URL = "https://www.zalando.fr"  # à remplacer par ton site
 
-    def __init__(self, throttle_seconds: float = 1.0) -> None:
+    def __init__(
+        self,
+        throttle_seconds: float = 1.0,
+        http_client: Optional[httpx.Client] = None,
+    ) -> None:
         self.throttle_seconds = throttle_seconds
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.http = http_client or get_http_client()
+        self.headers = {
             "User-Agent": (
                 "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
                 "AppleWebKit/537.36 (KHTML, like Gecko) "
                 "Chrome/123.0.0.0 Safari/537.36"
             )
-        })
+        }
 
     def search_products(self, query: ProductSearchItemQuery) -> List[Product]:
         time.sleep(self.throttle_seconds)
@@ -40,7 +46,7 @@ class ScraperProductProvider(ProductProvider):
         params = {k: v for k, v in params.items() if v is not None}
 
         url = f"{self.BASE_URL}?{urlencode(params)}"
-        resp = self.session.get(url, timeout=10)
+        resp = self.http.get(url, headers=self.headers, timeout=10)
         resp.raise_for_status()
 
         soup = BeautifulSoup(resp.text, "lxml")
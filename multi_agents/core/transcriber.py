@@ -0,0 +1,425 @@
+import io
+import time
+import wave
+import hashlib
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import numpy as np
+
+from multi_agents.core.cache_backend import CacheBackend, MemoryCacheBackend
+
+
+# Whisper travaille sur du mono float32 à 16 kHz
+SAMPLE_RATE = 16000
+
+# Tailles proposées dans l'UI : latence croissante, qualité croissante
+MODEL_SIZES = ("tiny", "base", "small")
+
+# Espace des transcriptions dans le CacheBackend
+CACHE_NAMESPACE = "transcript"
+
+
+def audio_hash(audio_bytes: bytes) -> str:
+    """
+    Empreinte du contenu audio : deux envois identiques (re-run Streamlit,
+    même fichier uploadé) partagent la même transcription.
+    """
+    return hashlib.sha256(audio_bytes).hexdigest()
+
+
+def decode_audio(audio_bytes: bytes, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Décode l'audio en mémoire vers un tableau float32 mono à `sample_rate` Hz.
+    - WAV PCM (format du micro Streamlit) : module wave + rééchantillonnage NumPy
+    - autres formats (mp3, ogg, webm, m4a) : ffmpeg via des pipes, sans fichier temporaire
+    """
+    if audio_bytes[:4] == b"RIFF" and audio_bytes[8:12] == b"WAVE":
+        try:
+            return _decode_wav(audio_bytes, sample_rate)
+        except wave.Error:
+            # WAV non PCM (float, ADPCM...) : on laisse ffmpeg s'en charger
+            pass
+    return _decode_ffmpeg(audio_bytes, sample_rate)
+
+
+def _decode_wav(audio_bytes: bytes, sample_rate: int) -> np.ndarray:
+    with wave.open(io.BytesIO(audio_bytes), "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        frames = wav.readframes(wav.getnframes())
+
+    if width == 1:
+        # PCM 8 bits : non signé
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        ints = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints >= 1 << 23, ints - (1 << 24), ints)
+        samples = ints.astype(np.float32) / float(1 << 23)
+    elif width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / float(1 << 31)
+    else:
+        raise wave.Error(f"sample width non supportée : {width}")
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+
+    return resample(samples, rate, sample_rate)
+
+
+def resample(samples: np.ndarray, rate: int, target_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Rééchantillonnage linéaire (suffisant pour de la voix destinée à Whisper).
+    """
+    samples = np.asarray(samples, dtype=np.float32)
+    if rate == target_rate or samples.size == 0:
+        return samples
+    duration = samples.size / float(rate)
+    target_size = max(int(round(duration * target_rate)), 1)
+    positions = np.linspace(0.0, samples.size - 1, num=target_size)
+    return np.interp(positions, np.arange(samples.size), samples).astype(np.float32)
+
+
+def _decode_ffmpeg(audio_bytes: bytes, sample_rate: int) -> np.ndarray:
+    cmd = [
+        "ffmpeg", "-nostdin", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-ar", str(sample_rate),
+        "pipe:1",
+    ]
+    try:
+        proc = subprocess.run(cmd, input=audio_bytes, capture_output=True, check=True)
+    except FileNotFoundError as err:
+        raise RuntimeError("ffmpeg est requis pour décoder ce format audio.") from err
+    except subprocess.CalledProcessError as err:
+        raise RuntimeError(f"Décodage audio impossible : {err.stderr.decode(errors='ignore').strip()}") from err
+    return np.frombuffer(proc.stdout, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def _load_whisper_model(model_size: str) -> Any:
+    import whisper
+
+    return whisper.load_model(model_size)
+
+
+class Transcriber:
+    """
+    Transcription audio -> texte avec Whisper.
+    - un modèle chargé une seule fois par taille (tiny / base / small)
+    - transcriptions mises en cache par empreinte du contenu audio (CacheBackend, espace
+      "transcript") : en mémoire par défaut, partagées entre process avec le backend SQLite
+    - latence mesurée par taille de modèle, pour guider le choix dans l'UI
+    """
+
+    def __init__(
+        self,
+        model_size: str = "base",
+        language: str = "fr",
+        cache_size: int = 128,
+        load_model: Optional[Callable[[str], Any]] = None,
+        cache: Optional[CacheBackend] = None,
+    ) -> None:
+        if model_size not in MODEL_SIZES:
+            raise ValueError(f"model_size doit être dans {MODEL_SIZES}")
+        self.model_size = model_size
+        self.language = language
+        self.cache_size = cache_size
+        self._load_model = load_model or _load_whisper_model
+
+        self._models: Dict[str, Any] = {}
+        self.cache = cache or MemoryCacheBackend(max_entries=cache_size)
+        self._latencies: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+        # Un modèle Whisper n'est pas prévu pour des appels concurrents
+        self._model_lock = threading.Lock()
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def model(self, model_size: Optional[str] = None) -> Any:
+        size = model_size or self.model_size
+        if size not in MODEL_SIZES:
+            raise ValueError(f"model_size doit être dans {MODEL_SIZES}")
+        with self._model_lock:
+            if size not in self._models:
+                print(f"[Transcriber] Loading Whisper model '{size}'...")
+                self._models[size] = self._load_model(size)
+            return self._models[size]
+
+    def transcribe(
+        self,
+        audio_bytes: bytes,
+        model_size: Optional[str] = None,
+        on_segment: Optional[Callable[[str, str], None]] = None,
+    ) -> str:
+        """
+        Transcrit des bytes audio (wav, mp3, ogg, webm, m4a).
+        Le même audio avec la même taille de modèle n'est transcrit qu'une fois.
+        L'enregistrement étant complet, il est transcrit d'un bloc (contexte complet pour
+        Whisper, aucune parole perdue par la VAD) ; on_segment(texte, transcription) est
+        appelé une fois avec le résultat. Le découpage en segments est réservé au flux
+        en direct (StreamingTranscriber).
+        """
+        size = model_size or self.model_size
+        key = f"{audio_hash(audio_bytes)}:{size}:{self.language}"
+        computed = []
+
+        def compute() -> str:
+            computed.append(True)
+            text = self.transcribe_samples(decode_audio(audio_bytes), size)
+            if on_segment is not None:
+                on_segment(text, text)
+            return text
+
+        # Un même audio soumis en parallèle (autre session, autre process) n'est transcrit qu'une fois
+        text = self.cache.get_or_compute(CACHE_NAMESPACE, key, compute)
+        with self._lock:
+            if computed:
+                self.cache_misses += 1
+            else:
+                self.cache_hits += 1
+        return text
+
+    def transcribe_samples(self, samples: np.ndarray, model_size: Optional[str] = None) -> str:
+        """
+        Transcrit un signal déjà décodé (float32 mono 16 kHz), sans cache.
+        """
+        size = model_size or self.model_size
+        model = self.model(size)
+
+        start = time.perf_counter()
+        with self._model_lock:
+            result = model.transcribe(
+                samples,
+                language=self.language,
+                fp16=False,  # Force FP32 pour éviter le warning sur CPU
+                verbose=False,
+            )
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self._latencies.setdefault(size, []).append(elapsed)
+        print(f"[Transcriber] {size}: {samples.size / SAMPLE_RATE:.1f}s audio in {elapsed:.2f}s")
+        return result["text"].strip()
+
+    def last_latency(self, model_size: Optional[str] = None) -> Optional[float]:
+        size = model_size or self.model_size
+        with self._lock:
+            values = self._latencies.get(size)
+            return values[-1] if values else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.cache_hits + self.cache_misses
+            return {
+                "cache_hits": self.cache_hits,
+                "cache_misses": self.cache_misses,
+                "cache_hit_rate": self.cache_hits / total if total else None,
+                "avg_latency_s": {
+                    size: sum(values) / len(values) for size, values in self._latencies.items() if values
+                },
+            }
+
+
+class VoiceActivitySegmenter:
+    """
+    Découpe un flux audio (float32 mono 16 kHz) en segments de parole,
+    avec une détection d'activité vocale par énergie (RMS par trame de 30 ms).
+    - seuil adaptatif : max(min_rms, bruit_de_fond * speech_ratio) ; le bruit de fond
+      part de min_rms et ne fait que baisser (une prise qui commence par de la parole
+      ne la prend pas pour du bruit)
+    - un segment se ferme après min_silence_ms de silence ou au-delà de max_segment_s
+    - les segments trop courts (clics, bruits) sont ignorés
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = SAMPLE_RATE,
+        frame_ms: int = 30,
+        min_rms: float = 0.01,
+        speech_ratio: float = 3.0,
+        min_silence_ms: int = 500,
+        padding_ms: int = 200,
+        min_speech_ms: int = 250,
+        max_segment_s: float = 20.0,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.frame_size = sample_rate * frame_ms // 1000
+        self.min_rms = min_rms
+        self.speech_ratio = speech_ratio
+        self.min_silence_frames = max(min_silence_ms // frame_ms, 1)
+        self.padding_frames = padding_ms // frame_ms
+        self.min_speech_frames = max(min_speech_ms // frame_ms, 1)
+        self.max_segment_frames = int(max_segment_s * 1000 // frame_ms)
+
+        self.noise_floor = min_rms
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._preroll: Deque[np.ndarray] = deque(maxlen=max(self.padding_frames, 1))
+        self._segment: List[np.ndarray] = []
+        self._speech_frames = 0
+        self._silence_run = 0
+
+    def feed(self, samples: np.ndarray) -> List[np.ndarray]:
+        """
+        Ajoute des échantillons ; renvoie les segments de parole terminés.
+        """
+        samples = np.concatenate([self._remainder, np.asarray(samples, dtype=np.float32)])
+        usable = samples.size - samples.size % self.frame_size
+        self._remainder = samples[usable:]
+
+        closed: List[np.ndarray] = []
+        for frame in samples[:usable].reshape(-1, self.frame_size):
+            segment = self._push_frame(frame)
+            if segment is not None:
+                closed.append(segment)
+        return closed
+
+    def flush(self) -> Optional[np.ndarray]:
+        """
+        Fin du flux : renvoie le segment en cours s'il contient assez de parole.
+        """
+        if self._remainder.size and self._segment:
+            self._segment.append(self._remainder)
+        self._remainder = np.zeros(0, dtype=np.float32)
+        return self._close_segment()
+
+    def _is_speech(self, frame: np.ndarray) -> bool:
+        rms = float(np.sqrt(np.mean(frame * frame)))
+        threshold = max(self.min_rms, self.noise_floor * self.speech_ratio)
+        speech = rms > threshold
+        if not speech and rms < self.noise_floor:
+            # Le bruit de fond suit lentement les trames plus calmes, jamais vers le haut
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * rms
+        return speech
+
+    def _push_frame(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        speech = self._is_speech(frame)
+
+        if not self._segment:
+            if not speech:
+                self._preroll.append(frame)
+                return None
+            # Début de parole : on garde un peu de contexte avant
+            self._segment = list(self._preroll) if self.padding_frames else []
+            self._preroll.clear()
+
+        self._segment.append(frame)
+        if speech:
+            self._speech_frames += 1
+            self._silence_run = 0
+        else:
+            self._silence_run += 1
+
+        if self._silence_run >= self.min_silence_frames or len(self._segment) >= self.max_segment_frames:
+            return self._close_segment()
+        return None
+
+    def _close_segment(self) -> Optional[np.ndarray]:
+        frames, speech_frames = self._segment, self._speech_frames
+        # On ne garde que padding_frames de silence final
+        trailing = max(self._silence_run - self.padding_frames, 0)
+        if trailing:
+            frames = frames[:-trailing]
+        self._segment, self._speech_frames, self._silence_run = [], 0, 0
+        if speech_frames < self.min_speech_frames or not frames:
+            return None
+        return np.concatenate(frames)
+
+
+class StreamingTranscriber:
+    """
+    Transcription au fil de l'eau : l'audio est poussé par morceaux pendant
+    l'enregistrement, chaque segment de parole est transcrit dès qu'il se termine.
+    À l'arrêt, finish() n'a plus que le dernier segment à traiter.
+
+    on_segment(texte_segment, transcription_partielle) est appelé après chaque
+    segment (ex: lancer l'analyse d'événement sur une transcription partielle).
+    """
+
+    def __init__(
+        self,
+        transcriber: Transcriber,
+        model_size: Optional[str] = None,
+        on_segment: Optional[Callable[[str, str], None]] = None,
+        segmenter: Optional[VoiceActivitySegmenter] = None,
+    ) -> None:
+        self.transcriber = transcriber
+        self.model_size = model_size or transcriber.model_size
+        self.on_segment = on_segment
+        self.segmenter = segmenter or VoiceActivitySegmenter()
+
+        # Un seul thread : les segments sont transcrits dans l'ordre
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._futures: List[Future] = []
+        self._texts: List[str] = []
+        self._lock = threading.Lock()
+        self._finished = False
+
+    def feed(self, samples: np.ndarray) -> None:
+        """
+        Pousse des échantillons float32 mono 16 kHz.
+        """
+        if self._finished:
+            raise RuntimeError("StreamingTranscriber déjà terminé")
+        for segment in self.segmenter.feed(samples):
+            self._submit(segment)
+
+    def feed_pcm16(self, chunk: bytes) -> None:
+        """
+        Pousse des échantillons PCM 16 bits little-endian (mono, 16 kHz).
+        """
+        self.feed(np.frombuffer(chunk, dtype="<i2").astype(np.float32) / 32768.0)
+
+    def partial_text(self) -> str:
+        with self._lock:
+            return " ".join(t for t in self._texts if t)
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._futures)
+
+    def pending_segments(self) -> int:
+        return sum(1 for future in self._futures if not future.done())
+
+    def finish(self, timeout: Optional[float] = None) -> str:
+        """
+        Fin de l'enregistrement : transcrit le dernier segment et renvoie le texte complet.
+        """
+        if not self._finished:
+            self._finished = True
+            last = self.segmenter.flush()
+            if last is not None:
+                self._submit(last)
+        try:
+            for future in list(self._futures):
+                future.result(timeout=timeout)
+        finally:
+            self._executor.shutdown(wait=False)
+        return self.partial_text()
+
+    def close(self) -> None:
+        """
+        Abandon du flux (client parti sans finish) : les segments en attente sont annulés.
+        """
+        self._finished = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit(self, segment: np.ndarray) -> None:
+        self._futures.append(self._executor.submit(self._transcribe_segment, segment))
+
+    def _transcribe_segment(self, segment: np.ndarray) -> None:
+        text = self.transcriber.transcribe_samples(segment, self.model_size)
+        with self._lock:
+            self._texts.append(text)
+        if self.on_segment is not None:
+            try:
+                self.on_segment(text, self.partial_text())
+            except Exception as err:
+                print(f"[StreamingTranscriber] on_segment failed: {err}")
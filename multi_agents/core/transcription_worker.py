@@ -0,0 +1,376 @@
+import os
+import sys
+import time
+import uuid
+import queue
+import atexit
+import secrets
+import argparse
+import threading
+import subprocess
+from multiprocessing.managers import BaseManager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from multi_agents.core.cache_backend import shared_cache
+from multi_agents.core.transcriber import Transcriber, StreamingTranscriber, audio_hash
+
+
+# Serveur local partagé par tous les process Streamlit de la machine
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 50555
+
+# Secret partagé par les process de cette installation (fichier 0600, créé au premier usage)
+DEFAULT_AUTHKEY_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "data", "transcription_worker.key"
+)
+
+
+def worker_address() -> Tuple[str, int]:
+    host = os.getenv("TRANSCRIPTION_WORKER_HOST", DEFAULT_HOST)
+    port = int(os.getenv("TRANSCRIPTION_WORKER_PORT", str(DEFAULT_PORT)))
+    return host, port
+
+
+def worker_authkey(path: Optional[str] = None) -> bytes:
+    """
+    Clé d'authentification du worker : TRANSCRIPTION_WORKER_AUTHKEY, sinon un secret
+    aléatoire propre à l'installation, lisible seulement par son propriétaire.
+    Le worker échange des pickles : une clé connue permettrait à n'importe quel process
+    local d'y exécuter du code.
+    """
+    key = os.getenv("TRANSCRIPTION_WORKER_AUTHKEY")
+    if key:
+        return key.encode("utf-8")
+
+    path = path or os.getenv("TRANSCRIPTION_WORKER_KEY_PATH") or DEFAULT_AUTHKEY_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        pass
+    else:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(secrets.token_hex(32))
+
+    if os.name == "posix" and os.stat(path).st_mode & 0o077:
+        raise PermissionError(f"{path} ne doit être lisible que par son propriétaire (chmod 600)")
+    # Un autre process peut être en train d'écrire le secret qu'il vient de créer
+    for _ in range(50):
+        with open(path, encoding="utf-8") as f:
+            key = f.read().strip()
+        if key:
+            return key.encode("utf-8")
+        time.sleep(0.01)
+    raise ValueError(f"clé du worker de transcription vide : {path}")
+
+
+class TranscriptionService:
+    """
+    File de transcription servie par un seul thread et un seul modèle Whisper.
+    - submit() renvoie immédiatement un job_id (l'UI ne bloque plus)
+    - les jobs sont sérialisés : un seul modèle en mémoire, pas de contention
+    - un même audio déjà en file (autre session, re-run) réutilise le même job
+    - la transcription partielle (segment par segment) est visible pendant le job
+    - mode streaming (open_stream / feed_stream / finish_stream) pour un client qui
+      envoie l'audio pendant l'enregistrement
+    """
+
+    def __init__(
+        self,
+        transcriber: Optional[Transcriber] = None,
+        max_finished: int = 256,
+        stream_idle_seconds: float = 300.0,
+    ) -> None:
+        self.transcriber = transcriber or Transcriber()
+        self.max_finished = max_finished
+        # Un flux sans activité depuis stream_idle_seconds (client parti sans finish) est libéré
+        self.stream_idle_seconds = stream_idle_seconds
+
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[tuple, str] = {}
+        self._audio: Dict[str, bytes] = {}
+        self._finished: "list[str]" = []
+        self._streams: Dict[str, StreamingTranscriber] = {}
+        self._stream_seen: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        self._thread = threading.Thread(target=self._loop, name="transcription-worker", daemon=True)
+        self._thread.start()
+
+    def submit(self, audio_bytes: bytes, model_size: Optional[str] = None) -> str:
+        size = model_size or self.transcriber.model_size
+        key = (audio_hash(audio_bytes), size)
+        with self._lock:
+            job_id = self._pending.get(key)
+            if job_id is not None:
+                return job_id
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "status": "queued",
+                "text": None,
+                "error": None,
+                "model_size": size,
+                "submitted_at": time.time(),
+                "latency_s": None,
+                "partial_text": "",
+            }
+            self._pending[key] = job_id
+            self._audio[job_id] = audio_bytes
+        self._queue.put(job_id)
+        return job_id
+
+    def result(self, job_id: str) -> Dict[str, Any]:
+        """
+        État d'un job : status ("queued" / "running" / "done" / "error" / "unknown"),
+        text, error, position dans la file.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return {"status": "unknown", "text": None, "error": None}
+            info = dict(job)
+            if job["status"] == "queued":
+                info["position"] = self._position(job_id)
+            return info
+
+    def queue_depth(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job["status"] in ("queued", "running"))
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.transcriber.stats()
+        stats["queue_depth"] = self.queue_depth()
+        return stats
+
+    # ---------------- Streaming ----------------
+
+    def open_stream(self, model_size: Optional[str] = None) -> str:
+        stream_id = uuid.uuid4().hex
+        self._reap_streams()
+        with self._lock:
+            self._streams[stream_id] = StreamingTranscriber(self.transcriber, model_size=model_size)
+            self._stream_seen[stream_id] = time.monotonic()
+        return stream_id
+
+    def feed_stream(self, stream_id: str, pcm16: bytes) -> Dict[str, Any]:
+        """
+        Ajoute un morceau d'audio PCM 16 bits mono 16 kHz ; renvoie la transcription partielle.
+        """
+        stream = self._stream(stream_id)
+        stream.feed_pcm16(pcm16)
+        return {"partial_text": stream.partial_text(), "pending_segments": stream.pending_segments()}
+
+    def stream_partial(self, stream_id: str) -> Dict[str, Any]:
+        stream = self._stream(stream_id)
+        return {"partial_text": stream.partial_text(), "pending_segments": stream.pending_segments()}
+
+    def finish_stream(self, stream_id: str) -> str:
+        with self._lock:
+            stream = self._streams.pop(stream_id, None)
+            self._stream_seen.pop(stream_id, None)
+        if stream is None:
+            raise KeyError(f"stream inconnu : {stream_id}")
+        return stream.finish()
+
+    def shutdown(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5.0)
+
+    # ---------------- Interne ----------------
+
+    def _stream(self, stream_id: str) -> StreamingTranscriber:
+        self._reap_streams()
+        with self._lock:
+            stream = self._streams.get(stream_id)
+            if stream is not None:
+                self._stream_seen[stream_id] = time.monotonic()
+        if stream is None:
+            raise KeyError(f"stream inconnu : {stream_id}")
+        return stream
+
+    def _reap_streams(self) -> None:
+        limit = time.monotonic() - self.stream_idle_seconds
+        with self._lock:
+            idle = [sid for sid, seen in self._stream_seen.items() if seen < limit]
+            streams = [self._streams.pop(sid) for sid in idle if sid in self._streams]
+            for sid in idle:
+                del self._stream_seen[sid]
+        for stream in streams:
+            stream.close()
+        if idle:
+            print(f"[TranscriptionService] Dropped {len(idle)} idle stream(s)")
+
+    def _position(self, job_id: str) -> int:
+        queued = [jid for jid, job in self._jobs.items() if job["status"] == "queued"]
+        queued.sort(key=lambda jid: self._jobs[jid]["submitted_at"])
+        return queued.index(job_id) + 1
+
+    def _loop(self) -> None:
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                return
+            with self._lock:
+                job = self._jobs[job_id]
+                job["status"] = "running"
+                audio = self._audio.pop(job_id)
+
+            start = time.perf_counter()
+            try:
+                text = self.transcriber.transcribe(
+                    audio,
+                    model_size=job["model_size"],
+                    on_segment=lambda _segment, partial: self._set_partial(job, partial),
+                )
+                update = {"status": "done", "text": text}
+            except Exception as err:
+                print(f"[TranscriptionService] Job {job_id} failed: {err}")
+                update = {"status": "error", "error": str(err)}
+
+            with self._lock:
+                job.update(update)
+                job["latency_s"] = time.perf_counter() - start
+                self._pending.pop((audio_hash(audio), job["model_size"]), None)
+                self._finished.append(job_id)
+                # On ne garde que les derniers résultats (l'UI les lit une fois)
+                while len(self._finished) > self.max_finished:
+                    self._jobs.pop(self._finished.pop(0), None)
+
+    def _set_partial(self, job: Dict[str, Any], partial: str) -> None:
+        with self._lock:
+            job["partial_text"] = partial
+
+
+class TranscriptionManager(BaseManager):
+    pass
+
+
+_service: Optional[TranscriptionService] = None
+# Workers démarrés par ce process (connect_or_spawn), arrêtés à sa sortie
+_spawned: "list[subprocess.Popen]" = []
+
+
+def _get_service() -> TranscriptionService:
+    global _service
+    if _service is None:
+        # Transcriptions partagées avec les autres process (repli in-process de l'UI...)
+        _service = TranscriptionService(Transcriber(cache=shared_cache()))
+    return _service
+
+
+TranscriptionManager.register(
+    "service",
+    callable=_get_service,
+    exposed=(
+        "submit", "result", "queue_depth", "stats",
+        "open_stream", "feed_stream", "stream_partial", "finish_stream",
+    ),
+)
+
+
+def serve(
+    address: Optional[Tuple[str, int]] = None,
+    authkey: Optional[bytes] = None,
+    parent_pid: Optional[int] = None,
+) -> None:
+    """
+    Lance le serveur de transcription (bloquant). Le modèle est chargé au premier job.
+        python -m multi_agents.core.transcription_worker
+    Avec parent_pid, le worker s'arrête quand le process qui l'a lancé disparaît.
+    """
+    address = address or worker_address()
+    manager = TranscriptionManager(address=address, authkey=authkey or worker_authkey())
+    server = manager.get_server()
+    if parent_pid is not None:
+        threading.Thread(target=_watch_parent, args=(parent_pid,), name="transcription-parent", daemon=True).start()
+    print(f"[TranscriptionWorker] Listening on {address[0]}:{address[1]}")
+    server.serve_forever()
+
+
+def _watch_parent(parent_pid: int, interval: float = 2.0) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            os.kill(parent_pid, 0)
+        except ProcessLookupError:
+            print(f"[TranscriptionWorker] Parent {parent_pid} gone, exiting")
+            os._exit(0)
+        except PermissionError:
+            pass
+
+
+def connect(
+    address: Optional[Tuple[str, int]] = None,
+    authkey: Optional[bytes] = None,
+) -> Any:
+    """
+    Proxy vers le TranscriptionService du worker (submit / result / queue_depth / stats).
+    Lève ConnectionError si aucun worker n'écoute.
+    """
+    manager = TranscriptionManager(address=address or worker_address(), authkey=authkey or worker_authkey())
+    manager.connect()
+    return manager.service()  # type: ignore[attr-defined]
+
+
+def connect_or_spawn(
+    timeout_seconds: float = 15.0,
+    spawn: Optional[Callable[[], Any]] = None,
+) -> Any:
+    """
+    Se connecte au worker local ; s'il ne tourne pas encore, le démarre dans un
+    process détaché (partagé ensuite par toutes les sessions et tous les serveurs).
+    Un worker démarré ici est suivi (pid) et arrêté avec ce process.
+    """
+    try:
+        return connect()
+    except (ConnectionError, OSError):
+        pass
+
+    if spawn is None:
+        # Secret créé avant le lancement : le worker lit le même fichier
+        worker_authkey()
+        process = subprocess.Popen(
+            [sys.executable, "-m", "multi_agents.core.transcription_worker", "--parent-pid", str(os.getpid())],
+            cwd=os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+            stdin=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        _spawned.append(process)
+        print(f"[TranscriptionWorker] Started worker pid {process.pid}")
+    else:
+        spawn()
+
+    deadline = time.monotonic() + timeout_seconds
+    while True:
+        try:
+            return connect()
+        except (ConnectionError, OSError):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+@atexit.register
+def stop_spawned_workers(timeout_seconds: float = 5.0) -> None:
+    """
+    Arrête les workers lancés par ce process (appelé à la sortie de l'application).
+    """
+    while _spawned:
+        process = _spawned.pop()
+        if process.poll() is not None:
+            continue
+        print(f"[TranscriptionWorker] Stopping worker pid {process.pid}")
+        process.terminate()
+        try:
+            process.wait(timeout=timeout_seconds)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Worker de transcription partagé")
+    parser.add_argument("--parent-pid", type=int, default=None, help="s'arrêter quand ce process disparaît")
+    args = parser.parse_args()
+    serve(parent_pid=args.parent_pid)
@@ -1,10 +1,18 @@
 import os
+import json
 import time
-import requests
-from typing import List, Dict, Any, Optional
-from dotenv import load_dotenv
+import asyncio
+import heapq
+import codecs
+import threading
+from typing import List, Dict, Any, Optional, Iterable, Iterator
+from urllib.parse import quote_plus
 
-load_dotenv()
+import httpx
+
+from multi_agents.core.config import load_env
+from multi_agents.core.http_client import get_http_client, get_async_http_client
+from multi_agents.core.product_provider import item_query
 
 
 class ZalandoScraper:
@@ -14,13 +22,20 @@ class ZalandoScraper:
 
     ACTOR_ID = "saswave~zalando-scraper"
 
+    # search / asearch acceptent collected (tous les produits normalisés du run)
+    collects_all = True
+
     def __init__(
         self,
         max_wait_seconds: int = 60,
         poll_interval: float = 2.0,
         max_page: int = 1,
         max_results: int = 5,
+        page_size: int = 100,
+        http_client: Optional[httpx.Client] = None,
+        catalog: Optional[Any] = None,
     ) -> None:
+        load_env()
         self.api_token = os.getenv("APIFY_API_TOKEN")
         if not self.api_token:
             raise ValueError("APIFY_API_TOKEN manquant dans .env")
@@ -29,15 +44,98 @@ class ZalandoScraper:
         self.poll_interval = poll_interval
         self.max_page = max_page          # 👈 nécessaire
         self.max_results = max_results    # 👈 nécessaire
+        self.page_size = page_size        # taille des pages lues dans le dataset
+        self.http = http_client or get_http_client()
+        # Catalogue local (CatalogStore) : reçoit tous les produits normalisés d'un run,
+        # pas seulement les max_results renvoyés. Pour un scraper utilisé seul : derrière
+        # un FederatedProductProvider doté d'un catalogue, ne pas le passer (un seul écrivain)
+        self.catalog = catalog
 
     def search(
         self,
         search_text: str,
         gender_path: str,
         max_price: float,
+        cancel_event: Optional[threading.Event] = None,
+        collected: Optional[List[Dict[str, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Lance un run Apify et renvoie les produits normalisés.
+        Si cancel_event est levé pendant le polling, le run est interrompu
+        côté Apify (abort) et la recherche renvoie une liste vide.
+        collected : si fourni, reçoit tous les produits normalisés du run (pas seulement
+        les max_results renvoyés) ; l'appelant les enregistre lui-même au catalogue.
+        """
+        run_url, payload = self._run_request(search_text, gender_path, max_price)
+        resp = self.http.post(run_url, json=payload)
+        resp.raise_for_status()
+        run_id = resp.json()["data"]["id"]
+
+        # --- Polling ---
+        start = time.time()
+        while True:
+            status_data = self.http.get(self._status_url(run_id)).json()
+            if self._run_finished(status_data, start):
+                break
+            if cancel_event is None:
+                time.sleep(self.poll_interval)
+            elif cancel_event.wait(self.poll_interval):
+                self._abort_run(run_id)
+                return []
+
+        dataset_id = status_data["data"]["defaultDatasetId"]
+        record = collected is None and self.catalog is not None
+        if record:
+            collected = []
+        results = self._fetch_dataset(dataset_id, max_price=max_price, collected=collected)
+        if record:
+            self._record(search_text, gender_path, max_price, collected)
+        return results
+
+    async def asearch(
+        self,
+        search_text: str,
+        gender_path: str,
+        max_price: float,
+        cancel_event: Optional[threading.Event] = None,
+        collected: Optional[List[Dict[str, Any]]] = None,
     ) -> List[Dict[str, Any]]:
-        from urllib.parse import quote_plus
+        """
+        Version asynchrone de search(). Si la tâche est annulée (ou cancel_event levé)
+        pendant le polling, le run Apify est interrompu avant de propager l'annulation.
+        """
+        http = get_async_http_client()
+        run_url, payload = self._run_request(search_text, gender_path, max_price)
+        resp = await http.post(run_url, json=payload)
+        resp.raise_for_status()
+        run_id = resp.json()["data"]["id"]
 
+        start = time.time()
+        try:
+            while True:
+                status_data = (await http.get(self._status_url(run_id))).json()
+                if self._run_finished(status_data, start):
+                    break
+                await asyncio.sleep(self.poll_interval)
+                if cancel_event is not None and cancel_event.is_set():
+                    await self._aabort_run(run_id)
+                    return []
+        except asyncio.CancelledError:
+            await asyncio.shield(self._aabort_run(run_id))
+            raise
+
+        dataset_id = status_data["data"]["defaultDatasetId"]
+        record = collected is None and self.catalog is not None
+        if record:
+            collected = []
+        results = await self._afetch_dataset(dataset_id, max_price=max_price, collected=collected)
+        if record:
+            await asyncio.to_thread(self._record, search_text, gender_path, max_price, collected)
+        return results
+
+    # ---------- URLs Apify ----------
+
+    def _run_request(self, search_text: str, gender_path: str, max_price: float) -> tuple:
         q = quote_plus(search_text)
         price_to = int(max_price)
 
@@ -48,70 +146,228 @@ class ZalandoScraper:
             "url": url,
             "max_page": self.max_page,
         }
+        return run_url, payload
 
-        resp = requests.post(run_url, json=payload)
-        resp.raise_for_status()
-        run_data = resp.json()
-        run_id = run_data["data"]["id"]
+    def _status_url(self, run_id: str) -> str:
+        return f"https://api.apify.com/v2/actor-runs/{run_id}?token={self.api_token}"
+
+    def _abort_url(self, run_id: str) -> str:
+        return f"https://api.apify.com/v2/actor-runs/{run_id}/abort?token={self.api_token}"
+
+    def _items_url(self, dataset_id: str, offset: int) -> str:
+        return (
+            f"https://api.apify.com/v2/datasets/{dataset_id}/items"
+            f"?clean=1&format=json&offset={offset}&limit={self.page_size}&token={self.api_token}"
+        )
+
+    def _run_finished(self, status_data: Dict[str, Any], start: float) -> bool:
+        status = status_data["data"]["status"]
+        if status in ("SUCCEEDED", "FAILED", "TIMED_OUT"):
+            return True
+        return time.time() - start > self.max_wait_seconds
+
+    # ---------- Lecture du dataset ----------
+
+    def _fetch_dataset(
+        self,
+        dataset_id: str,
+        max_price: float,
+        collected: Optional[List[Dict[str, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Lit le dataset par pages (offset/limit) en décodant le JSON au fil de l'eau :
+        chaque item est normalisé dès réception et seuls les max_results moins chers
+        sont gardés (tas borné). Pour les runs multi-pages (max_page > 1), on arrête
+        la lecture dès qu'on a assez d'items qualifiés.
+        collected : si fourni, reçoit tous les produits normalisés (pour le catalogue).
+        """
+        heap: List[tuple] = []
+        offset = 0
 
-        # --- Polling ---
-        start = time.time()
         while True:
-            status_url = f"https://api.apify.com/v2/actor-runs/{run_id}?token={self.api_token}"
-            status_data = requests.get(status_url).json()
-            status = status_data["data"]["status"]
+            with self.http.stream("GET", self._items_url(dataset_id, offset)) as resp:
+                resp.raise_for_status()
+                received = self._consume_page(
+                    iter_json_array(resp.iter_bytes(chunk_size=8192)), heap, offset, max_price, collected
+                )
 
-            if status in ("SUCCEEDED", "FAILED", "TIMED_OUT"):
+            offset += received
+            if self._last_page(received, heap):
                 break
-            if time.time() - start > self.max_wait_seconds:
+
+        return self._sorted_top_k(heap)
+
+    async def _afetch_dataset(
+        self,
+        dataset_id: str,
+        max_price: float,
+        collected: Optional[List[Dict[str, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        http = get_async_http_client()
+        heap: List[tuple] = []
+        offset = 0
+
+        while True:
+            async with http.stream("GET", self._items_url(dataset_id, offset)) as resp:
+                resp.raise_for_status()
+                decoder = JsonArrayDecoder()
+                received = 0
+                async for chunk in resp.aiter_bytes(chunk_size=8192):
+                    received += self._consume_page(
+                        decoder.feed(chunk), heap, offset + received, max_price, collected
+                    )
+
+            offset += received
+            if self._last_page(received, heap):
                 break
-            time.sleep(self.poll_interval)
 
-        dataset_id = status_data["data"]["defaultDatasetId"]
-        items_url = f"https://api.apify.com/v2/datasets/{dataset_id}/items?clean=1&format=json&token={self.api_token}"
-        raw_items = requests.get(items_url).json()
+        return self._sorted_top_k(heap)
+
+    def _consume_page(
+        self,
+        raw_items: Iterable[Any],
+        heap: List[tuple],
+        offset: int,
+        max_price: float,
+        collected: Optional[List[Dict[str, Any]]] = None,
+    ) -> int:
+        received = 0
+        for raw_item in raw_items:
+            product = self._normalize_item(raw_item, max_price)
+            if product is not None:
+                self._push_top_k(heap, product, offset + received)
+                if collected is not None:
+                    collected.append(product)
+            received += 1
+        return received
+
+    def _record(
+        self,
+        search_text: str,
+        gender_path: str,
+        max_price: float,
+        collected: Optional[List[Dict[str, Any]]],
+    ) -> None:
+        if not collected:
+            return
+        # Le catalogue est un bonus : une erreur d'écriture ne fait pas échouer la recherche
+        try:
+            self.catalog.record(item_query(search_text, gender_path, max_price), collected)
+        except Exception as err:
+            print(f"[ZalandoScraper] Catalog record failed: {err}")
+
+    def _last_page(self, received: int, heap: List[tuple]) -> bool:
+        if received < self.page_size:
+            return True
+        return self.max_page > 1 and len(heap) >= self.max_results
+
+    def _push_top_k(self, heap: List[tuple], product: Dict[str, Any], seq: int) -> None:
+        # Tas max sur le prix (le plus cher en racine) ; à prix égal on garde le premier reçu
+        entry = (-product["price"], -seq, product)
+        if len(heap) < self.max_results:
+            heapq.heappush(heap, entry)
+        elif product["price"] < -heap[0][0]:
+            heapq.heapreplace(heap, entry)
 
-        return self._normalize(raw_items, max_price=max_price)
+    @staticmethod
+    def _sorted_top_k(heap: List[tuple]) -> List[Dict[str, Any]]:
+        return [entry[2] for entry in sorted(heap, key=lambda e: (-e[0], -e[1]))]
+
+    def _abort_run(self, run_id: str) -> None:
+        """
+        Interrompt un run Apify en cours (ne lève pas d'erreur si c'est déjà fini).
+        """
+        try:
+            self.http.post(self._abort_url(run_id))
+        except httpx.HTTPError as err:
+            print(f"[ZalandoScraper] Abort failed for run {run_id}: {err}")
+
+    async def _aabort_run(self, run_id: str) -> None:
+        try:
+            await get_async_http_client().post(self._abort_url(run_id))
+        except httpx.HTTPError as err:
+            print(f"[ZalandoScraper] Abort failed for run {run_id}: {err}")
 
     def _normalize(self, items: list, max_price: float) -> List[Dict[str, Any]]:
-        results = []
+        heap: List[tuple] = []
+        for seq, item in enumerate(items):
+            product = self._normalize_item(item, max_price)
+            if product is not None:
+                self._push_top_k(heap, product, seq)
+        return self._sorted_top_k(heap)
+
+    @staticmethod
+    def _normalize_item(item: Dict[str, Any], max_price: float) -> Optional[Dict[str, Any]]:
+        if item.get("isSponsored") or item.get("sponsored"):
+            return None
+
+        raw_price = item.get("price")
+        if raw_price is None:
+            return None
+
+        try:
+            price = float(str(raw_price).replace(",", "."))
+        except ValueError:
+            return None
 
-        for item in items:
-            if item.get("isSponsored") or item.get("sponsored"):
-                continue
+        if price > max_price:
+            return None
 
-            raw_price = item.get("price")
-            if raw_price is None:
-                continue
+        # 🔍 Normalisation de l'image : accepter string OU liste
+        image_field = item.get("image") or item.get("images")
+        if isinstance(image_field, list):
+            image_url = image_field[0] if image_field else None
+        else:
+            image_url = image_field  # peut être str ou None
 
+        return {
+            "name": item.get("name"),
+            "brand": item.get("brand") or item.get("manufacturer"),
+            "price": price,
+            "currency": item.get("currency") or "EUR",
+            "url": item.get("url"),
+            "image": image_url,   # ✅ toujours une seule URL ou None
+            "sku": item.get("sku"),
+            "color": item.get("color"),
+        }
+
+
+class JsonArrayDecoder:
+    """
+    Décodeur incrémental d'un tableau JSON : feed() reçoit des morceaux d'octets
+    et renvoie les éléments complets déjà disponibles.
+    """
+
+    def __init__(self) -> None:
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        buf = self._buf + self._utf8.decode(chunk)
+        pos = 0
+        values: List[Any] = []
+        while True:
+            # Au niveau du tableau, entre deux éléments : espaces, crochets et virgules
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] in "[],"):
+                pos += 1
+            if pos >= len(buf):
+                break
             try:
-                price = float(str(raw_price).replace(",", "."))
-            except ValueError:
-                continue
-
-            if price > max_price:
-                continue
-
-            # 🔍 Normalisation de l'image : accepter string OU liste
-            image_field = item.get("image") or item.get("images")
-            if isinstance(image_field, list):
-                image_url = image_field[0] if image_field else None
-            else:
-                image_url = image_field  # peut être str ou None
-
-            results.append(
-                {
-                    "name": item.get("name"),
-                    "brand": item.get("brand") or item.get("manufacturer"),
-                    "price": price,
-                    "currency": item.get("currency") or "EUR",
-                    "url": item.get("url"),
-                    "image": image_url,   # ✅ toujours une seule URL ou None
-                    "sku": item.get("sku"),
-                    "color": item.get("color"),
-                }
-            )
-
-        results.sort(key=lambda x: x["price"])
-        return results[: self.max_results]
+                value, end = self._decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                break  # élément incomplet : attendre le morceau suivant
+            values.append(value)
+            pos = end
+        self._buf = buf[pos:]
+        return values
+
 
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """
+    Décode un tableau JSON reçu par morceaux et renvoie ses éléments un à un,
+    sans attendre la fin du téléchargement.
+    """
+    decoder = JsonArrayDecoder()
+    for chunk in chunks:
+        yield from decoder.feed(chunk)
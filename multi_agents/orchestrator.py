@@ -1,13 +1,9 @@
-from typing import Optional, Dict, Any
+import threading
+from typing import Optional, Dict, Any, List, Callable, TYPE_CHECKING
 
-from multi_agents.agents.event_analyzer import EventAnalyzerAgent
-from multi_agents.agents.stylist import StylistAgent
-from multi_agents.agents.product_search import ProductSearchAgent
-from multi_agents.agents.outfit_visualizer import OutfitVisualizerAgent
-
-from multi_agents.core.llm_client import LLMClient
-from multi_agents.core.zalando_scraper import ZalandoScraper
-from multi_agents.core.image_client import ModelslabImageClient
+from multi_agents.core.async_utils import run_sync
+from multi_agents.core.prompt_builder import start_request_tracking
+from multi_agents.core.deadline import Deadline
 from multi_agents.core.models import (
     EventUnderstanding,
     StylistOutput,
@@ -15,43 +11,190 @@ from multi_agents.core.models import (
     ResolvedOutfit,
 )
 
+if TYPE_CHECKING:
+    from multi_agents.agents.event_analyzer import EventAnalyzerAgent
+    from multi_agents.agents.stylist import StylistAgent
+    from multi_agents.agents.product_search import ProductSearchAgent
+    from multi_agents.agents.outfit_visualizer import OutfitVisualizerAgent
+    from multi_agents.core.llm_client import LLMClient
+    from multi_agents.core.image_prefetch import ImagePrefetcher
+    from multi_agents.core.product_provider import ProductProvider
+    from multi_agents.core.cached_product_provider import CachedScrapeProvider
+    from multi_agents.core.catalog_store import CatalogStore
+    from multi_agents.core.llm_cache import LLMResponseCache
+    from multi_agents.core.cache_backend import CacheBackend
+    from multi_agents.core.result_store import PipelineResultStore
+
+
+# Suivi de progression : on_stage(étape, "started" / "done", sortie de l'étape)
+StageCallback = Callable[[str, str, Dict[str, Any]], None]
+
+
+# Routage des modèles par agent : les tâches structurées simples passent sur un
+# petit modèle rapide, l'analyse d'événement et le stylisme gardent le grand modèle
+# (LLMClient.model). Une sortie invalide du petit modèle est relancée sur le grand.
+SMALL_MODEL = "llama-3.1-8b-instant"
+DEFAULT_MODEL_ROUTES: Dict[str, str] = {
+    "query_builder": SMALL_MODEL,
+    "product_selector": SMALL_MODEL,
+    "mannequin_prompt": SMALL_MODEL,
+}
+
 
 class Orchestrator:
     """
     Orchestrateur global du workflow :
       1) EventAnalyzerAgent : comprend la demande de l'utilisateur
       2) StylistAgent       : propose des idées de tenues + budget par article
-      3) ProductSearchAgent : va chercher des produits Zalando pour chaque article
+      3) ProductSearchAgent : va chercher des produits pour chaque article
+                              (cache de scrapes, sources locales et Apify en parallèle)
       4) OutfitVisualizer   : génère un mannequin portant la tenue
 
-    Méthode principale : run_pipeline(...)
+    Méthode principale : arun_pipeline(...) (asynchrone), run_pipeline(...) en version synchrone
     """
 
     def __init__(
         self,
-        llm_client: Optional[LLMClient] = None,
+        llm_client: Optional["LLMClient"] = None,
+        scraper: Optional[Any] = None,
+        image_client: Optional[Any] = None,
+        model_routes: Optional[Dict[str, str]] = None,
+        providers: Optional[List["ProductProvider"]] = None,
+        result_store: Optional["PipelineResultStore"] = None,
+        catalog: Optional["CatalogStore"] = None,
+        llm_cache: Optional["LLMResponseCache"] = None,
+        cache: Optional["CacheBackend"] = None,
     ) -> None:
-        self.llm = llm_client or LLMClient()
+        # Construction paresseuse : chaque client / agent (et ses imports lourds :
+        # groq, httpx, numpy...) n'est créé qu'à la première utilisation de son étape.
+        # Une session Streamlit peut ainsi afficher l'UI sans attendre les SDK.
+        self._llm = llm_client
+        self._llm_routed = False
+        # Cache persistant des réponses LLM (client construit ici uniquement) ; None = désactivé
+        self.llm_cache = llm_cache
+        self.model_routes = DEFAULT_MODEL_ROUTES if model_routes is None else model_routes
+        self._scraper = scraper
+        # Sources produits interrogées en parallèle d'Apify (catalogue local, scraper HTML...)
+        self._providers = list(providers or [])
+        self._scrape_cache: Optional["CachedScrapeProvider"] = None
+        # Backend des caches de scrapes et d'aperçus (ex: SQLite partagé entre process) ;
+        # None = caches en mémoire propres à ce process
+        self.cache = cache
+        # Catalogue local (SQLite FTS5) alimenté par tous les scrapes ; None = désactivé
+        self.catalog = catalog
+        self._image_client = image_client
+        self._event_analyzer: Optional["EventAnalyzerAgent"] = None
+        self._stylist: Optional["StylistAgent"] = None
+        self._product_search: Optional["ProductSearchAgent"] = None
+        self._visualizer: Optional["OutfitVisualizerAgent"] = None
+        self._prefetcher: Optional["ImagePrefetcher"] = None
+        # Résultats complets mémoïsés (demandes répétées / quasi identiques) ; None = désactivé
+        self.result_store = result_store
+        self._lock = threading.RLock()
 
-        # Agents
-        self.event_analyzer = EventAnalyzerAgent(llm_client=self.llm)
-        self.stylist = StylistAgent(llm_client=self.llm)
+    # ---------------- Construction paresseuse ----------------
 
-        scraper = ZalandoScraper(
-            max_page=1,
-            max_results=3,
-        )
-        self.product_search = ProductSearchAgent(
-            llm_client=self.llm,
-            scraper=scraper,
-        )
+    @property
+    def llm(self) -> "LLMClient":
+        with self._lock:
+            if self._llm is None:
+                from multi_agents.core.llm_client import LLMClient, HedgingPolicy
 
-        image_client = ModelslabImageClient()
-        self.visualizer = OutfitVisualizerAgent(
-            llm_client=self.llm,
-            image_client=image_client,
-            max_outfits=3,
-        )
+                # Hedging : un appel plus lent que le p95 de son agent est doublé (budget 10%)
+                self._llm = LLMClient(hedging=HedgingPolicy(), cache=self.llm_cache)
+            if not self._llm_routed:
+                # Routage configuré une seule fois, y compris sur un client fourni
+                if hasattr(self._llm, "route"):
+                    for agent, model in self.model_routes.items():
+                        self._llm.route(agent, model)
+                self._llm_routed = True
+            return self._llm
+
+    @property
+    def event_analyzer(self) -> "EventAnalyzerAgent":
+        with self._lock:
+            if self._event_analyzer is None:
+                from multi_agents.agents.event_analyzer import EventAnalyzerAgent
+
+                self._event_analyzer = EventAnalyzerAgent(llm_client=self.llm)
+            return self._event_analyzer
+
+    @property
+    def stylist(self) -> "StylistAgent":
+        with self._lock:
+            if self._stylist is None:
+                from multi_agents.agents.stylist import StylistAgent
+
+                self._stylist = StylistAgent(llm_client=self.llm)
+            return self._stylist
+
+    @property
+    def product_search(self) -> "ProductSearchAgent":
+        with self._lock:
+            if self._product_search is None:
+                from multi_agents.agents.product_search import ProductSearchAgent
+
+                from multi_agents.core.apify_product_provider import ApifyProductProvider
+                from multi_agents.core.federated_product_provider import FederatedProductProvider
+
+                if self._scraper is None:
+                    from multi_agents.core.zalando_scraper import ZalandoScraper
+
+                    # Pas de catalog= ici : la recherche fédérée alimente déjà le catalogue
+                    self._scraper = ZalandoScraper(
+                        max_page=1,
+                        max_results=3,
+                    )
+                # Cache de scrapes + catalogue + sources locales + Apify, fusionnés par article
+                provider = FederatedProductProvider(
+                    self._providers + [ApifyProductProvider(self._scraper)],
+                    cache=self.scrape_cache,
+                    catalog=self.catalog,
+                    min_results=3,
+                )
+                self._product_search = ProductSearchAgent(
+                    llm_client=self.llm,
+                    scraper=self._scraper,
+                    provider=provider,
+                )
+            return self._product_search
+
+    @property
+    def scrape_cache(self) -> "CachedScrapeProvider":
+        with self._lock:
+            if self._scrape_cache is None:
+                from multi_agents.core.cached_product_provider import CachedScrapeProvider
+
+                self._scrape_cache = CachedScrapeProvider(backend=self.cache)
+            return self._scrape_cache
+
+    @property
+    def visualizer(self) -> "OutfitVisualizerAgent":
+        with self._lock:
+            if self._visualizer is None:
+                from multi_agents.agents.outfit_visualizer import OutfitVisualizerAgent
+
+                if self._image_client is None:
+                    from multi_agents.core.image_client import ModelslabImageClient
+
+                    self._image_client = ModelslabImageClient()
+                self._visualizer = OutfitVisualizerAgent(
+                    llm_client=self.llm,
+                    image_client=self._image_client,
+                    max_outfits=3,
+                    image_checker=self.prefetcher,
+                    cache=self.cache,
+                )
+            return self._visualizer
+
+    @property
+    def prefetcher(self) -> "ImagePrefetcher":
+        with self._lock:
+            if self._prefetcher is None:
+                from multi_agents.core.image_prefetch import ImagePrefetcher
+
+                self._prefetcher = ImagePrefetcher()
+            return self._prefetcher
 
     def run_pipeline(
         self,
@@ -60,107 +203,366 @@ class Orchestrator:
         ui_gender: str = "homme",
         ui_age: Optional[int] = None,
         user_image_url: Optional[str] = None,
+        user_image_bytes: Optional[bytes] = None,
+        deadline_seconds: Optional[float] = None,
+        on_stage: Optional["StageCallback"] = None,
+    ) -> Dict[str, Any]:
+        """
+        Version synchrone de arun_pipeline (mêmes paramètres, même résultat).
+        """
+        return run_sync(
+            self.arun_pipeline(
+                description=description,
+                ui_budget=ui_budget,
+                ui_gender=ui_gender,
+                ui_age=ui_age,
+                user_image_url=user_image_url,
+                user_image_bytes=user_image_bytes,
+                deadline_seconds=deadline_seconds,
+                on_stage=on_stage,
+            )
+        )
+
+    async def arun_pipeline(
+        self,
+        description: str,
+        ui_budget: Optional[float] = None,
+        ui_gender: str = "homme",
+        ui_age: Optional[int] = None,
+        user_image_url: Optional[str] = None,
+        user_image_bytes: Optional[bytes] = None,
+        deadline_seconds: Optional[float] = None,
+        on_stage: Optional["StageCallback"] = None,
     ) -> Dict[str, Any]:
         """
         Lance tout le workflow sur une seule demande utilisateur.
+        Entièrement asynchrone : un seul process peut servir de nombreuses demandes
+        concurrentes sans bloquer un thread par utilisateur.
 
         - description : texte libre décrivant l'événement, le style, etc.
         - ui_budget   : budget éventuellement saisi dans l'UI (peut être None)
         - ui_gender   : "homme" / "femme" (par défaut "homme")
         - ui_age      : âge si disponible
         - user_image_url : URL publique de la photo du user (si None, pas de mannequin généré)
+        - user_image_bytes : ou contenu de la photo uploadée (ingérée puis hébergée une fois)
+        - deadline_seconds : budget de temps de la demande (None = pas d'échéance). Chaque
+          étape l'utilise pour doser son travail : moins de tenues, recherche limitée au
+          cache, ranker local au lieu du LLM, pas d'aperçus (cf. DEGRADATION_THRESHOLDS)
+        - on_stage : appelé au début ("started") et à la fin ("done") de chaque étape
+          (event_analyzer, stylist, product_search, visualizer), avec la sortie de l'étape
+          terminée ; ("memoized", "done") si la demande est servie par le result_store
 
         Retourne un dict avec :
         {
           "event": EventUnderstanding,
           "stylist_output": StylistOutput,
           "product_search_output": ProductSearchOutput,
-          "final_outfits": list[ResolvedOutfit]
+          "final_outfits": list[ResolvedOutfit],
+          "prompt_tokens": {"prompt_tokens", "baseline_tokens", "saved_tokens"},
+          "degradations": [{"stage", "action", "detail", "remaining_s", "count"}, ...],
+          "memoized": None ou {"match", "age_s", "refreshing"} si servi par le result_store
         }
         """
+        request = {
+            "description": description,
+            "ui_budget": ui_budget,
+            "ui_gender": ui_gender,
+            "ui_age": ui_age,
+            "user_image_url": user_image_url,
+            "user_image_bytes": user_image_bytes,
+        }
+        return await self._arun_stages(request, deadline_seconds, on_stage=on_stage)
+
+    async def _arun_stages(
+        self,
+        request: Dict[str, Any],
+        deadline_seconds: Optional[float],
+        use_store: bool = True,
+        replaces: Optional[tuple] = None,
+        on_stage: Optional["StageCallback"] = None,
+    ) -> Dict[str, Any]:
+        deadline = Deadline(deadline_seconds)
+
+        def notify(stage: str, status: str, data: Optional[Dict[str, Any]] = None) -> None:
+            if on_stage is None:
+                return
+            # Un suivi de progression en erreur ne doit pas faire échouer la demande
+            try:
+                on_stage(stage, status, data or {})
+            except Exception as err:
+                print(f"[Orchestrator] on_stage callback failed ({stage}/{status}): {err}")
+
+        # Tokens de prompt envoyés / économisés par cette demande (tous agents confondus)
+        prompt_tokens = start_request_tracking()
+
+        # 0) Même demande (ou presque) déjà servie : aucun agent à relancer
+        if use_store:
+            memo = self.memoized_result(**request)
+            if memo is not None:
+                memo["prompt_tokens"] = prompt_tokens
+                notify("memoized", "done", memo)
+                return memo
+
+        description = request["description"]
+        ui_budget = request["ui_budget"]
+        ui_gender = request["ui_gender"]
+        ui_age = request["ui_age"]
+        user_image_url = request["user_image_url"]
+        user_image_bytes = request["user_image_bytes"]
 
         # 1) Analyse de l'événement
-        event: EventUnderstanding = self._run_event_analyzer(
+        notify("event_analyzer", "started")
+        event: EventUnderstanding = await self._arun_event_analyzer(
             description=description,
             ui_budget=ui_budget,
             ui_gender=ui_gender,
             ui_age=ui_age,
+            deadline=deadline,
         )
+        notify("event_analyzer", "done", {"event": event})
+
+        # Autre formulation d'un besoin déjà servi : on s'arrête après l'analyse
+        if use_store:
+            memo = self.memoized_result(**request, event=event)
+            if memo is not None:
+                memo["prompt_tokens"] = prompt_tokens
+                notify("memoized", "done", memo)
+                return memo
 
         # 2) Propositions de tenues
-        stylist_output: StylistOutput = self._run_stylist(event)
+        notify("stylist", "started")
+        stylist_output: StylistOutput = await self._arun_stylist(event, deadline, description)
+        notify("stylist", "done", {"stylist_output": stylist_output})
 
         # 3) Recherche de produits Zalando
-        product_search_output: ProductSearchOutput = self._run_product_search(
+        notify("product_search", "started")
+        product_search_output: ProductSearchOutput = await self._arun_product_search(
             event,
             stylist_output,
+            deadline,
         )
+        notify("product_search", "done", {"product_search_output": product_search_output})
 
         # 4) Visualisation (mannequin) - optionnel si pas d'image user
-        if user_image_url:
-            final_outfits = self._run_visualizer(
+        if user_image_url or user_image_bytes:
+            notify("visualizer", "started")
+            final_outfits = await self._arun_visualizer(
                 event,
                 product_search_output,
                 user_image_url,
+                user_image_bytes,
+                deadline,
             )
+            notify("visualizer", "done", {"final_outfits": final_outfits})
         else:
             # si pas de photo utilisateur, on renvoie simplement les tenues avec produits
             final_outfits = product_search_output["outfits"]
 
-        return {
+        result = {
             "event": event,
             "stylist_output": stylist_output,
             "product_search_output": product_search_output,
             "final_outfits": final_outfits,
+            "prompt_tokens": prompt_tokens,
+            "degradations": deadline.degradations,
+            "memoized": None,
         }
+        self.remember(result, replaces=replaces, **request)
+        return result
+
+    # ---------------- Mémoïsation des résultats ----------------
+
+    def memoized_result(
+        self,
+        description: str,
+        ui_budget: Optional[float] = None,
+        ui_gender: str = "homme",
+        ui_age: Optional[int] = None,
+        user_image_url: Optional[str] = None,
+        user_image_bytes: Optional[bytes] = None,
+        event: Optional[EventUnderstanding] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Résultat déjà calculé pour cette demande ou une demande quasi identique
+        (par la description, ou par l'EventUnderstanding si `event` est fourni).
+        Une entrée ancienne est servie telle quelle et rafraîchie en tâche de fond.
+        """
+        store = self.result_store
+        if store is None:
+            return None
+        from multi_agents.core.result_store import photo_key
+
+        photo = photo_key(user_image_url, user_image_bytes)
+        if event is None:
+            hit = store.lookup(description, ui_budget, ui_gender, ui_age, photo)
+        else:
+            hit = store.lookup_event(event, ui_budget, ui_gender, ui_age, photo)
+        if hit is None:
+            return None
+
+        refreshing = hit["stale"] and store.claim_refresh(hit["key"])
+        if refreshing:
+            request = {
+                "description": description,
+                "ui_budget": ui_budget,
+                "ui_gender": ui_gender,
+                "ui_age": ui_age,
+                "user_image_url": user_image_url,
+                "user_image_bytes": user_image_bytes,
+            }
+            self._refresh_in_background(request, hit["key"])
+
+        print(f"[Orchestrator] Memoized result ({hit['match']}, {hit['age_s']:.0f} s old)")
+        result = hit["result"]
+        result["memoized"] = {"match": hit["match"], "age_s": round(hit["age_s"], 1), "refreshing": refreshing}
+        return result
+
+    def remember(
+        self,
+        result: Dict[str, Any],
+        description: str,
+        ui_budget: Optional[float] = None,
+        ui_gender: str = "homme",
+        ui_age: Optional[int] = None,
+        user_image_url: Optional[str] = None,
+        user_image_bytes: Optional[bytes] = None,
+        replaces: Optional[tuple] = None,
+    ) -> None:
+        """
+        Mémorise un résultat complet. Un résultat dégradé (échéance) ou vide n'est pas gardé.
+        """
+        if self.result_store is None or result.get("degradations") or not result.get("final_outfits"):
+            return
+        from multi_agents.core.result_store import photo_key
+
+        self.result_store.put(
+            description,
+            ui_budget,
+            ui_gender,
+            ui_age,
+            photo_key(user_image_url, user_image_bytes),
+            result,
+            replaces=replaces,
+        )
+
+    def _refresh_in_background(self, request: Dict[str, Any], key: tuple) -> None:
+        def refresh() -> None:
+            try:
+                run_sync(self._arun_stages(request, deadline_seconds=None, use_store=False, replaces=key))
+            except Exception as err:
+                print(f"[Orchestrator] Background refresh failed: {err}")
+            finally:
+                self.result_store.release_refresh(key)  # type: ignore[union-attr]
+
+        threading.Thread(target=refresh, name="pipeline-refresh", daemon=True).start()
 
     # ---------------- Sous-étapes privées ----------------
+    # Les versions _run_* (synchrones) servent à l'UI qui affiche la progression
+    # étape par étape ; elles enveloppent les versions _arun_*.
 
-    def _run_event_analyzer(
+    async def _arun_event_analyzer(
         self,
         description: str,
         ui_budget: Optional[float],
         ui_gender: str,
         ui_age: Optional[int],
+        deadline: Optional[Deadline] = None,
     ) -> EventUnderstanding:
         data = {
             "raw_text": description,
             "ui_budget": ui_budget,
             "ui_gender": ui_gender,
             "ui_age": ui_age,
+            "deadline": deadline,
         }
-        result = self.event_analyzer.run(data)
+        result = await self.event_analyzer.arun(data)
         # EventAnalyzerAgent renvoie déjà un EventUnderstanding
         return result  # type: ignore
 
-    def _run_stylist(self, event: EventUnderstanding) -> StylistOutput:
-        result = self.stylist.run({"event": event})
+    async def _arun_stylist(
+        self,
+        event: EventUnderstanding,
+        deadline: Optional[Deadline] = None,
+        description: Optional[str] = None,
+    ) -> StylistOutput:
+        result = await self.stylist.arun({"event": event, "description": description, "deadline": deadline})
         # StylistAgent.run renvoie {"outfits": [...]}
         return result  # type: ignore
 
-    def _run_product_search(
+    async def _arun_product_search(
         self,
         event: EventUnderstanding,
         stylist_output: StylistOutput,
+        deadline: Optional[Deadline] = None,
     ) -> ProductSearchOutput:
-        result = self.product_search.run(
-            {"event": event, "stylist_output": stylist_output}
+        result = await self.product_search.arun(
+            {"event": event, "stylist_output": stylist_output, "deadline": deadline}
         )
         # ProductSearchAgent.run renvoie {"product_search_output": {...}}
-        return result["product_search_output"]  # type: ignore
+        product_search_output = result["product_search_output"]
+        # Miniatures des produits choisis téléchargées en tâche de fond pour l'UI
+        self.prefetcher.prefetch(
+            item["chosen_product"].get("image")
+            for outfit in product_search_output["outfits"]
+            for item in outfit["items"]
+        )
+        return product_search_output  # type: ignore
 
-    def _run_visualizer(
+    async def _arun_visualizer(
         self,
         event: EventUnderstanding,
         product_search_output: ProductSearchOutput,
-        user_image_url: str,
+        user_image_url: Optional[str],
+        user_image_bytes: Optional[bytes] = None,
+        deadline: Optional[Deadline] = None,
     ) -> list[ResolvedOutfit]:
-        result = self.visualizer.run(
+        result = await self.visualizer.arun(
             {
                 "event": event,
                 "product_search_output": product_search_output,
                 "user_image_url": user_image_url,
+                "user_image_bytes": user_image_bytes,
+                "deadline": deadline,
             }
         )
         # OutfitVisualizerAgent.run renvoie {"outfits": [...]}
+        self.prefetcher.prefetch(outfit.get("preview_image_url") for outfit in result["outfits"])
         return result["outfits"]  # type: ignore
+
+    def _run_event_analyzer(
+        self,
+        description: str,
+        ui_budget: Optional[float],
+        ui_gender: str,
+        ui_age: Optional[int],
+        deadline: Optional[Deadline] = None,
+    ) -> EventUnderstanding:
+        return run_sync(self._arun_event_analyzer(description, ui_budget, ui_gender, ui_age, deadline))
+
+    def _run_stylist(
+        self,
+        event: EventUnderstanding,
+        deadline: Optional[Deadline] = None,
+        description: Optional[str] = None,
+    ) -> StylistOutput:
+        return run_sync(self._arun_stylist(event, deadline, description))
+
+    def _run_product_search(
+        self,
+        event: EventUnderstanding,
+        stylist_output: StylistOutput,
+        deadline: Optional[Deadline] = None,
+    ) -> ProductSearchOutput:
+        return run_sync(self._arun_product_search(event, stylist_output, deadline))
+
+    def _run_visualizer(
+        self,
+        event: EventUnderstanding,
+        product_search_output: ProductSearchOutput,
+        user_image_url: Optional[str],
+        user_image_bytes: Optional[bytes] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> list[ResolvedOutfit]:
+        return run_sync(
+            self._arun_visualizer(event, product_search_output, user_image_url, user_image_bytes, deadline)
+        )
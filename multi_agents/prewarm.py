@@ -0,0 +1,40 @@
+import argparse
+import json
+
+from multi_agents.core.config import BASE_DIR
+from multi_agents.core.cache_backend import shared_cache
+from multi_agents.core.catalog_store import CatalogStore
+from multi_agents.core.llm_cache import LLMResponseCache
+from multi_agents.core.prewarm import PrewarmJob
+from multi_agents.orchestrator import Orchestrator
+
+
+def main() -> None:
+    """
+    Préchauffage hors pointe (à planifier, ex: cron à 3h) :
+        python -m multi_agents.prewarm --budget 30
+    """
+    parser = argparse.ArgumentParser(description="Préchauffage des caches à partir des sessions enregistrées")
+    parser.add_argument("--logs", default=str(BASE_DIR / "logs"), help="dossier des session_*.json")
+    parser.add_argument("--budget", type=int, default=20, help="nombre max d'articles scrappés via Apify")
+    parser.add_argument("--per-event-type", type=int, default=10, help="articles par type d'événement")
+    parser.add_argument("--season", default=None, help="hiver / printemps / été / automne (défaut : saison courante)")
+    parser.add_argument("--any-hour", action="store_true", help="ignorer la fenêtre hors pointe (1h-7h)")
+    parser.add_argument("--no-stylist", action="store_true", help="ne pas rejouer les événements sur le styliste")
+    args = parser.parse_args()
+
+    orchestrator = Orchestrator(catalog=CatalogStore(), llm_cache=LLMResponseCache(), cache=shared_cache())
+    job = PrewarmJob(
+        orchestrator,
+        log_dir=args.logs,
+        apify_budget=args.budget,
+        per_event_type=args.per_event_type,
+        season=args.season,
+        off_peak_hours=None if args.any_hour else (1, 7),
+        warm_stylist=not args.no_stylist,
+    )
+    print(json.dumps(job.run(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
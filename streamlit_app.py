@@ -1,17 +1,16 @@
 import os
 import sys
+import base64
+import threading
+import importlib.util
 from typing import Optional
-from pathlib import Path
 
 import streamlit as st
-from dotenv import load_dotenv
 
 # ====== Whisper (optionnel, si tu as un venv compatible) ====== #
-try:
-    import whisper
-    WHISPER_AVAILABLE = True
-except ImportError:
-    WHISPER_AVAILABLE = False
+# On vérifie seulement la présence du paquet : l'import (torch inclus) coûte
+# plusieurs secondes et n'a lieu qu'au premier chargement du modèle.
+WHISPER_AVAILABLE = importlib.util.find_spec("whisper") is not None
 
 # ====== Micro recorder (pour le bouton d'enregistrement) ====== #
 try:
@@ -24,51 +23,186 @@ except ImportError:
 CURRENT_DIR = os.path.dirname(__file__)
 sys.path.append(CURRENT_DIR)
 
+from multi_agents.core.config import load_env  # type: ignore
 from multi_agents.orchestrator import Orchestrator  # type: ignore
+from multi_agents.core.job_queue import PipelineJobStore  # type: ignore
+from multi_agents.core.pipeline_worker import ensure_workers, start_in_process_worker  # type: ignore
+from multi_agents.core.result_store import PipelineResultStore  # type: ignore
+from multi_agents.core.catalog_store import CatalogStore  # type: ignore
+from multi_agents.core.llm_cache import LLMResponseCache  # type: ignore
+from multi_agents.core.cache_backend import shared_cache  # type: ignore
+from multi_agents.core.transcriber import Transcriber, MODEL_SIZES  # type: ignore
+from multi_agents.core.transcription_worker import TranscriptionService, connect_or_spawn  # type: ignore
+
+load_env()
+
+# Temps max d'une demande : au-delà, le pipeline se dégrade (moins de tenues,
+# recherche en cache, pas d'aperçu) plutôt que de faire attendre l'utilisateur
+PIPELINE_DEADLINE_SECONDS = 120.0
+
+
+@st.cache_resource
+def get_orchestrator() -> Orchestrator:
+    """
+    Un seul orchestrateur par process : clients et agents restent chauds entre deux runs,
+    et les demandes répétées (ou quasi identiques) sont servies depuis le result_store.
+    Les produits scrappés s'accumulent dans le catalogue local (data/catalog.sqlite3) ;
+    les réponses LLM, scrapes et aperçus sont partagés (data/cache.sqlite3) avec les
+    workers et le job de préchauffage (python -m multi_agents.prewarm).
+    """
+    return Orchestrator(
+        result_store=PipelineResultStore(),
+        catalog=CatalogStore(),
+        llm_cache=LLMResponseCache(),
+        cache=shared_cache(),
+    )
+
+
+# ========= File de demandes (workers du pipeline) ========= #
+
+@st.cache_resource
+def get_job_store() -> PipelineJobStore:
+    return PipelineJobStore()
+
+
+@st.cache_resource
+def get_in_process_worker() -> threading.Event:
+    """
+    Repli : un seul worker dans un thread de ce process (démarré au premier échec).
+    """
+    return start_in_process_worker(get_job_store(), get_orchestrator())
+
+
+def get_pipeline_workers() -> str:
+    """
+    Pool de workers partagé par toutes les sessions (process détachés, orchestrateurs
+    chauds). Vérifié à chaque soumission (battements récents) et relancé s'il est mort ;
+    s'il ne peut pas démarrer, un worker tourne dans un thread de ce process.
+    """
+    try:
+        alive = ensure_workers(get_job_store())
+        return f"{alive} worker(s)"
+    except Exception as e:
+        print(f"[streamlit_app] Pipeline workers unavailable, using in-process worker: {e}")
+        get_in_process_worker()
+        return "in-process"
+
 
-load_dotenv()
+# Message affiché pendant chaque étape
+STAGE_MESSAGES = {
+    "event_analyzer": "🧠 Analyse de l'événement (type, moment, style, budget...)",
+    "stylist": "🎨 Le Styliste IA imagine plusieurs tenues adaptées.",
+    "product_search": "🛒 Recherche des vêtements correspondants (costume, chemise, chaussures, etc.)...",
+    "visualizer": "🧍 Génération de l'aperçu visuel avec la tenue sur ton mannequin.",
+}
+
+
+@st.fragment(run_every=1.0)
+def suivre_pipeline() -> None:
+    """
+    Interroge la file sans bloquer la session : avancement réel (événements d'étape
+    publiés par le worker) et sorties partielles ; relance l'app quand le résultat est prêt.
+    """
+    job_id = st.session_state.get("pipeline_job")
+    if not job_id:
+        return
+
+    info = get_job_store().get(job_id)
+    if info["status"] == "done":
+        st.session_state["pipeline_result"] = info["result"]
+        del st.session_state["pipeline_job"]
+        st.rerun()
+    elif info["status"] in ("error", "unknown"):
+        del st.session_state["pipeline_job"]
+        st.error(f"Erreur lors de l'exécution du pipeline : {info.get('error') or 'demande introuvable'}")
+    elif info["status"] == "queued":
+        st.progress(0, text=f"En attente d'un worker – position {info.get('position')} dans la file")
+    else:
+        stage = info.get("stage")
+        st.progress(info["progress"], text=STAGE_MESSAGES.get(stage, "Initialisation du pipeline..."))
+        event = info["partial"].get("event")
+        if event:
+            st.caption(
+                f"Événement compris : {event.get('event_type')} – {event.get('time_of_day')} – "
+                f"{event.get('formality_level')}"
+            )
+        stylist_output = info["partial"].get("stylist_output")
+        if stylist_output:
+            st.caption(
+                "Tenues imaginées : "
+                + ", ".join(o.get("style_name", "?") for o in stylist_output.get("outfits", []))
+            )
 
 
 # ========= Whisper utils (audio -> texte) ========= #
 
 @st.cache_resource
-def load_whisper_model():
-    """Charge le modèle Whisper 'small' une seule fois."""
-    if not WHISPER_AVAILABLE:
-        return None
-    # Charge le modèle en RAM une seule fois
-    return whisper.load_model("small")
+def get_transcriber() -> Transcriber:
+    """
+    Un seul Transcriber par process : modèles Whisper chargés une fois par taille
+    et transcriptions mises en cache par empreinte audio dans le cache partagé (les
+    re-runs Streamlit et les autres process ne relancent pas Whisper sur le même enregistrement).
+    """
+    return Transcriber(cache=shared_cache())
 
 
-def transcrire_audio_bytes(audio_bytes: bytes, filename: str = "audio.wav") -> str:
+@st.cache_resource
+def get_transcription_service():
     """
-    Sauvegarde les bytes dans un fichier temporaire et lance Whisper dessus.
-    Optimisé pour CPU avec FP32 explicite.
+    Worker de transcription partagé (process local, un seul modèle Whisper pour
+    toutes les sessions). Si le worker ne peut pas démarrer, on retombe sur une
+    file dans ce process.
     """
-    model = load_whisper_model()
-    if model is None:
-        raise RuntimeError("Whisper n'est pas disponible dans cet environnement.")
-
-    tmp_dir = Path("tmp_audio")
-    tmp_dir.mkdir(exist_ok=True)
-    tmp_path = tmp_dir / filename
-
-    with open(tmp_path, "wb") as f:
-        f.write(audio_bytes)
-
-    # Options optimisées pour CPU
-    result = model.transcribe(
-        str(tmp_path),
-        language="fr",
-        fp16=False,  # Force FP32 pour éviter le warning
-        verbose=False,  # Désactive les logs détaillés
-    )
-    
-    return result["text"].strip()
+    try:
+        return connect_or_spawn()
+    except Exception as e:
+        print(f"[streamlit_app] Transcription worker unavailable, using in-process queue: {e}")
+        return TranscriptionService(get_transcriber())
+
+
+@st.fragment(run_every=1.0)
+def suivre_transcription() -> None:
+    """
+    Interroge le worker sans bloquer la session ; relance l'app quand le texte est prêt.
+    """
+    job_id = st.session_state.get("transcription_job")
+    if not job_id:
+        return
+
+    service = get_transcription_service()
+    info = service.result(job_id)
+    if info["status"] == "done":
+        st.session_state["transcribed_description"] = info["text"]
+        del st.session_state["transcription_job"]
+        st.rerun()
+    elif info["status"] in ("error", "unknown"):
+        del st.session_state["transcription_job"]
+        st.error(f"Erreur lors de la transcription audio : {info.get('error') or 'job introuvable'}")
+    else:
+        position = info.get("position")
+        waiting = f" – position {position} dans la file" if position else ""
+        st.info(
+            f"🎧 Transcription en cours avec Whisper ({info.get('model_size')}){waiting}. "
+            f"Demandes en attente : {service.queue_depth()}"
+        )
+        if info.get("partial_text"):
+            st.caption(f"Déjà reconnu : {info['partial_text']}")
 
 
 # ========= Helpers ========= #
 
+def image_depuis_cache(url: Optional[str], timeout: float = 0.5) -> Optional[str]:
+    """
+    Miniature servie depuis le cache disque (data URI) ; sinon l'URL d'origine.
+    """
+    if not url:
+        return None
+    thumb = get_orchestrator().prefetcher.thumbnail_bytes(url, timeout=timeout)
+    if thumb is None:
+        return url
+    return "data:image/jpeg;base64," + base64.b64encode(thumb).decode("ascii")
+
+
 def to_float(x: str) -> Optional[float]:
     x = x.strip()
     if not x:
@@ -189,15 +323,25 @@ if mode == "Texte":
 
 else:
     st.markdown("### 🎙️ Enregistrement vocal")
-    
+
+    whisper_size = st.selectbox(
+        "Modèle Whisper",
+        options=list(MODEL_SIZES),
+        index=list(MODEL_SIZES).index("base"),
+        help="tiny : le plus rapide, small : le plus précis.",
+    )
+
     # Info sur les performances Whisper
     with st.expander("ℹ️ À propos de la transcription"):
         st.info(
-            "**Transcription locale avec Whisper (modèle 'small')**\n\n"
-            "⏱️ La première utilisation peut prendre 2-3 minutes (téléchargement du modèle).\n\n"
-            "⏱️ Les transcriptions suivantes sont plus rapides (~30-60 secondes pour 1 min d'audio).\n\n"
+            f"**Transcription locale avec Whisper (modèle '{whisper_size}')**\n\n"
+            "⏱️ La première utilisation d'un modèle le télécharge puis le garde en mémoire.\n\n"
+            "⏱️ Un même enregistrement n'est transcrit qu'une fois (cache par contenu).\n\n"
             "💡 Garde tes enregistrements courts (15-30 sec) pour de meilleures performances."
         )
+        last_latency = get_transcriber().last_latency(whisper_size)
+        if last_latency is not None:
+            st.caption(f"Dernière transcription avec '{whisper_size}' : {last_latency:.1f} s")
 
     if MIC_AVAILABLE:
         recorded_audio = mic_recorder(
@@ -241,6 +385,12 @@ user_image_url = st.text_input(
     value="",
     help="Colle une URL d'image publique (par ex. lien direct GitHub raw ou autre hébergeur).",
 )
+user_photo = st.file_uploader(
+    "Ou importer ta photo (optionnel)",
+    type=["jpg", "jpeg", "png", "webp"],
+    help="La photo est réduite et ses métadonnées (GPS...) sont retirées avant l'envoi.",
+)
+user_image_bytes: Optional[bytes] = user_photo.getvalue() if user_photo is not None else None
 
 run_button = st.button("🚀 Générer les tenues")
 
@@ -250,6 +400,8 @@ user_image_url = user_image_url.strip() or None
 
 # ========= Pipeline complet ========= #
 
+final_description: Optional[str] = None
+
 if run_button:
     # 1) Obtenir la description finale
 
@@ -270,68 +422,55 @@ if run_button:
             st.error("Aucun audio fourni (ni enregistrement, ni fichier uploadé).")
             st.stop()
 
-        with st.spinner("🎧 Transcription en cours avec Whisper (cela peut prendre 30-60 secondes)..."):
-            try:
-                final_description = transcrire_audio_bytes(audio_bytes, "user_audio.wav")
-            except Exception as e:
-                st.error(f"Erreur lors de la transcription audio : {e}")
-                st.stop()
+        # La transcription part dans le worker ; le pipeline reprend quand le texte arrive
+        st.session_state["transcription_job"] = get_transcription_service().submit(audio_bytes, whisper_size)
+        st.session_state.pop("transcribed_description", None)
+
+if st.session_state.get("transcription_job"):
+    suivre_transcription()
+
+transcribed = st.session_state.pop("transcribed_description", None)
+if transcribed is not None:
+    final_description = transcribed
+    st.success("Transcription réussie ✅")
+    st.info(f"Texte reconnu :\n\n> {final_description}")
+
+if final_description:
+    # 2) La demande part dans la file : un worker (orchestrateur chaud) l'exécute,
+    #    la session reste libre et suit l'avancement sans bloquer de thread Streamlit
+    get_pipeline_workers()
+    st.session_state["pipeline_job"] = get_job_store().submit(
+        {
+            "description": final_description,
+            "ui_budget": budget,
+            "ui_gender": gender,
+            "ui_age": age,
+            "user_image_url": user_image_url,
+            "user_image_bytes": user_image_bytes,
+            "deadline_seconds": PIPELINE_DEADLINE_SECONDS,
+        }
+    )
+    st.session_state.pop("pipeline_result", None)
 
-        st.success("Transcription réussie ✅")
-        st.info(f"Texte reconnu :\n\n> {final_description}")
+if st.session_state.get("pipeline_job"):
+    suivre_pipeline()
 
-    # 2) Exécuter le workflow par étapes
+pipeline_result = st.session_state.get("pipeline_result")
 
-    orchestrator = Orchestrator()
-    progress = st.progress(0, text="Initialisation du pipeline...")
-    status = st.empty()
+if pipeline_result is not None:
+    event = pipeline_result["event"]
+    final_outfits = pipeline_result["final_outfits"]
 
-    try:
-        # Event Analyzer
-        progress.progress(15, text="Analyse de ta demande (EventAnalyzer)...")
-        status.info("🧠 Analyse de l'événement (type, moment, style, budget...)")
-        event = orchestrator._run_event_analyzer(
-            description=final_description,
-            ui_budget=budget,
-            ui_gender=gender,
-            ui_age=age,
-        )
-
-        # Stylist
-        progress.progress(40, text="Génération des idées de tenues (Stylist)...")
-        status.info("🎨 Le Styliste IA imagine plusieurs tenues adaptées.")
-        stylist_output = orchestrator._run_stylist(event)
-
-        # Product search
-        progress.progress(70, text="Recherche des articles sur Zalando...")
-        status.info("🛒 Recherche des vêtements correspondants (costume, chemise, chaussures, etc.)...")
-        product_search_output = orchestrator._run_product_search(
-            event=event,
-            stylist_output=stylist_output,
+    if pipeline_result.get("memoized"):
+        st.success("♻️ Demande proche déjà traitée récemment : tenues réutilisées.")
+    else:
+        st.success("✨ Tenues générées avec succès !")
+    if pipeline_result.get("degradations"):
+        st.caption(
+            "⏱️ Résultat allégé pour répondre à temps : "
+            + ", ".join(d["action"] for d in pipeline_result["degradations"])
         )
 
-        # Visualizer
-        if user_image_url:
-            progress.progress(90, text="Génération de l'aperçu visuel (mannequin IA)...")
-            status.info("🧍 Génération de l'aperçu visuel avec la tenue sur ton mannequin.")
-            final_outfits = orchestrator._run_visualizer(
-                event=event,
-                product_search_output=product_search_output,
-                user_image_url=user_image_url,
-            )
-        else:
-            progress.progress(90, text="Finalisation des tenues (sans aperçu visuel)...")
-            status.info("✅ Tenues générées (aucune photo utilisateur fournie).")
-            final_outfits = product_search_output.get("outfits", [])
-
-        progress.progress(100, text="Terminé ✅")
-        status.success("✨ Tenues générées avec succès !")
-
-    except Exception as e:
-        progress.empty()
-        status.error(f"Erreur lors de l'exécution du pipeline : {e}")
-        st.stop()
-
     # 3) Affichage final
 
     st.markdown("---")
@@ -383,7 +522,9 @@ if run_button:
             with col_img:
                 preview = outfit.get("preview_image_url")
                 if preview:
-                    st.image(preview, caption="Aperçu IA", use_container_width=True)
+                    # Aperçu téléchargé en tâche de fond dès sa génération
+                    preview_thumb = get_orchestrator().prefetcher.thumbnail_bytes(preview, timeout=2.0)
+                    st.image(preview_thumb or preview, caption="Aperçu IA", use_container_width=True)
                 else:
                     st.info("Aucun aperçu visuel généré pour cette tenue.")
 
@@ -411,7 +552,7 @@ if run_button:
                     html = "<div class='items-scroll'>"
                     for item in items:
                         prod = item.get("chosen_product", {})
-                        img = prod.get("image")
+                        img = image_depuis_cache(prod.get("image"))
                         name = prod.get("name", "Produit")
                         brand = prod.get("brand", "N/A")
                         color = prod.get("color", "N/A")
@@ -0,0 +1,157 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.core.cache_backend import MemoryCacheBackend, SQLiteCacheBackend
+from multi_agents.core.cached_product_provider import CachedScrapeProvider
+
+
+def query(search_text: str, max_price: float = 100.0) -> dict:
+    return {
+        "outfit_index": 0,
+        "role": "veste",
+        "max_price": max_price,
+        "attributes": {"search_text": search_text, "gender": "homme"},
+    }
+
+
+def test_concurrent_callers_compute_once_across_connections(tmp_path):
+    # Deux connexions sur le même fichier = deux process (UI + worker)
+    path = str(tmp_path / "cache.sqlite3")
+    backends = [SQLiteCacheBackend(path), SQLiteCacheBackend(path)]
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"texte": "bonjour"}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda b=b: results.append(b.get_or_compute("transcript", "audio", compute)))
+        for b in backends * 2
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"texte": "bonjour"}] * 4
+    # Un seul taux de succès, quel que soit le process qui a servi (une fois les lots écrits)
+    for backend in backends:
+        backend.flush()
+    assert backends[0].stats("transcript") == backends[1].stats("transcript")
+    assert backends[0].stats("transcript")["misses"] >= 1
+
+
+def test_failed_compute_releases_the_key(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"))
+
+    def broken():
+        raise RuntimeError("Whisper indisponible")
+
+    try:
+        backend.get_or_compute("transcript", "audio", broken)
+    except RuntimeError:
+        pass
+    assert backend.get_or_compute("transcript", "audio", lambda: "texte") == "texte"
+
+
+def test_expired_lease_is_taken_over(tmp_path):
+    # Le détenteur a disparu sans libérer la clé : son bail expire
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"))
+    assert backend.acquire("preview", "k", lease_seconds=0.1) is not None
+    assert backend.acquire("preview", "k", lease_seconds=0.1) is None
+    time.sleep(0.15)
+    assert backend.get_or_compute("preview", "k", lambda: "url") == "url"
+
+
+def test_size_eviction_drops_least_recently_read(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite3"), max_bytes=2500)
+    backend.set("scrape", "a", b"x" * 1000)
+    backend.set("scrape", "b", b"x" * 1000)
+    backend.get("scrape", "a")
+    backend.set("llm", "c", b"x" * 1000)
+
+    assert backend.peek("scrape", "a") is not None
+    assert backend.peek("scrape", "b") is None
+    assert backend.stats()["bytes"] <= 2500
+
+
+def test_memory_backend_bounds_entries_and_dedupes_async():
+    backend = MemoryCacheBackend(max_entries=2)
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return ("https://img/preview.png", "prompt")
+
+    async def scenario():
+        return await asyncio.gather(*[backend.aget_or_compute("preview", "k", generate) for _ in range(3)])
+
+    assert asyncio.run(scenario()) == [("https://img/preview.png", "prompt")] * 3
+    assert len(calls) == 1
+
+    backend.set("preview", "a", 1)
+    backend.set("preview", "b", 2)
+    assert backend.peek("preview", "k") is None
+    assert backend.stats()["entries"] == 2
+
+
+def test_scrape_cache_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = CachedScrapeProvider(backend=SQLiteCacheBackend(path))
+    reader = CachedScrapeProvider(backend=SQLiteCacheBackend(path))
+    writer.record(query("veste en lin"), [{"name": "Veste lin", "price": 80.0, "url": "https://z/1"}])
+
+    assert [c["url"] for c in reader.lookup(query("veste en lin"))] == ["https://z/1"]
+    assert reader.lookup(query("veste en lin", max_price=150.0)) == []
+
+
+def test_long_compute_keeps_its_lease(tmp_path):
+    # Calcul plus long que le bail : renouvelé, le second appelant attend au lieu de recalculer
+    path = str(tmp_path / "cache.sqlite3")
+    backends = [SQLiteCacheBackend(path), SQLiteCacheBackend(path)]
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.5)
+        return "texte"
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda b=b: results.append(b.get_or_compute("transcript", "audio", compute, lease_seconds=0.15))
+        )
+        for b in backends
+    ]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.05)
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ["texte", "texte"]
+
+
+def test_values_are_stored_as_json_not_pickle(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    backend = SQLiteCacheBackend(path)
+    backend.set("llm", "k", {"event_type": "mariage"})
+    backend.set("preview", "p", b"\x89PNG")
+
+    value, encoding = backend._conn.execute(
+        "SELECT value, encoding FROM cache_entries WHERE namespace = 'llm'"
+    ).fetchone()
+    assert encoding == "json" and b"mariage" in value
+    assert SQLiteCacheBackend(path).get("preview", "p") == b"\x89PNG"
@@ -0,0 +1,135 @@
+import os
+import sys
+import json
+import time
+import asyncio
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+import httpx
+
+from multi_agents.core import zalando_scraper
+from multi_agents.core.apify_product_provider import ApifyProductProvider
+from multi_agents.core.catalog_store import CatalogStore
+from multi_agents.core.federated_product_provider import FederatedProductProvider
+from multi_agents.core.product_provider import ProductProvider, item_query
+from multi_agents.core.zalando_scraper import ZalandoScraper
+
+
+def product(name, price, url=None, brand=None, color=None):
+    return {"name": name, "price": price, "url": url or f"https://shop/{name}", "brand": brand, "color": color}
+
+
+QUERY = item_query("costume bleu marine", "homme", 200.0, category="costume")
+
+
+class CountingProvider(ProductProvider):
+    name = "apify"
+
+    def __init__(self, candidates):
+        self.candidates = candidates
+        self.calls = 0
+
+    def search_products(self, query):
+        raise NotImplementedError
+
+    async def asearch_candidates(self, query):
+        self.calls += 1
+        return [dict(c) for c in self.candidates]
+
+
+def test_full_text_search_on_name_brand_color_with_filters():
+    catalog = CatalogStore(":memory:")
+    catalog.record(QUERY, [
+        product("Costume slim", 150.0, brand="Selected", color="navy"),
+        product("Costume droit", 250.0, color="bleu marine"),
+    ])
+    catalog.record(item_query("chemise blanche", "homme", 50.0), [product("Chemise blanche", 30.0)])
+
+    # "bleu" / "marine" trouvent la couleur anglaise ; le prix et le genre sont filtrés en SQL
+    other = item_query("costume marine", "homme", 200.0)
+    assert [c["name"] for c in catalog.lookup(other)] == ["Costume slim"]
+    assert catalog.lookup(item_query("costume marine", "femme", 200.0)) == []
+    assert [c["brand"] for c in catalog.lookup(item_query("selected", "homme", 500.0))] == ["Selected"]
+    assert catalog.stats()["products"] == 3
+
+
+def test_repeat_query_matches_through_recorded_search_text():
+    catalog = CatalogStore(":memory:")
+    catalog.record(QUERY, [product("SLIM FIT - Anzug", 120.0, color="dark blue")])
+
+    assert [c["name"] for c in catalog.lookup(QUERY)] == ["SLIM FIT - Anzug"]
+
+
+def test_stale_products_are_not_served_and_rescrape_refreshes_them():
+    catalog = CatalogStore(":memory:", max_age_seconds=60.0)
+    catalog.record(QUERY, [product("Costume bleu", 150.0)])
+    catalog._conn.execute("UPDATE products SET scraped_at = ?", (time.time() - 120.0,))
+
+    assert catalog.lookup(QUERY) == []
+    assert catalog.stats()["stale"] == 1
+
+    catalog.record(QUERY, [product("Costume bleu", 140.0)])
+    assert [c["price"] for c in catalog.lookup(QUERY)] == [140.0]
+    assert catalog.stats()["products"] == 1
+
+
+def test_federation_answers_from_catalog_without_live_scrape():
+    catalog = CatalogStore(":memory:")
+    live = CountingProvider([product(f"Costume bleu {i}", 100.0 + i) for i in range(3)])
+    federated = FederatedProductProvider([live], catalog=catalog, min_results=3)
+
+    first = asyncio.run(federated.asearch_candidates(QUERY))
+    second = asyncio.run(federated.asearch_candidates(QUERY))
+
+    assert live.calls == 1
+    assert [c["url"] for c in second] == [c["url"] for c in first]
+    assert federated.stats()["catalog_answers"] == 1
+
+
+def test_scraper_records_every_normalized_item(monkeypatch):
+    monkeypatch.setenv("APIFY_API_TOKEN", "test")
+    dataset = [{"name": f"costume {i}", "price": str(50 + i), "url": f"u{i}"} for i in range(6)]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        offset = int(request.url.params["offset"])
+        return httpx.Response(200, content=json.dumps(dataset[offset:offset + 100]).encode("utf-8"))
+
+    catalog = CatalogStore(":memory:")
+    scraper = ZalandoScraper(
+        http_client=httpx.Client(transport=httpx.MockTransport(handler)), max_results=2, catalog=catalog
+    )
+
+    collected = []
+    results = scraper._fetch_dataset("ds", max_price=200.0, collected=collected)
+    scraper._record("costume", "homme", 200.0, collected)
+
+    assert len(results) == 2
+    assert catalog.stats()["products"] == 6
+
+
+def test_federation_stores_the_whole_apify_run_not_only_top_k(monkeypatch):
+    monkeypatch.setenv("APIFY_API_TOKEN", "test")
+    dataset = [{"name": f"costume bleu {i}", "price": str(50 + i), "url": f"u{i}"} for i in range(6)]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.method == "POST":
+            return httpx.Response(201, json={"data": {"id": "run"}})
+        if "/actor-runs/" in request.url.path:
+            return httpx.Response(200, json={"data": {"status": "SUCCEEDED", "defaultDatasetId": "ds"}})
+        offset = int(request.url.params["offset"])
+        return httpx.Response(200, content=json.dumps(dataset[offset:offset + 100]).encode("utf-8"))
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(zalando_scraper, "get_async_http_client", lambda: client)
+    # Comme dans l'orchestrateur : pas de catalogue sur le scraper, la fédération est le seul écrivain
+    scraper = ZalandoScraper(http_client=httpx.Client(transport=httpx.MockTransport(handler)), max_results=2)
+    catalog = CatalogStore(":memory:")
+    federated = FederatedProductProvider([ApifyProductProvider(scraper)], catalog=catalog, min_results=1)
+
+    results = asyncio.run(federated.asearch_candidates(QUERY))
+
+    assert len(results) == 2
+    assert catalog.stats()["products"] == 6
@@ -0,0 +1,155 @@
+import os
+import sys
+import json
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.core.deadline import Deadline
+from multi_agents.core.product_provider import ProductProvider
+from multi_agents.orchestrator import Orchestrator
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def outfit(name: str) -> dict:
+    return {
+        "style_name": name,
+        "description": "test",
+        "formality_level": "chic",
+        "total_budget": 90.0,
+        "items": [
+            {"name": "costume bleu marine", "category": "costume", "max_price": 60.0},
+            {"name": "chemise blanche", "category": "chemise", "max_price": 30.0},
+        ],
+    }
+
+
+class FakeLLMClient:
+    def chat(self, system_prompt: str, user_prompt: str) -> str:
+        if "analyse d'événement" in system_prompt:
+            return json.dumps({
+                "event_type": "mariage",
+                "time_of_day": "soirée",
+                "formality_level": "chic",
+                "style": "minimaliste",
+                "budget": 150.0,
+                "gender": "homme",
+            })
+        if "styliste virtuel" in system_prompt:
+            return json.dumps({"outfits": [outfit("A"), outfit("B"), outfit("C")]})
+        if "image-to-image" in system_prompt:
+            return json.dumps({"prompt": "mannequin"})
+        return json.dumps({"chosen_index": 0})
+
+
+class RemoteScraper:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def asearch(self, search_text, gender_path, max_price, cancel_event=None):
+        self.calls += 1
+        return [{"name": f"{search_text} Zalando", "price": 20.0, "url": f"z/{search_text}"}]
+
+
+class LocalCatalog(ProductProvider):
+    name = "local"
+    local = True
+
+    def search_products(self, query):
+        return []
+
+    async def asearch_candidates(self, query):
+        return [
+            {"name": f"{query['role']} {i}", "price": 10.0 + i, "url": f"l/{query['role']}/{i}", "image": f"img/{i}"}
+            for i in range(3)
+        ]
+
+
+class FakeImageClient:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def agenerate_outfit_image(self, user_image_url, product_image_urls, prompt):
+        self.calls += 1
+        return "preview"
+
+
+def make_orchestrator(monkeypatch):
+    monkeypatch.setenv("MODELSLAB_API_KEY", "test")
+    scraper, images = RemoteScraper(), FakeImageClient()
+    orch = Orchestrator(
+        llm_client=FakeLLMClient(),
+        scraper=scraper,
+        image_client=images,
+        providers=[LocalCatalog()],
+    )
+    return orch, scraper, images
+
+
+def test_deadline_remaining_cap_and_degradations():
+    clock = FakeClock()
+    deadline = Deadline(60.0, clock=clock)
+
+    assert deadline.allows("live_search")
+    assert not deadline.allows("all_outfits")
+    clock.now = 50.0
+    assert deadline.cap(30.0) == 10.0
+    assert deadline.cap(30.0, reserve=15.0) == 0.0
+    assert not deadline.allows("llm_selector")
+
+    deadline.degrade("product_search", "local_selector")
+    deadline.degrade("product_search", "local_selector")
+    assert deadline.degradations == [
+        {"stage": "product_search", "action": "local_selector", "detail": None, "remaining_s": 10.0, "count": 2}
+    ]
+
+    unbounded = Deadline()
+    assert unbounded.allows("all_outfits") and unbounded.cap() is None
+
+
+def test_pipeline_without_deadline_does_full_work(monkeypatch):
+    orch, scraper, images = make_orchestrator(monkeypatch)
+
+    result = orch.run_pipeline("Mariage le soir", ui_budget=150.0, user_image_url="photo.jpg")
+
+    assert result["degradations"] == []
+    assert len(result["final_outfits"]) == 1  # tenues identiques fusionnées
+    assert images.calls == 1
+
+
+def test_short_deadline_degrades_instead_of_waiting(monkeypatch):
+    orch, scraper, images = make_orchestrator(monkeypatch)
+
+    result = orch.run_pipeline(
+        "Mariage le soir", ui_budget=150.0, user_image_url="photo.jpg", deadline_seconds=10.0
+    )
+
+    actions = {d["action"] for d in result["degradations"]}
+    assert {"fewer_outfits", "cached_only_search", "skip_previews"} <= actions
+    assert scraper.calls == 0
+    assert images.calls == 0
+    assert result["final_outfits"] and "preview_image_url" not in result["final_outfits"][0]
+
+
+def test_short_deadline_skips_llm_fill_in_of_event_analysis(monkeypatch):
+    orch, _, _ = make_orchestrator(monkeypatch)
+    clock = FakeClock()
+
+    # "Mariage le soir" : style incertain, le LLM compléterait l'analyse
+    deadline = Deadline(10.0, clock=clock)
+    event = orch._run_event_analyzer("Mariage le soir", 150.0, "homme", None, deadline)
+
+    assert orch.event_analyzer.stats()["llm_calls"] == 0
+    assert event["event_type"] == "mariage" and event["budget"] == 150.0
+    assert [d["action"] for d in deadline.degradations] == ["local_extraction"]
+
+    orch._run_event_analyzer("Mariage le soir", 150.0, "homme", None, Deadline(60.0, clock=clock))
+    assert orch.event_analyzer.stats()["llm_calls"] == 1
@@ -0,0 +1,151 @@
+import os
+import sys
+import json
+import asyncio
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.core.event_rules import RuleBasedEventExtractor
+from multi_agents.agents.event_analyzer import EventAnalyzerAgent
+
+
+class FakeLLMClient:
+    def __init__(self, response: dict) -> None:
+        self.response = response
+        self.calls = 0
+
+    def chat(self, system_prompt: str, user_prompt: str) -> str:
+        self.calls += 1
+        return json.dumps(self.response)
+
+
+LLM_EVENT = {
+    "event_type": "soirée",
+    "time_of_day": "nuit",
+    "formality_level": "smart casual",
+    "style": "streetwear",
+    "budget": 999.0,
+    "gender": "femme",
+    "age": 40,
+}
+
+
+def test_extracts_explicit_fields_with_confidence():
+    rules = RuleBasedEventExtractor()
+    extraction = rules.extract("Mariage le soir, chic et minimaliste, 150€", ui_gender="homme")
+
+    assert extraction["event"] == {
+        "event_type": "mariage",
+        "time_of_day": "soirée",
+        "formality_level": "chic",
+        "style": "minimaliste",
+        "budget": 150.0,
+        "gender": "homme",
+        "age": None,
+    }
+    assert rules.confident(extraction)
+
+
+def test_ambiguous_or_missing_fields_are_uncertain():
+    rules = RuleBasedEventExtractor()
+
+    vague = rules.extract("un truc sympa", ui_gender="homme")
+    assert {"event_type", "formality_level"} <= set(rules.uncertain_fields(vague))
+
+    # "très chic" masque "chic" ; le budget UI l'emporte sur le texte
+    chic = rules.extract("mariage très chic le soir, 300 euros", ui_budget=100.0, ui_gender="femme")
+    assert chic["event"]["formality_level"] == "très chic"
+    assert chic["event"]["budget"] == 100.0
+
+    two_budgets = rules.extract("mariage le soir, chic, entre 100€ et 200€", ui_gender="homme")
+    assert "budget" in rules.uncertain_fields(two_budgets)
+
+
+def test_misleading_keywords_are_not_confident():
+    rules = RuleBasedEventExtractor()
+
+    # Prénom / situation : pas un mariage
+    marie = rules.extract("Soirée chez Marie, décontracté, 50€", ui_gender="femme")
+    assert marie["event"]["event_type"] != "mariage"
+    assert not rules.confident(marie)
+    married = rules.extract("Je suis marié, dîner au restaurant", ui_gender="homme")
+    assert married["event"]["event_type"] != "mariage"
+
+    # Négation : "chic" n'est pas demandé
+    not_chic = rules.extract("Mariage le soir, je ne veux pas être trop chic, 150€", ui_gender="homme")
+    assert "formality_level" in rules.uncertain_fields(not_chic)
+
+    # Une durée n'est pas un âge
+    anniversary = rules.extract("30 ans de mariage de mes parents, le soir, chic", ui_gender="femme")
+    assert anniversary["event"]["age"] is None
+    assert anniversary["event"]["event_type"] == "anniversaire"
+    assert rules.extract("j'ai 30 ans, mariage le soir, chic")["event"]["age"] == 30
+
+    # Type et formalité contradictoires
+    clash = rules.extract("Mariage le soir, très décontracté, 150€", ui_gender="homme")
+    assert {"event_type", "formality_level"} <= set(rules.uncertain_fields(clash))
+
+
+def test_confident_request_skips_llm():
+    llm = FakeLLMClient(LLM_EVENT)
+    agent = EventAnalyzerAgent(llm_client=llm)
+
+    event = asyncio.run(agent.arun({
+        "raw_text": "Mariage le soir, chic et minimaliste", "ui_budget": 150.0, "ui_gender": "homme"
+    }))
+
+    assert llm.calls == 0
+    assert event["event_type"] == "mariage" and event["budget"] == 150.0
+    assert agent.stats() == {"rule_hits": 1, "llm_calls": 0}
+
+
+def test_llm_only_fills_uncertain_fields():
+    llm = FakeLLMClient(LLM_EVENT)
+    agent = EventAnalyzerAgent(llm_client=llm)
+
+    event = asyncio.run(agent.arun({
+        "raw_text": "une sortie avec des amis le soir, style streetwear",
+        "ui_budget": 80.0,
+        "ui_gender": "homme",
+        "ui_age": 25,
+    }))
+
+    assert llm.calls == 1
+    # Incertains : complétés par le LLM
+    assert event["event_type"] == "soirée"
+    assert event["formality_level"] == "smart casual"
+    # Sûrs : conservés (texte explicite et saisies UI)
+    assert event["time_of_day"] == "soirée"
+    assert event["budget"] == 80.0
+    assert event["gender"] == "homme"
+    assert event["age"] == 25
+
+
+def test_negative_constraint_survives_the_fast_path():
+    rules = RuleBasedEventExtractor()
+    description = "Mariage en plein air l'après midi, chic mais pas en costume"
+
+    # "pas en costume" n'est dans aucun lexique : le style n'est pas sûr
+    extraction = rules.extract(description, ui_budget=150.0, ui_gender="homme")
+    assert "style" in rules.uncertain_fields(extraction)
+    # Style déduit de la seule formalité : une supposition
+    assert "style" in rules.uncertain_fields(rules.extract("Mariage le soir, chic", ui_gender="homme"))
+
+    # La demande brute arrive jusqu'au styliste
+    prompts = []
+
+    class RecordingLLMClient:
+        def chat(self, system_prompt: str, user_prompt: str) -> str:
+            prompts.append(user_prompt)
+            if "analyse d'événement" in system_prompt:
+                return json.dumps({**LLM_EVENT, "style": "chic décontracté"})
+            return json.dumps({"outfits": [{"style_name": "Lin", "items": [{"name": "chemise en lin", "category": "chemise", "max_price": 60.0}]}]})
+
+    from multi_agents.orchestrator import Orchestrator
+
+    orch = Orchestrator(llm_client=RecordingLLMClient())
+    event = orch._run_event_analyzer(description, 150.0, "homme", None)
+    orch._run_stylist(event, description=description)
+    assert "pas en costume" in prompts[-1]
@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+import asyncio
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.core.apify_product_provider import ApifyProductProvider
+from multi_agents.core.cached_product_provider import CachedScrapeProvider
+from multi_agents.core.federated_product_provider import FederatedProductProvider
+from multi_agents.core.product_provider import ProductProvider, item_query
+
+
+class StaticProvider(ProductProvider):
+    def __init__(self, name, candidates, delay=0.0):
+        self.name = name
+        self.candidates = candidates
+        self.delay = delay
+        self.cancelled = False
+
+    def search_products(self, query):
+        raise NotImplementedError
+
+    async def asearch_candidates(self, query):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return [dict(c) for c in self.candidates]
+
+
+class FailingProvider(StaticProvider):
+    async def asearch_candidates(self, query):
+        raise RuntimeError("boom")
+
+
+def product(name, price, url=None):
+    return {"name": name, "price": price, "url": url or f"https://shop/{name}"}
+
+
+QUERY = item_query("chemise blanche", "homme", 50.0, category="chemise")
+
+
+def test_fast_source_answers_without_waiting_for_slow_one():
+    fast = StaticProvider("local", [product("a", 30.0), product("b", 20.0), product("c", 45.0)])
+    slow = StaticProvider("apify", [product("d", 10.0)], delay=5.0)
+    federated = FederatedProductProvider([fast, slow], min_results=3)
+
+    start = time.perf_counter()
+    results = asyncio.run(federated.asearch_candidates(QUERY))
+
+    assert time.perf_counter() - start < 1.0
+    assert [c["name"] for c in results] == ["b", "a", "c"]
+    assert slow.cancelled
+    assert federated.stats()["early_returns"] == 1
+
+
+def test_results_are_merged_deduplicated_and_filtered():
+    first = StaticProvider("local", [product("a", 30.0, url="https://shop/x?ref=1"), product("cher", 80.0)])
+    second = StaticProvider("apify", [product("a bis", 30.0, url="https://shop/x"), product("b", 25.0)], delay=0.05)
+    broken = FailingProvider("html", [])
+    federated = FederatedProductProvider([first, second, broken], min_results=5)
+
+    results = asyncio.run(federated.asearch_candidates(QUERY))
+
+    # Même URL : la version du premier provider listé est gardée ; 80 € > max_price écarté
+    assert [c["name"] for c in results] == ["b", "a"]
+    assert federated.stats()["providers"]["html"]["errors"] == 1
+
+
+def test_deadline_returns_partial_results():
+    fast = StaticProvider("local", [product("a", 30.0)])
+    slow = StaticProvider("apify", [product("b", 20.0)], delay=5.0)
+    federated = FederatedProductProvider([fast, slow], min_results=3)
+
+    start = time.perf_counter()
+    results = asyncio.run(federated.asearch_candidates(QUERY, deadline_seconds=0.2))
+
+    assert time.perf_counter() - start < 1.0
+    assert [c["name"] for c in results] == ["a"]
+    assert federated.stats()["deadline_expired"] == 1
+
+
+def test_live_results_feed_the_scrape_cache():
+    class FakeScraper:
+        def __init__(self):
+            self.calls = 0
+
+        async def asearch(self, search_text, gender_path, max_price, cancel_event=None):
+            self.calls += 1
+            return [product(f"{search_text} {i}", 10.0 + i) for i in range(3)]
+
+    scraper = FakeScraper()
+    cache = CachedScrapeProvider()
+    federated = FederatedProductProvider([ApifyProductProvider(scraper)], cache=cache, min_results=3)
+
+    first = asyncio.run(federated.asearch_candidates(QUERY))
+    second = asyncio.run(federated.asearch_candidates(QUERY))
+
+    assert first == second
+    assert scraper.calls == 1
+    assert cache.stats()["hits"] == 1
+    assert federated.stats()["cache_answers"] == 1
+
+    # Requête plus large que l'entrée en cache : on ne la sert pas depuis le cache
+    asyncio.run(federated.asearch_candidates(item_query("chemise blanche", "homme", 200.0)))
+    assert scraper.calls == 2
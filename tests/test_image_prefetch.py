@@ -0,0 +1,115 @@
+import io
+import os
+import sys
+import time
+import asyncio
+
+import httpx
+from PIL import Image
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.core import image_prefetch
+from multi_agents.core.image_prefetch import ImagePrefetcher
+
+
+def png(size=(1200, 1600)) -> bytes:
+    out = io.BytesIO()
+    Image.effect_noise(size, 40).convert("RGB").save(out, format="PNG")
+    return out.getvalue()
+
+
+PRODUCT_PNG = png()
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    if request.url.path.startswith("/ok"):
+        return httpx.Response(200, headers={"content-type": "image/png"}, content=PRODUCT_PNG)
+    return httpx.Response(404, headers={"content-type": "text/html"}, content=b"not found")
+
+
+def use_mock_http(monkeypatch) -> None:
+    transport = httpx.MockTransport(handler)
+    sync_client = httpx.Client(transport=transport)
+    monkeypatch.setattr(image_prefetch, "get_http_client", lambda: sync_client)
+    monkeypatch.setattr(image_prefetch, "get_async_http_client", lambda: httpx.AsyncClient(transport=transport))
+
+
+def test_prefetch_writes_thumbnails_and_flags_dead_urls(tmp_path, monkeypatch):
+    use_mock_http(monkeypatch)
+    prefetcher = ImagePrefetcher(cache_dir=tmp_path)
+
+    futures = prefetcher.prefetch(["https://img.test/ok/1.jpg", "https://img.test/gone.jpg", None, "img"])
+    assert len(futures) == 2
+    for future in futures:
+        future.result(timeout=5)
+
+    thumb = prefetcher.thumbnail_bytes("https://img.test/ok/1.jpg")
+    assert thumb is not None and len(thumb) < len(PRODUCT_PNG)
+    with Image.open(io.BytesIO(thumb)) as img:
+        assert max(img.size) <= 440
+    assert prefetcher.thumbnail_bytes("https://img.test/gone.jpg") is None
+    assert prefetcher.is_dead("https://img.test/gone.jpg")
+
+
+def test_check_before_generation_and_size_bound(tmp_path, monkeypatch):
+    use_mock_http(monkeypatch)
+    prefetcher = ImagePrefetcher(cache_dir=tmp_path, max_bytes=1)
+
+    alive = asyncio.run(prefetcher.acheck(["https://img.test/ok/2.jpg", "https://img.test/missing.jpg"]))
+    assert alive == {"https://img.test/ok/2.jpg": True, "https://img.test/missing.jpg": False}
+
+    for future in prefetcher.prefetch([f"https://img.test/ok/{i}.jpg" for i in range(3)]):
+        future.result(timeout=5)
+    # Cache borné : les miniatures les plus anciennes sont évincées
+    assert len(list(tmp_path.glob("*.jpg"))) <= 1
+
+
+def test_transient_failures_are_retried_after_ttl(tmp_path, monkeypatch):
+    statuses = {"count": 0}
+
+    def flaky(request: httpx.Request) -> httpx.Response:
+        statuses["count"] += 1
+        if statuses["count"] == 1:
+            return httpx.Response(503, content=b"busy")
+        return handler(request)
+
+    sync_client = httpx.Client(transport=httpx.MockTransport(flaky))
+    monkeypatch.setattr(image_prefetch, "get_http_client", lambda: sync_client)
+    prefetcher = ImagePrefetcher(cache_dir=tmp_path, dead_ttl_seconds=0.05)
+
+    url = "https://img.test/ok/3.jpg"
+    for future in prefetcher.prefetch([url]):
+        assert future.result(timeout=5) is None
+    assert prefetcher.is_dead(url)
+    assert prefetcher.prefetch([url]) == []
+
+    time.sleep(0.06)
+    assert not prefetcher.is_dead(url)
+    for future in prefetcher.prefetch([url]):
+        assert future.result(timeout=5) is not None
+    assert prefetcher.thumbnail_bytes(url) is not None
+
+    # 404 : définitif
+    for future in prefetcher.prefetch(["https://img.test/gone.jpg"]):
+        future.result(timeout=5)
+    time.sleep(0.06)
+    assert prefetcher.is_dead("https://img.test/gone.jpg")
+
+
+def test_dead_marks_are_bounded_and_keep_recently_seen_urls(tmp_path, monkeypatch):
+    use_mock_http(monkeypatch)
+    prefetcher = ImagePrefetcher(cache_dir=tmp_path, max_dead_urls=2)
+
+    for name in ("a", "b"):
+        for future in prefetcher.prefetch([f"https://img.test/{name}.jpg"]):
+            future.result(timeout=5)
+    assert prefetcher.is_dead("https://img.test/a.jpg")  # a redevient la plus récente
+    for future in prefetcher.prefetch(["https://img.test/c.jpg"]):
+        future.result(timeout=5)
+
+    assert prefetcher.is_dead("https://img.test/a.jpg")
+    assert prefetcher.is_dead("https://img.test/c.jpg")
+    assert not prefetcher.is_dead("https://img.test/b.jpg")
@@ -0,0 +1,41 @@
+import os
+import sys
+import json
+import subprocess
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+
+# Leur absence de sys.modules garantit un import léger, sans dépendre du temps machine
+HEAVY_MODULES = ["groq", "httpx", "dotenv", "numpy"]
+
+PROBE = """
+import json, sys
+from multi_agents.orchestrator import Orchestrator
+orch = Orchestrator()
+print(json.dumps({
+    "loaded": [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def run_probe() -> dict:
+    env = {k: v for k, v in os.environ.items() if k not in ("GROQ_API_KEY", "APIFY_API_TOKEN", "MODELSLAB_API_KEY")}
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=PROJECT_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def test_orchestrator_import_is_light():
+    result = run_probe()
+
+    # Construire l'orchestrateur ne charge ni SDK ni clé : tout est fait au premier appel
+    assert result["loaded"] == []
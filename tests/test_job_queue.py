@@ -0,0 +1,131 @@
+import os
+import sys
+import json
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.core.job_queue import PipelineJobStore
+from multi_agents.core.pipeline_worker import PipelineWorker
+from multi_agents.orchestrator import Orchestrator
+
+
+class FakeLLMClient:
+    def chat(self, system_prompt: str, user_prompt: str) -> str:
+        if "analyse d'événement" in system_prompt:
+            return json.dumps({"event_type": "soirée", "formality_level": "chic", "style": "rock"})
+        if "styliste virtuel" in system_prompt:
+            return json.dumps({
+                "outfits": [
+                    {
+                        "style_name": "Chic",
+                        "description": "test",
+                        "formality_level": "chic",
+                        "total_budget": 100.0,
+                        "items": [{"name": "costume bleu marine", "category": "costume", "max_price": 100.0}],
+                    }
+                ]
+            })
+        return json.dumps({"chosen_index": 0})
+
+
+class FakeScraper:
+    def search(self, search_text, gender_path, max_price, cancel_event=None):
+        return [{"name": f"{search_text} Zalando", "price": 80.0, "url": "u"}]
+
+
+REQUEST = {
+    "description": "Soirée entre amis, tenue chic",
+    "ui_budget": 150.0,
+    "ui_gender": "homme",
+    "ui_age": None,
+    "user_image_url": None,
+    "user_image_bytes": b"photo",
+}
+
+
+def test_submit_deduplicates_and_claims_are_exclusive_across_connections(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    ui, worker_a, worker_b = PipelineJobStore(path), PipelineJobStore(path), PipelineJobStore(path)
+
+    first = ui.submit(REQUEST)
+    assert ui.submit(REQUEST) == first
+    second = ui.submit({**REQUEST, "ui_budget": 80.0})
+    assert ui.get(second)["position"] == 2
+
+    job_id, request = worker_a.claim("a")
+    assert job_id == first and request["user_image_bytes"] == b"photo"
+    assert worker_b.claim("b")[0] == second
+    assert worker_a.claim("a") is None
+    assert ui.queue_depth() == 2
+
+
+def test_worker_publishes_stage_events_and_result(tmp_path):
+    store = PipelineJobStore(str(tmp_path / "jobs.sqlite3"))
+    orch = Orchestrator(llm_client=FakeLLMClient(), scraper=FakeScraper())
+    job_id = store.submit({**REQUEST, "user_image_bytes": None})
+
+    stages = []
+    original = store.record_stage
+
+    def spy(job, stage, status, data=None):
+        stages.append((stage, status))
+        original(job, stage, status, data)
+
+    store.record_stage = spy
+    assert PipelineWorker(store, orch).run_once()
+
+    info = store.get(job_id)
+    assert info["status"] == "done" and info["progress"] == 100
+    assert info["partial"]["event"]["event_type"] == "soirée"
+    assert info["partial"]["stylist_output"]["outfits"][0]["style_name"] == "Chic"
+    assert info["result"]["final_outfits"][0]["items"][0]["chosen_product"]["price"] == 80.0
+    assert stages == [
+        ("event_analyzer", "started"), ("event_analyzer", "done"),
+        ("stylist", "started"), ("stylist", "done"),
+        ("product_search", "started"), ("product_search", "done"),
+    ]
+
+
+def test_jobs_of_a_dead_worker_are_requeued_then_failed(tmp_path):
+    store = PipelineJobStore(str(tmp_path / "jobs.sqlite3"), max_attempts=2)
+    job_id = store.submit(REQUEST)
+
+    store.claim("dead")
+    assert store.requeue_orphans(max_age_seconds=60.0) == 1
+    assert store.get(job_id)["status"] == "queued"
+
+    store.claim("dead")
+    assert store.requeue_orphans(max_age_seconds=60.0) == 0
+    assert store.get(job_id)["status"] == "error"
+
+
+def test_ensure_workers_spawns_a_single_pool_across_sessions(tmp_path):
+    import threading
+    import time
+
+    from multi_agents.core.pipeline_worker import ensure_workers
+
+    path = str(tmp_path / "jobs.sqlite3")
+    spawned = []
+
+    def spawn():
+        spawned.append(1)
+        time.sleep(0.2)
+        PipelineJobStore(path).heartbeat("pool-worker")
+
+    threads = [
+        threading.Thread(target=lambda: ensure_workers(PipelineJobStore(path), spawn=spawn, timeout_seconds=5))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert spawned == [1]
+
+    # Pool mort (plus de battement) : relancé à la soumission suivante
+    PipelineJobStore(path).unregister("pool-worker")
+    assert ensure_workers(PipelineJobStore(path), spawn=spawn, timeout_seconds=5) == 1
+    assert spawned == [1, 1]
@@ -0,0 +1,82 @@
+import os
+import sys
+import asyncio
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.core.async_utils import achat
+from multi_agents.core.llm_cache import LLMResponseCache
+from multi_agents.core.llm_client import LLMClient
+
+
+class ScriptedLLMClient(LLMClient):
+    def __init__(self, replies=None, **kwargs) -> None:
+        super().__init__(api_key="test", **kwargs)
+        self.replies = list(replies or [])
+        self.requests = 0
+
+    async def _acomplete(self, system_prompt: str, user_prompt: str, model: str, **kwargs) -> str:
+        self.requests += 1
+        if self.replies:
+            return self.replies.pop(0)
+        return f"réponse {self.requests}"
+
+
+def accept(raw: str) -> bool:
+    return True
+
+
+def test_identical_requests_are_served_from_cache(tmp_path):
+    path = str(tmp_path / "llm.sqlite3")
+    llm = ScriptedLLMClient(cache=LLMResponseCache(path))
+
+    async def scenario():
+        return [
+            await achat(llm, "sys", "user", agent="stylist", validate=accept),
+            await achat(llm, "sys", "user", agent="stylist", validate=accept),
+            await achat(llm, "sys", "autre", agent="stylist", validate=accept),
+        ]
+
+    assert asyncio.run(scenario()) == ["réponse 1", "réponse 1", "réponse 2"]
+    assert llm.requests == 2
+
+    # Persistant : un autre process (autre client, même fichier) profite des réponses
+    other = ScriptedLLMClient(cache=LLMResponseCache(path))
+    assert asyncio.run(achat(other, "sys", "user", agent="stylist", validate=accept)) == "réponse 1"
+    assert other.requests == 0
+
+
+def test_expired_entries_are_not_served(tmp_path):
+    cache = LLMResponseCache(str(tmp_path / "llm.sqlite3"), ttl_seconds=-1.0)
+    key = cache.key("model", "sys", "user")
+    cache.put(key, "réponse")
+
+    assert cache.get(key) is None
+    assert cache.purge() == 1
+
+
+def test_invalid_or_unvalidated_answers_are_not_cached(tmp_path):
+    llm = ScriptedLLMClient(
+        replies=['{"search_text": "veste', '{"search_text": "veste lin"}', '{"search_text": "veste lin"}'],
+        cache=LLMResponseCache(str(tmp_path / "llm.sqlite3")),
+    )
+
+    def valid(raw: str) -> bool:
+        return raw.endswith("}")
+
+    async def scenario():
+        return [
+            await achat(llm, "sys", "user", agent="query_builder", validate=valid),  # tronquée
+            await achat(llm, "sys", "user", agent="query_builder", validate=valid),
+            await achat(llm, "sys", "user", agent="query_builder", validate=valid),
+            await achat(llm, "sys", "libre", agent="query_builder"),
+            await achat(llm, "sys", "libre", agent="query_builder"),
+        ]
+
+    answers = asyncio.run(scenario())
+
+    assert answers[:3] == ['{"search_text": "veste', '{"search_text": "veste lin"}', '{"search_text": "veste lin"}']
+    # Sans validate : jamais servi depuis le cache
+    assert llm.requests == 4
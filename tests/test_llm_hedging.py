@@ -0,0 +1,92 @@
+import os
+import sys
+import asyncio
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.core.async_utils import achat
+from multi_agents.core.llm_client import HedgingPolicy, LatencyHistogram, LLMClient
+
+
+class ScriptedLLMClient(LLMClient):
+    """
+    LLMClient dont les appels réseau sont remplacés par des délais scriptés.
+    """
+
+    def __init__(self, delays, **kwargs) -> None:
+        super().__init__(api_key="test", **kwargs)
+        self.delays = list(delays)
+        self.requests = 0
+        self.cancelled = 0
+
+    async def _acomplete(self, system_prompt: str, user_prompt: str, model: str, **kwargs) -> str:
+        index = self.requests
+        self.requests += 1
+        try:
+            await asyncio.sleep(self.delays[index] if index < len(self.delays) else 0.01)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return f"réponse {index + 1}"
+
+
+def test_histogram_quantiles():
+    histogram = LatencyHistogram()
+    for i in range(100):
+        histogram.observe(0.1 if i < 95 else 5.0)
+
+    assert 0.1 <= histogram.quantile(0.95) < 0.12
+    assert histogram.quantile(0.99) > 4.0
+
+
+def test_slow_call_is_hedged_within_budget():
+    policy = HedgingPolicy(min_samples=20, budget_ratio=0.05, min_delay_s=0.01)
+    for _ in range(20):
+        policy.observe("query_builder", 0.02)
+    # 20 appels déjà passés : budget de 5% -> un seul hedge possible
+    policy.calls = 20
+
+    llm = ScriptedLLMClient([0.5, 0.01, 0.3, 0.01], hedging=policy)
+
+    async def scenario():
+        first = await achat(llm, "sys", "user", agent="query_builder")
+        second = await achat(llm, "sys", "user", agent="query_builder")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+
+    # Le doublon (2e requête) répond avant le primaire lent
+    assert first == "réponse 2"
+    assert policy.hedges == 1 and policy.hedge_wins == 1
+    # Budget épuisé : le second appel lent n'est pas doublé
+    assert second == "réponse 3"
+    assert policy.hedges == 1
+    assert llm.requests == 3
+
+
+def test_no_hedge_without_history_or_budget():
+    policy = HedgingPolicy(min_samples=5, budget_ratio=0.0)
+    llm = ScriptedLLMClient([0.05], hedging=policy)
+
+    assert asyncio.run(llm.for_agent("stylist").achat("sys", "user")) == "réponse 1"
+    assert llm.requests == 1
+    assert policy.stats()["calls"] == 1
+
+
+def test_losing_primary_is_cancelled_and_recorded_as_censored_sample():
+    policy = HedgingPolicy(min_samples=20, budget_ratio=1.0, min_delay_s=0.01)
+    for _ in range(20):
+        policy.observe("query_builder", 0.02)
+    llm = ScriptedLLMClient([0.3, 0.01], hedging=policy)
+    threshold = policy.threshold("query_builder")
+
+    assert asyncio.run(achat(llm, "sys", "user", agent="query_builder")) == "réponse 2"
+    assert policy.hedge_wins == 1
+    # Le primaire lent est annulé dès que le doublon gagne
+    assert llm.cancelled == 1
+    # ... mais son temps écoulé (minorant de sa latence) entre dans l'histogramme
+    histogram = policy.histograms["query_builder"]
+    assert histogram.count == 21
+    assert histogram.quantile(1.0) >= threshold
@@ -0,0 +1,66 @@
+import os
+import sys
+import json
+import asyncio
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.agents.product_search import ProductSearchAgent
+from multi_agents.core.llm_client import LLMClient
+from multi_agents.orchestrator import Orchestrator, SMALL_MODEL
+
+
+class RecordingLLMClient(LLMClient):
+    """
+    Le petit modèle renvoie un index hors bornes, le grand modèle un index valide.
+    """
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(api_key="test", **kwargs)
+        self.models = []
+
+    async def _acomplete(self, system_prompt: str, user_prompt: str, model: str, **kwargs) -> str:
+        self.models.append(model)
+        if model == SMALL_MODEL:
+            return json.dumps({"chosen_index": 7})
+        return json.dumps({"chosen_index": 1})
+
+
+CANDIDATES = [
+    {"name": "Chemise A", "price": 30.0},
+    {"name": "Chemise B", "price": 35.0},
+]
+
+
+def select(agent: ProductSearchAgent) -> int:
+    selector_input = {"item_name": "chemise", "candidates": CANDIDATES}
+    return asyncio.run(agent._select_product(selector_input, CANDIDATES))
+
+
+def test_orchestrator_routes_simple_agents_to_small_model():
+    llm = RecordingLLMClient()
+    orch = Orchestrator(llm_client=llm)
+
+    assert orch.llm.model_for("product_selector") == SMALL_MODEL
+    assert orch.llm.model_for("event_analyzer") == llm.model
+    assert orch.llm.model_for("product_selector", escalate=True) == llm.model
+
+
+def test_invalid_small_model_output_escalates_once():
+    llm = RecordingLLMClient(model_routes={"product_selector": SMALL_MODEL})
+    agent = ProductSearchAgent(llm_client=llm, scraper=object())
+
+    assert select(agent) == 1
+    assert llm.models == [SMALL_MODEL, llm.model]
+    assert agent.escalations == 1
+
+
+def test_no_escalation_when_agent_already_on_large_model():
+    llm = RecordingLLMClient()
+    agent = ProductSearchAgent(llm_client=llm, scraper=object())
+
+    assert select(agent) == 1
+    assert llm.models == [llm.model]
+    assert agent.escalations == 0
@@ -0,0 +1,112 @@
+import os
+import sys
+import json
+import time
+import asyncio
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.orchestrator import Orchestrator
+
+
+class FakeAsyncLLMClient:
+    """
+    Fake LLM asynchrone : chaque appel "attend" le réseau sans bloquer la boucle.
+    """
+
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+
+    def _answer(self, system_prompt: str) -> str:
+        if "analyse d'événement" in system_prompt:
+            return json.dumps({
+                "event_type": "mariage",
+                "time_of_day": "soirée",
+                "formality_level": "chic",
+                "style": "minimaliste",
+                "budget": 150.0,
+                "gender": "homme",
+            })
+        if "styliste virtuel" in system_prompt:
+            return json.dumps({
+                "outfits": [
+                    {
+                        "style_name": "Chic minimaliste",
+                        "description": "Costume bleu et chemise blanche.",
+                        "formality_level": "chic",
+                        "total_budget": 150.0,
+                        "items": [
+                            {"name": "costume bleu marine", "category": "costume", "max_price": 100.0},
+                            {"name": "chemise blanche", "category": "chemise", "max_price": 50.0},
+                        ],
+                    }
+                ]
+            })
+        if "image-to-image" in system_prompt:
+            return json.dumps({"prompt": "mannequin test"})
+        return json.dumps({"chosen_index": 0})
+
+    def chat(self, system_prompt: str, user_prompt: str) -> str:
+        time.sleep(self.delay)
+        return self._answer(system_prompt)
+
+    async def achat(self, system_prompt: str, user_prompt: str) -> str:
+        await asyncio.sleep(self.delay)
+        return self._answer(system_prompt)
+
+
+class FakeScraper:
+    async def asearch(self, search_text, gender_path, max_price, cancel_event=None):
+        await asyncio.sleep(0.05)
+        return [{"name": f"{search_text} Zalando", "price": 40.0, "url": "u", "image": "img"}]
+
+
+class FakeImageClient:
+    async def agenerate_outfit_image(self, user_image_url, product_image_urls, prompt):
+        return f"preview-of-{user_image_url}"
+
+
+def make_orchestrator(monkeypatch, delay: float = 0.0) -> Orchestrator:
+    monkeypatch.setenv("APIFY_API_TOKEN", "test")
+    monkeypatch.setenv("MODELSLAB_API_KEY", "test")
+    orch = Orchestrator(llm_client=FakeAsyncLLMClient(delay), scraper=FakeScraper())
+    orch.visualizer.image_client = FakeImageClient()
+    return orch
+
+
+def test_sync_pipeline_matches_async_pipeline(monkeypatch):
+    orch = make_orchestrator(monkeypatch)
+    kwargs = dict(description="Mariage le soir, chic", ui_budget=150.0, user_image_url="photo.jpg")
+
+    sync_result = orch.run_pipeline(**kwargs)
+    async_result = asyncio.run(orch.arun_pipeline(**kwargs))
+
+    # Les compteurs de tokens dépendent des caches déjà chauds au 2e passage
+    sync_tokens = sync_result.pop("prompt_tokens")
+    async_result.pop("prompt_tokens")
+    assert sync_result == async_result
+    assert sync_tokens["saved_tokens"] > 0
+    assert sync_result["event"]["event_type"] == "mariage"
+    outfit = sync_result["final_outfits"][0]
+    assert outfit["total_budget"] == 80.0
+    assert outfit["preview_image_url"] == "preview-of-photo.jpg"
+
+
+def test_concurrent_requests_share_one_event_loop(monkeypatch):
+    orch = make_orchestrator(monkeypatch, delay=0.1)
+
+    async def serve_many() -> list:
+        return await asyncio.gather(
+            *(orch.arun_pipeline(description=f"demande {i}", ui_budget=150.0) for i in range(10))
+        )
+
+    start = time.perf_counter()
+    results = asyncio.run(serve_many())
+    elapsed = time.perf_counter() - start
+
+    assert len(results) == 10
+    assert all(r["final_outfits"] for r in results)
+    # 10 demandes séquentielles prendraient >= 10 x 0.2 s d'appels LLM
+    assert elapsed < 1.5
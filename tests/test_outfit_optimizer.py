@@ -0,0 +1,81 @@
+import os
+import sys
+import json
+import time
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.agents.product_search import ProductSearchAgent
+from multi_agents.core.outfit_optimizer import optimize_outfit
+
+
+class FakeLLMClient:
+    def chat(self, system_prompt: str, user_prompt: str) -> str:
+        # Le sélecteur choisit toujours le candidat le plus cher (index 1)
+        return json.dumps({"chosen_index": 1, "reason": "test"})
+
+
+class FakeScraper:
+    def search(self, search_text: str, gender_path: str, max_price: float, cancel_event=None) -> list:
+        return [
+            {"name": f"{search_text} basique", "price": 20.0, "url": "a"},
+            {"name": f"{search_text} premium", "price": 60.0, "url": "b"},
+        ]
+
+
+def test_optimizer_maximizes_score_under_budget():
+    prices = [[10.0, 50.0], [20.0, 40.0], [5.0, 30.0]]
+    scores = [[0.1, 1.0], [0.2, 0.9], [0.3, 0.8]]
+
+    assert optimize_outfit(prices, scores, budget=200.0) == [1, 1, 1]
+    assert optimize_outfit(prices, scores, budget=100.0) == [1, 1, 0]
+    assert optimize_outfit(prices, scores, budget=35.0) == [0, 0, 0]
+    assert optimize_outfit(prices, scores, budget=34.99) is None
+
+
+def test_optimizer_is_fast_for_dozens_of_candidates():
+    prices = [[float(10 + j) for j in range(40)] for _ in range(6)]
+    scores = [[j / 40 for j in range(40)] for _ in range(6)]
+
+    start = time.perf_counter()
+    picked = optimize_outfit(prices, scores, budget=250.0)
+    assert time.perf_counter() - start < 1.0
+    assert sum(prices[i][j] for i, j in enumerate(picked)) <= 250.0
+
+
+def test_over_budget_outfit_is_repaired_instead_of_dropped():
+    agent = ProductSearchAgent(llm_client=FakeLLMClient(), scraper=FakeScraper())
+    agent.ranker.threshold = None  # toujours passer par le sélecteur LLM
+
+    event = {
+        "event_type": "mariage",
+        "time_of_day": "soirée",
+        "formality_level": "chic",
+        "style": "minimaliste",
+        "budget": 100.0,
+        "gender": "homme",
+        "age": 30,
+    }
+    stylist_output = {
+        "outfits": [
+            {
+                "style_name": "Chic",
+                "description": "test",
+                "formality_level": "chic",
+                "total_budget": 100.0,
+                "items": [
+                    {"name": "costume bleu", "category": "costume", "max_price": 60.0},
+                    {"name": "chemise blanche", "category": "chemise", "max_price": 60.0},
+                ],
+            }
+        ]
+    }
+
+    result = agent.run({"event": event, "stylist_output": stylist_output})
+    outfits = result["product_search_output"]["outfits"]
+
+    assert len(outfits) == 1
+    assert outfits[0]["total_budget"] == 80.0
+    assert sorted(it["chosen_product"]["price"] for it in outfits[0]["items"]) == [20.0, 60.0]
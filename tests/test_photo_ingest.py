@@ -0,0 +1,100 @@
+import io
+import os
+import sys
+import json
+import asyncio
+
+from PIL import Image
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.agents.outfit_visualizer import OutfitVisualizerAgent
+from multi_agents.core.photo_ingest import PhotoIngestor, ingest_photo
+
+
+def phone_photo(width: int = 3000, height: int = 2000) -> bytes:
+    img = Image.effect_noise((width, height), 60).convert("RGB")
+    exif = Image.Exif()
+    exif[0x0112] = 6            # orientation : rotation 90°
+    exif[0x010F] = "PhoneMaker"
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=95, exif=exif.tobytes())
+    return out.getvalue()
+
+
+class FakeLLMClient:
+    def chat(self, system_prompt: str, user_prompt: str) -> str:
+        return json.dumps({"prompt": "mannequin test"})
+
+
+class FakeImageClient:
+    def __init__(self) -> None:
+        self.uploads = 0
+        self.generations = []
+
+    async def aupload_image(self, photo):
+        self.uploads += 1
+        return f"https://cdn.test/{photo['sha256'][:8]}.jpg"
+
+    async def agenerate_outfit_image(self, user_image_url, product_image_urls, prompt):
+        self.generations.append(user_image_url)
+        return f"preview-{len(self.generations)}"
+
+
+def outfit(image: str) -> dict:
+    return {
+        "style_name": "Chic",
+        "description": "test",
+        "formality_level": "chic",
+        "items": [{"name": "chemise", "category": "chemise", "chosen_product": {"image": image, "name": "Chemise"}}],
+    }
+
+
+def test_photo_is_rotated_downscaled_and_stripped():
+    raw = phone_photo()
+    photo = ingest_photo(raw)
+
+    assert len(photo["data"]) < len(raw)
+    # orientation EXIF appliquée : l'image devient portrait
+    assert (photo["width"], photo["height"]) == (683, 1024)
+    with Image.open(io.BytesIO(photo["data"])) as img:
+        assert not img.getexif()
+    assert ingest_photo(raw)["sha256"] == photo["sha256"]
+
+
+def test_photo_uploaded_once_and_previews_cached_across_runs():
+    image_client = FakeImageClient()
+    agent = OutfitVisualizerAgent(llm_client=FakeLLMClient(), image_client=image_client)
+    data = {
+        "event": {"event_type": "mariage"},
+        "product_search_output": {"outfits": [outfit("a.jpg"), outfit("b.jpg"), outfit("c.jpg")]},
+        "user_image_bytes": phone_photo(1600, 1200),
+    }
+
+    first = asyncio.run(agent.arun(data))
+    second = asyncio.run(agent.arun(data))
+
+    assert image_client.uploads == 1
+    assert len(image_client.generations) == 3
+    assert all(url.startswith("https://cdn.test/") for url in image_client.generations)
+    assert [o["preview_image_url"] for o in first["outfits"]] == [o["preview_image_url"] for o in second["outfits"]]
+    assert agent.preview_cache_hits == 3
+    assert isinstance(agent.photo_ingestor, PhotoIngestor)
+
+
+def test_uploaded_urls_are_bounded():
+    image_client = FakeImageClient()
+    ingestor = PhotoIngestor(uploader=image_client.aupload_image, max_entries=0, max_uploaded=1)
+    first, second = phone_photo(64, 48), phone_photo(48, 64)
+
+    async def scenario():
+        for raw in (first, first, second, first):
+            await ingestor.aingest(raw)
+
+    asyncio.run(scenario())
+
+    # la 2e ingestion réutilise l'URL ; la 4e a été évincée par la photo suivante
+    assert image_client.uploads == 3
+    assert len(ingestor._uploaded) == 1
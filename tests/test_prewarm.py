@@ -0,0 +1,111 @@
+import os
+import sys
+import json
+from datetime import datetime
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.core.catalog_store import CatalogStore
+from multi_agents.core.prewarm import PrewarmJob, mine_session_logs, select_items, season_of
+from multi_agents.orchestrator import Orchestrator
+
+
+EVENT = {
+    "event_type": "mariage",
+    "time_of_day": "soirée",
+    "formality_level": "chic",
+    "style": "minimaliste",
+    "budget": 150.0,
+    "gender": "homme",
+    "age": None,
+}
+
+
+def write_session(log_dir, name, event, items):
+    session = {
+        "event": event,
+        "stylist_output": {"outfits": [{"style_name": "A", "items": items}]},
+        "product_search_output": {"outfits": []},
+        "final_outfits": [],
+    }
+    with open(os.path.join(log_dir, name), "w", encoding="utf-8") as f:
+        json.dump(session, f, ensure_ascii=False)
+
+
+def item(name, category, max_price):
+    return {"name": name, "category": category, "max_price": max_price}
+
+
+def make_logs(tmp_path):
+    write_session(tmp_path, "session_20251126_192344.json", EVENT, [
+        item("chemise blanche", "chemise", 40.0), item("costume bleu marine", "costume", 90.0),
+    ])
+    write_session(tmp_path, "session_20251127_092349.json", EVENT, [item("Chemise  Blanche", "chemise", 50.0)])
+    write_session(tmp_path, "session_20250701_100000.json", {**EVENT, "event_type": "plage"}, [
+        item("short en lin", "short", 30.0),
+    ])
+    return str(tmp_path)
+
+
+class FakeLLMClient:
+    def __init__(self) -> None:
+        self.calls = {"stylist": 0, "other": 0}
+
+    def chat(self, system_prompt: str, user_prompt: str) -> str:
+        if "styliste virtuel" in system_prompt:
+            self.calls["stylist"] += 1
+            return json.dumps({"outfits": []})
+        self.calls["other"] += 1
+        return json.dumps({"search_text": "short lin", "gender_path": "homme", "chosen_index": 0})
+
+
+class FakeScraper:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def search(self, search_text, gender_path, max_price, cancel_event=None):
+        self.calls += 1
+        return [
+            {"name": f"{search_text} {i}", "price": 10.0 + i, "url": f"https://shop/{search_text}/{i}"}
+            for i in range(3)
+        ]
+
+
+def test_mining_counts_items_per_season_and_event_type(tmp_path):
+    mined = mine_session_logs(make_logs(tmp_path))
+
+    assert set(mined) == {("automne", "mariage"), ("été", "plage")}
+    top = mined[("automne", "mariage")][0]
+    assert top["count"] == 2 and top["item"]["max_price"] == 50.0
+
+    assert [e["item"]["name"] for e in select_items(mined, "automne", per_event_type=1)] == ["chemise blanche"]
+    # Saison sans historique : toutes les saisons
+    assert len(select_items(mined, "hiver")) == 3
+    assert season_of(datetime(2025, 1, 5)) == "hiver"
+
+
+def test_prewarm_respects_apify_budget_then_serves_warm_items(tmp_path):
+    log_dir = make_logs(tmp_path)
+    llm, scraper = FakeLLMClient(), FakeScraper()
+    orch = Orchestrator(llm_client=llm, scraper=scraper, catalog=CatalogStore(":memory:"))
+
+    first = PrewarmJob(orch, log_dir=log_dir, apify_budget=1, season="automne", off_peak_hours=None).run()
+    assert (first["scraped"], first["skipped"]) == (1, 1)
+    assert first["stylist_events"] == 1 and llm.calls["stylist"] == 1
+    assert scraper.calls == 1
+
+    second = PrewarmJob(orch, log_dir=log_dir, apify_budget=5, season="automne", off_peak_hours=None).run()
+    assert (second["warm"], second["scraped"]) == (1, 1)
+    assert scraper.calls == 2
+
+
+def test_prewarm_stops_outside_off_peak_hours(tmp_path):
+    orch = Orchestrator(llm_client=FakeLLMClient(), scraper=FakeScraper(), catalog=CatalogStore(":memory:"))
+    job = PrewarmJob(orch, log_dir=make_logs(tmp_path), clock=lambda: datetime(2025, 11, 28, 18, 0))
+
+    report = job.run()
+
+    assert report["stopped"] == "peak_hours"
+    assert report["scraped"] == 0
@@ -0,0 +1,75 @@
+import os
+import sys
+import json
+import asyncio
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.agents.product_search import ProductSearchAgent
+from multi_agents.core.product_ranker import ProductRanker
+
+
+CANDIDATES = [
+    {"name": "Baskets basses - white", "brand": "Nike", "price": 30.0, "color": "white"},
+    {"name": "SLIM FIT - Chemise classique - white", "brand": "Pier One", "price": 32.0, "color": "white"},
+    {"name": "Pantalon de costume - black", "brand": "Zign", "price": 35.0, "color": "black"},
+]
+
+SELECTOR_INPUT = {
+    "item_name": "chemise blanche",
+    "category": "chemise",
+    "style": "minimaliste",
+    "event_type": "mariage",
+    "formality_level": "chic",
+    "gender": "homme",
+    "candidates": CANDIDATES,
+}
+
+
+class FakeLLMClient:
+    def __init__(self, chosen_index: int = 0) -> None:
+        self.calls = 0
+        self.chosen_index = chosen_index
+
+    def chat(self, system_prompt: str, user_prompt: str) -> str:
+        self.calls += 1
+        return json.dumps({"chosen_index": self.chosen_index, "reason": "test"})
+
+
+def test_ranker_prefers_matching_category_and_color():
+    ranker = ProductRanker()
+    scores = ranker.score(SELECTOR_INPUT, max_price=40.0)
+
+    assert scores.shape == (3,)
+    assert int(scores.argmax()) == 1
+    assert ranker.confident_choice(scores) == 1
+
+
+def test_ambiguous_choice_falls_back_to_llm_and_tracks_agreement():
+    fake_llm = FakeLLMClient(chosen_index=1)
+    agent = ProductSearchAgent(
+        llm_client=fake_llm,
+        scraper=object(),
+        ranker=ProductRanker(threshold=10.0),  # jamais assez confiant
+    )
+
+    scores = agent.ranker.score(SELECTOR_INPUT, 40.0)
+    chosen = asyncio.run(agent._choose_index(SELECTOR_INPUT, scores, 40.0))
+
+    assert chosen == 1
+    assert fake_llm.calls == 1
+    assert agent.ranker.stats()["agreement_rate"] == 1.0
+    assert agent.ranker.replay(agent.selection_records)["agreement_rate"] == 1.0
+
+
+def test_confident_choice_skips_llm():
+    fake_llm = FakeLLMClient()
+    agent = ProductSearchAgent(llm_client=fake_llm, scraper=object(), ranker=ProductRanker(threshold=0.0))
+
+    scores = agent.ranker.score(SELECTOR_INPUT, 40.0)
+    chosen = asyncio.run(agent._choose_index(SELECTOR_INPUT, scores, 40.0))
+
+    assert chosen == 1
+    assert fake_llm.calls == 0
@@ -0,0 +1,154 @@
+import os
+import sys
+import json
+import time
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.agents.product_search import ProductSearchAgent
+
+
+EVENT = {
+    "event_type": "mariage",
+    "time_of_day": "soirée",
+    "formality_level": "chic",
+    "style": "minimaliste",
+    "budget": 100.0,
+    "gender": "homme",
+    "age": 30,
+}
+
+
+class FakeLLMClient:
+    def __init__(self, chosen_index: int = 0) -> None:
+        self.chosen_index = chosen_index
+
+    def chat(self, system_prompt: str, user_prompt: str) -> str:
+        return json.dumps({"chosen_index": self.chosen_index, "reason": "test"})
+
+
+class SlowScraper:
+    """
+    "costume luxe" revient tout de suite hors budget ; "chemise lente" attend
+    jusqu'à 5 s sauf si sa tenue est annulée entre-temps.
+    """
+
+    def __init__(self) -> None:
+        self.aborted = []
+
+    def search(self, search_text, gender_path, max_price, cancel_event=None):
+        if "luxe" in search_text:
+            return [{"name": search_text, "price": 150.0, "url": "x"}]
+        if "lente" in search_text:
+            if cancel_event is not None and cancel_event.wait(5):
+                self.aborted.append(search_text)
+                return []
+        return [{"name": search_text, "price": 30.0, "url": search_text}]
+
+
+def outfit(style_name, items):
+    return {
+        "style_name": style_name,
+        "description": "test",
+        "formality_level": "chic",
+        "total_budget": 100.0,
+        "items": [{"name": n, "category": "costume", "max_price": 200.0} for n in items],
+    }
+
+
+def test_outfit_over_budget_is_pruned_and_in_flight_search_aborted():
+    scraper = SlowScraper()
+    agent = ProductSearchAgent(llm_client=FakeLLMClient(), scraper=scraper)
+
+    stylist_output = {
+        "outfits": [
+            outfit("Trop cher", ["costume luxe", "costume chemise lente"]),
+            outfit("Raisonnable", ["costume bleu", "costume gris"]),
+        ]
+    }
+
+    start = time.perf_counter()
+    result = agent.run({"event": EVENT, "stylist_output": stylist_output})
+    elapsed = time.perf_counter() - start
+
+    outfits = result["product_search_output"]["outfits"]
+    assert [o["style_name"] for o in outfits] == ["Raisonnable"]
+    assert scraper.aborted == ["costume chemise lente homme"]
+    assert elapsed < 4
+    assert agent.stats()["pruned_outfits"] == 1
+
+
+class CountingScraper:
+    def __init__(self) -> None:
+        self.calls = []
+
+    def search(self, search_text, gender_path, max_price, cancel_event=None):
+        self.calls.append((search_text, max_price))
+        return [
+            {"name": f"{search_text} A", "price": 25.0, "url": "a"},
+            {"name": f"{search_text} B", "price": 35.0, "url": "b"},
+        ]
+
+
+def test_shared_items_are_resolved_once_and_respect_each_max_price():
+    scraper = CountingScraper()
+    agent = ProductSearchAgent(llm_client=FakeLLMClient(chosen_index=1), scraper=scraper)
+    agent.ranker.threshold = None
+
+    chic = outfit("Chic", ["costume bleu", "Chemise  Blanche"])
+    chic["items"][1].update(category="chemise", max_price=40.0)
+    casual = outfit("Casual", ["costume gris", "chemise blanche"])
+    casual["items"][1].update(category="chemise", max_price=30.0)
+    duplicate = outfit("Chic bis", ["costume bleu", "chemise blanche"])
+    duplicate["items"][1].update(category="chemise", max_price=35.0)
+
+    stylist_output = {"outfits": [chic, casual, duplicate]}
+    result = agent.run({"event": EVENT, "stylist_output": stylist_output})
+
+    searched = sorted(text for text, _ in scraper.calls)
+    assert searched == ["Chemise Blanche homme", "costume bleu homme", "costume gris homme"]
+    assert ("Chemise Blanche homme", 40.0) in scraper.calls
+
+    outfits = result["product_search_output"]["outfits"]
+    assert [o["style_name"] for o in outfits] == ["Chic", "Casual"]
+    assert outfits[0]["items"][1]["chosen_product"]["price"] == 35.0
+    assert outfits[1]["items"][1]["chosen_product"]["price"] == 25.0
+    assert agent.stats()["collapsed_outfits"] == 1
+
+
+def test_counters_are_exact_under_concurrent_requests():
+    import threading
+
+    def request(agent):
+        chic = outfit("Chic", ["costume bleu", "chemise blanche"])
+        duplicate = outfit("Chic bis", ["costume bleu", "chemise blanche"])
+        agent.run({"event": EVENT, "stylist_output": {"outfits": [chic, duplicate, outfit("Gris", ["costume bleu"])]}})
+
+    single = ProductSearchAgent(llm_client=FakeLLMClient(), scraper=CountingScraper())
+    single.ranker.threshold = None
+    request(single)
+
+    shared = ProductSearchAgent(llm_client=FakeLLMClient(), scraper=CountingScraper())
+    shared.ranker.threshold = None
+    threads = [threading.Thread(target=request, args=(shared,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats, expected = shared.stats(), single.stats()
+    assert stats["collapsed_outfits"] == 8 * expected["collapsed_outfits"] == 8
+    assert stats["deduplicated_items"] == 8 * expected["deduplicated_items"]
+    assert len(shared.selection_records) == 8 * len(single.selection_records) > 0
+
+
+def test_selection_records_keep_only_the_latest_decisions():
+    agent = ProductSearchAgent(llm_client=FakeLLMClient(), scraper=CountingScraper(), max_selection_records=2)
+    agent.ranker.threshold = None
+
+    agent.run({"event": EVENT, "stylist_output": {"outfits": [outfit("A", ["costume bleu", "costume gris", "costume noir"])]}})
+
+    # 3 décisions LLM, seules les 2 dernières sont gardées
+    assert len(agent.selection_records) == 2
@@ -0,0 +1,95 @@
+import os
+import sys
+import json
+import asyncio
+from types import SimpleNamespace
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.core.llm_client import LLMClient
+from multi_agents.core.prompt_builder import PromptBuilder, start_request_tracking
+
+
+SELECTOR_INPUT = {
+    "item_name": "chemise blanche",
+    "category": "chemise",
+    "gender": "homme",
+    "candidates": [
+        {
+            "name": "Chemise slim",
+            "brand": "Pier One",
+            "price": 32.0,
+            "color": "white",
+            "currency": "EUR",
+            "url": "https://www.zalando.fr/pier-one-chemise-white-pi922d0dn-a11.html",
+            "image": "https://img01.ztat.net/article/spp-media-p1/2c5e0f3c/a1b2c3d4.jpg?imwidth=1800",
+            "sku": "PI922D0DN-A11",
+        },
+        {"name": "Chemise oxford", "brand": "", "price": 29.0, "color": None, "url": "https://x"},
+    ],
+}
+
+
+def test_selector_prompt_keeps_only_useful_fields():
+    builder = PromptBuilder()
+    prompt = builder.build("product_selector", "Contexte :\n", SELECTOR_INPUT, "\nChoisis.")
+
+    payload = json.loads(prompt[len("Contexte :\n"):-len("\nChoisis.")])
+    assert payload["candidates"] == [
+        {"id": 0, "name": "Chemise slim", "brand": "Pier One", "price": 32.0, "color": "white"},
+        {"id": 1, "name": "Chemise oxford", "price": 29.0},
+    ]
+    assert "https://" not in prompt and "\n  " not in prompt
+
+    stats = builder.stats()
+    assert stats["agents"]["product_selector"]["max_tokens"] == 80
+    assert stats["saved_tokens"] > stats["agents"]["product_selector"]["prompt_tokens"]
+
+
+def test_savings_are_reported_per_request():
+    builder = PromptBuilder()
+
+    async def request(n: int) -> dict:
+        counters = start_request_tracking()
+        await asyncio.gather(*(
+            asyncio.to_thread(builder.build, "product_selector", "", SELECTOR_INPUT) for _ in range(n)
+        ))
+        return counters
+
+    async def main():
+        return await asyncio.gather(request(1), request(3))
+
+    one, three = asyncio.run(main())
+
+    assert one["saved_tokens"] > 0
+    assert three["saved_tokens"] == 3 * one["saved_tokens"]
+    assert builder.stats()["saved_tokens"] == 4 * one["saved_tokens"]
+
+
+class TruncatingCompletions:
+    """
+    Coupe la réponse quand une limite est demandée (finish_reason "length").
+    """
+
+    def __init__(self) -> None:
+        self.limits = []
+
+    def create(self, model, messages, temperature, max_tokens=None):
+        self.limits.append(max_tokens)
+        full = '{"outfits":[{"style_name":"Chic","items":[]}]}'
+        text, reason = (full[:12], "length") if max_tokens is not None else (full, "stop")
+        choice = SimpleNamespace(message=SimpleNamespace(content=text), finish_reason=reason)
+        return SimpleNamespace(choices=[choice], usage=None)
+
+
+def test_truncated_answer_is_retried_without_limit():
+    llm = LLMClient(api_key="test")
+    completions = TruncatingCompletions()
+    llm.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+
+    response = llm.for_agent("stylist").chat("sys", "user")
+
+    assert json.loads(response)["outfits"][0]["style_name"] == "Chic"
+    assert completions.limits == [4000, None]
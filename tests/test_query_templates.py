@@ -0,0 +1,63 @@
+import os
+import sys
+import json
+import asyncio
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.agents.product_search import ProductSearchAgent
+
+
+class FakeLLMClient:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def chat(self, system_prompt: str, user_prompt: str) -> str:
+        self.calls += 1
+        return json.dumps({"search_text": "abaya noire femme", "gender_path": "femme", "max_price": 80})
+
+
+def qb_input(item_name: str, category: str, gender: str = "homme") -> dict:
+    return {
+        "item_name": item_name,
+        "category": category,
+        "max_price": 60.0,
+        "style": "minimaliste",
+        "event_type": "mariage",
+        "formality_level": "chic",
+        "gender": gender,
+    }
+
+
+def build(agent: ProductSearchAgent, *args, **kwargs) -> tuple:
+    return asyncio.run(agent._build_query(qb_input(*args, **kwargs)))
+
+
+def test_common_items_skip_llm():
+    fake_llm = FakeLLMClient()
+    agent = ProductSearchAgent(llm_client=fake_llm, scraper=object())
+
+    assert build(agent, "Costume  bleu marine", "costume") == ("Costume bleu marine homme", "homme", 60.0)
+    assert build(agent, "derbies noires", "Chaussures") == ("derbies noires chaussures homme", "homme", 60.0)
+    assert build(agent, "costume gris", "costume", gender="femme")[0] == "costume gris tailleur femme"
+    assert build(agent, "robe de soirée rouge", "robe", gender="unisex")[:2] == ("robe de soirée rouge femme", "femme")
+    assert build(agent, "ceinture cuir", "accessoire", gender="unisex")[0] == "ceinture cuir"
+    assert fake_llm.calls == 0
+
+
+def test_unknown_items_use_llm_and_report_hit_rate():
+    fake_llm = FakeLLMClient()
+    agent = ProductSearchAgent(llm_client=fake_llm, scraper=object())
+
+    build(agent, "chemise blanche", "chemise")
+    result = build(agent, "abaya noire", "manteau", gender="femme")
+
+    assert result == ("abaya noire femme", "femme", 80.0)
+    assert fake_llm.calls == 1
+
+    stats = agent.stats()["query_templates"]
+    assert stats["hits"] == 1
+    assert stats["hit_rate"] == 0.5
+    assert stats["estimated_latency_saved_s"] is not None
@@ -0,0 +1,149 @@
+import os
+import sys
+import json
+import time
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.core.result_store import PipelineResultStore, normalize_description
+from multi_agents.orchestrator import Orchestrator
+
+
+class CountingLLMClient:
+    """
+    Fake LLM : l'analyse d'événement renvoie toujours le même besoin, quelle que
+    soit la formulation ; on compte les appels par agent.
+    """
+
+    def __init__(self) -> None:
+        self.calls = {"event": 0, "stylist": 0}
+
+    def chat(self, system_prompt: str, user_prompt: str) -> str:
+        if "analyse d'événement" in system_prompt:
+            self.calls["event"] += 1
+            return json.dumps({
+                "event_type": "mariage",
+                "time_of_day": "soirée",
+                "formality_level": "chic",
+                "style": "minimaliste élégant",
+                "budget": 150.0,
+                "gender": "homme",
+            })
+        if "styliste virtuel" in system_prompt:
+            self.calls["stylist"] += 1
+            return json.dumps({
+                "outfits": [
+                    {
+                        "style_name": "Chic",
+                        "description": "test",
+                        "formality_level": "chic",
+                        "total_budget": 100.0,
+                        "items": [{"name": "costume bleu marine", "category": "costume", "max_price": 100.0}],
+                    }
+                ]
+            })
+        return json.dumps({"chosen_index": 0})
+
+
+class FakeScraper:
+    def search(self, search_text, gender_path, max_price, cancel_event=None):
+        return [{"name": f"{search_text} Zalando", "price": 80.0, "url": "u"}]
+
+
+def make_orchestrator(store: PipelineResultStore):
+    llm = CountingLLMClient()
+    return Orchestrator(llm_client=llm, scraper=FakeScraper(), result_store=store), llm
+
+
+def test_normalize_description_ignores_case_accents_and_stopwords_but_keeps_order():
+    assert normalize_description("Mariage le SOIR, chic — 150 €") == normalize_description("mariage soir chic 150€")
+    assert normalize_description("Soirée élégante") == "soiree elegante"
+    assert normalize_description("robe noire chemise blanche") != normalize_description(
+        "robe blanche chemise noire"
+    )
+
+
+def test_repeated_request_is_served_without_rerunning_agents():
+    orch, llm = make_orchestrator(PipelineResultStore())
+
+    first = orch.run_pipeline("Mariage le soir, chic et minimaliste, 150€", ui_budget=150.0)
+    again = orch.run_pipeline("mariage soir chic et minimaliste 150 €", ui_budget=150.0)
+
+    assert first["memoized"] is None
+    assert again["memoized"]["match"] == "exact"
+    assert again["final_outfits"] == first["final_outfits"]
+    # Analyse d'événement : extraction locale sûre, le LLM n'est pas appelé
+    assert llm.calls == {"event": 0, "stylist": 1}
+
+
+def test_near_duplicate_wording_matches_on_event_understanding():
+    orch, llm = make_orchestrator(PipelineResultStore())
+
+    orch.run_pipeline("Mariage le soir, chic et minimaliste, 150€", ui_budget=150.0)
+    other = orch.run_pipeline("Pour un mariage en soirée, tenue habillée et minimaliste", ui_budget=150.0)
+
+    assert other["memoized"]["match"] == "similar_event"
+    assert llm.calls == {"event": 0, "stylist": 1}
+
+    # Autre budget : pas de réutilisation
+    orch.run_pipeline("Mariage le soir, chic et minimaliste", ui_budget=60.0)
+    assert llm.calls == {"event": 0, "stylist": 2}
+
+
+def test_stale_entry_is_served_and_refreshed_in_background():
+    store = PipelineResultStore(refresh_after_seconds=0.0)
+    orch, llm = make_orchestrator(store)
+
+    orch.run_pipeline("Mariage le soir, chic", ui_budget=150.0)
+    stale = orch.run_pipeline("Mariage le soir, chic", ui_budget=150.0)
+
+    assert stale["memoized"]["refreshing"] is True
+    deadline = time.time() + 5
+    while llm.calls["stylist"] < 2 and time.time() < deadline:
+        time.sleep(0.02)
+    assert llm.calls["stylist"] == 2
+    assert store.stats()["refreshes"] >= 1
+
+
+def test_degraded_results_are_not_memoized():
+    store = PipelineResultStore()
+    orch, _ = make_orchestrator(store)
+
+    orch.run_pipeline("Mariage le soir, chic", ui_budget=150.0, deadline_seconds=5.0)
+
+    assert store.stats()["entries"] == 0
+
+
+def test_negation_and_amounts_block_near_duplicate_matches():
+    assert normalize_description("Je ne veux pas de cravate, mariage le soir") != normalize_description(
+        "Je veux une cravate, mariage le soir"
+    )
+
+    store = PipelineResultStore()
+    result = {"event": {"budget": 150.0}, "final_outfits": []}
+    store.put("Mariage le soir, chic, tenue sobre, 150€", None, "homme", None, None, result)
+
+    assert store.lookup("Mariage le soir, chic, tenue sobre, 300€", None, "homme", None, None) is None
+    assert store.lookup("Mariage soir, chic, tenue sobre 150 €", None, "homme", None, None)["match"] == "exact"
+
+    store.put("Je veux une cravate, mariage le soir, chic", None, "homme", None, None, result)
+    assert store.lookup("Je ne veux pas de cravate, mariage le soir, chic", None, "homme", None, None) is None
+
+
+def test_colors_and_gender_block_near_duplicate_matches_and_misses_are_counted():
+    store = PipelineResultStore(text_similarity=0.5)
+    result = {"event": {"budget": 150.0}, "final_outfits": []}
+    long = "Mariage le soir en été, tenue chic et légère, {} avec des chaussures en cuir, {}"
+    store.put(long.format("robe noire", "chemise blanche"), 150.0, "femme", None, None, result)
+
+    # Couleurs échangées entre articles : même ensemble de mots, autre demande
+    assert store.lookup(long.format("robe blanche", "chemise noire"), 150.0, "femme", None, None) is None
+    assert store.lookup(long.format("robe noire", "chemise blanche") + " pour femme", 150.0, "femme", None, None) is None
+    hit = store.lookup(long.format("robe noire", "chemise blanche") + " merci", 150.0, "femme", None, None)
+    assert hit["match"] == "similar_text"
+
+    stats = store.stats()
+    assert stats["misses"] == {"text": 2, "event": 0}
+    assert stats["hit_rate"] == 1 / 3
@@ -0,0 +1,129 @@
+import io
+import os
+import sys
+import wave
+
+import numpy as np
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.core.transcriber import (
+    Transcriber,
+    StreamingTranscriber,
+    VoiceActivitySegmenter,
+    decode_audio,
+    SAMPLE_RATE,
+)
+
+
+class FakeWhisperModel:
+    def __init__(self) -> None:
+        self.calls = []
+
+    def transcribe(self, audio, **kwargs):
+        self.calls.append(audio)
+        return {"text": f"  {audio.size} échantillons  "}
+
+
+def make_wav(seconds: float, rate: int = 44100, channels: int = 2) -> bytes:
+    t = np.arange(int(seconds * rate)) / rate
+    tone = (0.5 * np.sin(2 * np.pi * 440 * t) * 32767).astype("<i2")
+    frames = np.repeat(tone[:, None], channels, axis=1).tobytes()
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(frames)
+    return buffer.getvalue()
+
+
+def test_wav_is_decoded_in_memory_to_mono_16k():
+    samples = decode_audio(make_wav(0.5))
+
+    assert samples.dtype == np.float32
+    assert samples.ndim == 1
+    assert samples.size == SAMPLE_RATE // 2
+    assert 0.4 < float(np.abs(samples).max()) <= 0.5
+
+
+def test_same_audio_is_transcribed_once_per_model_size():
+    models = {}
+
+    def load_model(size):
+        models[size] = FakeWhisperModel()
+        return models[size]
+
+    transcriber = Transcriber(model_size="tiny", load_model=load_model)
+    audio = make_wav(0.25)
+
+    first = transcriber.transcribe(audio)
+    second = transcriber.transcribe(audio)
+    transcriber.transcribe(audio, model_size="small")
+
+    assert first == second == f"{SAMPLE_RATE // 4} échantillons"
+    assert len(models["tiny"].calls) == 1
+    assert len(models["small"].calls) == 1
+    assert transcriber.stats()["cache_hits"] == 1
+    assert transcriber.last_latency("tiny") is not None
+
+
+def speech_with_pauses(pattern) -> np.ndarray:
+    """pattern : liste de (durée_s, parle?) -> signal 16 kHz."""
+    chunks = []
+    for seconds, speaking in pattern:
+        t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        amplitude = 0.3 if speaking else 0.001
+        chunks.append((amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32))
+    return np.concatenate(chunks)
+
+
+def test_streaming_transcribes_segments_as_they_arrive():
+    model = FakeWhisperModel()
+    transcriber = Transcriber(model_size="tiny", load_model=lambda size: model)
+    partials = []
+    stream = StreamingTranscriber(transcriber, on_segment=lambda text, partial: partials.append(partial))
+
+    signal = speech_with_pauses([(0.3, False), (1.0, True), (0.8, False), (0.6, True), (0.2, False)])
+    # Envoi par morceaux de 100 ms, comme un micro
+    for start in range(0, signal.size, 1600):
+        stream.feed(signal[start:start + 1600])
+
+    # Le premier segment est déjà parti en transcription avant la fin de l'enregistrement
+    assert len(model.calls) + stream.pending_segments() == 1
+
+    text = stream.finish(timeout=5.0)
+
+    assert len(model.calls) == 2
+    assert len(partials) == 2
+    assert text == partials[-1]
+    # Chaque segment ne contient que la parole et un peu de marge, pas tout l'audio
+    assert all(call.size < signal.size // 2 for call in model.calls)
+
+
+def test_recording_that_starts_with_speech_keeps_it():
+    segmenter = VoiceActivitySegmenter()
+    signal = speech_with_pauses([(2.0, True), (0.8, False), (1.0, True), (0.2, False)])
+
+    segments = segmenter.feed(signal)
+    last = segmenter.flush()
+    if last is not None:
+        segments.append(last)
+
+    assert len(segments) == 2
+    assert segments[0].size >= 2 * SAMPLE_RATE
+
+
+def test_complete_recording_is_transcribed_whole():
+    model = FakeWhisperModel()
+    transcriber = Transcriber(model_size="tiny", load_model=lambda size: model)
+    partials = []
+    audio = make_wav(1.0)
+
+    text = transcriber.transcribe(audio, on_segment=lambda segment, partial: partials.append(partial))
+
+    assert len(model.calls) == 1
+    assert model.calls[0].size == SAMPLE_RATE
+    assert partials == [text]
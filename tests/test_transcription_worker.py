@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+import threading
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+from multi_agents.core import transcription_worker
+from multi_agents.core.transcription_worker import TranscriptionManager, TranscriptionService, connect
+
+
+class FakeTranscriber:
+    model_size = "tiny"
+
+    def __init__(self, delay: float = 0.0) -> None:
+        self.delay = delay
+        self.calls = 0
+
+    def transcribe(self, audio_bytes, model_size=None, on_segment=None):
+        self.calls += 1
+        time.sleep(self.delay)
+        return audio_bytes.decode("utf-8")
+
+    def stats(self):
+        return {"cache_hits": 0}
+
+
+def wait_done(service, job_id, timeout: float = 5.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        info = service.result(job_id)
+        if info["status"] in ("done", "error"):
+            return info
+        time.sleep(0.01)
+    raise AssertionError("job not finished")
+
+
+def test_jobs_are_serialized_and_deduplicated():
+    transcriber = FakeTranscriber(delay=0.05)
+    service = TranscriptionService(transcriber)
+
+    first = service.submit(b"mariage chic")
+    same = service.submit(b"mariage chic")
+    other = service.submit(b"soiree casual")
+
+    assert first == same
+    assert service.queue_depth() == 2
+    assert wait_done(service, first)["text"] == "mariage chic"
+    assert wait_done(service, other)["text"] == "soiree casual"
+    assert transcriber.calls == 2
+    assert service.queue_depth() == 0
+    service.shutdown()
+
+
+def test_sessions_share_the_worker_through_the_manager(monkeypatch):
+    monkeypatch.setattr(transcription_worker, "_service", TranscriptionService(FakeTranscriber()))
+    manager = TranscriptionManager(address=("127.0.0.1", 0), authkey=b"test")
+    server = manager.get_server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    session_a = connect(address=server.address, authkey=b"test")
+    session_b = connect(address=server.address, authkey=b"test")
+
+    job_id = session_a.submit(b"bonjour", "tiny")
+    assert wait_done(session_b, job_id)["text"] == "bonjour"
+    assert session_b.queue_depth() == 0
+
+
+def test_authkey_is_a_private_per_install_secret(tmp_path, monkeypatch):
+    monkeypatch.delenv("TRANSCRIPTION_WORKER_AUTHKEY", raising=False)
+    path = str(tmp_path / "worker.key")
+
+    key = transcription_worker.worker_authkey(path)
+
+    assert key == transcription_worker.worker_authkey(path)
+    assert key != b"multi-agents-outfits" and len(key) == 64
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    # Une autre installation a son propre secret
+    assert transcription_worker.worker_authkey(str(tmp_path / "other.key")) != key
+
+
+def test_spawned_workers_are_stopped_with_the_app(monkeypatch):
+    class FakeProcess:
+        pid = 4242
+
+        def __init__(self) -> None:
+            self.terminated = False
+
+        def poll(self):
+            return None
+
+        def terminate(self):
+            self.terminated = True
+
+        def wait(self, timeout=None):
+            return 0
+
+    process = FakeProcess()
+    monkeypatch.setattr(transcription_worker, "_spawned", [process])
+    transcription_worker.stop_spawned_workers()
+    assert process.terminated
+
+
+def test_abandoned_streams_are_released():
+    service = TranscriptionService(FakeTranscriber(), stream_idle_seconds=0.05)
+    abandoned = service.open_stream()
+    time.sleep(0.1)
+    service.open_stream()
+
+    assert abandoned not in service._streams
+    assert len(service._streams) == 1
+    service.shutdown()
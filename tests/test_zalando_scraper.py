@@ -0,0 +1,58 @@
+import os
+import sys
+import json
+
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+sys.path.append(PROJECT_ROOT)
+
+import httpx
+
+from multi_agents.core.zalando_scraper import ZalandoScraper, iter_json_array
+
+
+def raw_item(i: int, price: float) -> dict:
+    return {"name": f"produit {i}", "price": str(price).replace(".", ","), "images": [f"img{i}"], "url": f"u{i}"}
+
+
+def make_scraper(monkeypatch, dataset: list, **kwargs) -> tuple:
+    monkeypatch.setenv("APIFY_API_TOKEN", "test")
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        offset = int(request.url.params["offset"])
+        limit = int(request.url.params["limit"])
+        requested.append((offset, limit))
+        page = dataset[offset:offset + limit]
+        return httpx.Response(200, content=json.dumps(page, ensure_ascii=False).encode("utf-8"))
+
+    http_client = httpx.Client(transport=httpx.MockTransport(handler))
+    return ZalandoScraper(http_client=http_client, **kwargs), requested
+
+
+def test_iter_json_array_handles_split_chunks():
+    body = json.dumps([{"a": "é,]"}, {"b": [1, 2]}, {}]).encode("utf-8")
+    chunks = [body[i:i + 3] for i in range(0, len(body), 3)]
+    assert list(iter_json_array(chunks)) == [{"a": "é,]"}, {"b": [1, 2]}, {}]
+
+
+def test_fetch_dataset_keeps_cheapest_under_max_price(monkeypatch):
+    dataset = [raw_item(i, p) for i, p in enumerate([50.0, 12.5, 99.0, 30.0, 12.5, 80.0, 5.0])]
+    scraper, requested = make_scraper(monkeypatch, dataset, max_results=3, page_size=3)
+
+    results = scraper._fetch_dataset("ds", max_price=60.0)
+
+    assert [r["price"] for r in results] == [5.0, 12.5, 12.5]
+    assert [r["name"] for r in results] == ["produit 6", "produit 1", "produit 4"]
+    assert results[0]["image"] == "img6"
+    assert requested == [(0, 3), (3, 3), (6, 3)]
+
+
+def test_multi_page_runs_stop_once_enough_items(monkeypatch):
+    dataset = [raw_item(i, 10.0 + i) for i in range(50)]
+    scraper, requested = make_scraper(monkeypatch, dataset, max_results=3, page_size=10, max_page=3)
+
+    results = scraper._fetch_dataset("ds", max_price=100.0)
+
+    assert len(results) == 3
+    assert requested == [(0, 10)]